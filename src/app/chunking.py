@@ -0,0 +1,129 @@
+# src/app/chunking.py
+
+import re
+import logging
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; the regex tokenizer is used without it
+    tiktoken = None
+
+class RegexTokenizer:
+    """
+    Dependency-free tokenizer approximating BPE token counts: words are cut into
+    pieces of at most 4 characters and punctuation marks are single tokens. Tokens
+    keep their leading whitespace, so decoding is a plain join.
+    """
+    pattern = re.compile(r"\s*(?:\w{1,4}|[^\w\s])")
+
+    def encode(self, text: str) -> List[str]:
+        return self.pattern.findall(text)
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+    def starts_character(self, token: str) -> bool:
+        return True
+
+class TiktokenTokenizer:
+    def __init__(self, encoding_name: str):
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text, disallowed_special=())
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.encoding.decode(tokens)
+
+    def starts_character(self, token: int) -> bool:
+        # BPE tokens are byte sequences; one starting with a UTF-8 continuation byte (10xxxxxx)
+        # holds the end of a character begun in the previous token
+        return self.encoding.decode_single_token_bytes(token)[0] & 0xC0 != 0x80
+
+# Function to get the local tokenizer, falling back to the regex tokenizer when tiktoken is unavailable
+def get_tokenizer(encoding_name: str = "cl100k_base"):
+    if tiktoken is not None:
+        try:
+            return TiktokenTokenizer(encoding_name)
+        except Exception as e:
+            logging.warning(f"Could not load tiktoken encoding {encoding_name}: {e}")
+    logging.info("Using the regex tokenizer to count chunk tokens")
+    return RegexTokenizer()
+
+class TokenChunker:
+    def __init__(self, tokenizer: Any, chunk_size: int, overlap: int = 0, cross_page: bool = False):
+        """
+        Splits pages into chunks of at most chunk_size tokens. Each page is tokenized
+        once and chunks are slices of its token ids.
+
+        Args:
+            tokenizer (Any): Object with encode(text), decode(tokens) and starts_character(token) methods.
+            chunk_size (int): Maximum number of tokens per chunk.
+            overlap (int): Number of tokens shared by consecutive chunks.
+            cross_page (bool): Let chunks continue onto the next page instead of ending at each page break.
+        """
+        if not 0 <= overlap < chunk_size:
+            raise ValueError(f"Chunk overlap ({overlap}) must be smaller than the chunk size ({chunk_size}).")
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.cross_page = cross_page
+
+    def boundary(self, tokens: List[Any], index: int) -> int:
+        """
+        Moves a cut before tokens[index] back to the nearest token starting a character,
+        so multibyte characters (e.g. "ç", "ã") are not split across chunks. A UTF-8
+        character spans at most 4 bytes, so at most 3 tokens are skipped.
+        """
+        for i in range(index, max(index - 4, 0), -1):
+            if i >= len(tokens) or self.tokenizer.starts_character(tokens[i]):
+                return i
+        return index
+
+    def iter_chunks(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Yields chunk records (file_name, page_num, chunk_number, chunk_text). A chunk
+        is attributed to the page it starts on and numbered within that page.
+        """
+        tokens = []
+        token_pages = []
+        covered = 0  # Leading buffered tokens already included in an emitted chunk
+        chunk_numbers = {}
+        file_name = None
+
+        def emit(chunk_tokens, page_num):
+            chunk_text = self.tokenizer.decode(chunk_tokens).strip()
+            if not chunk_text:
+                return
+            chunk_numbers[page_num] = chunk_numbers.get(page_num, 0) + 1
+            yield {
+                'file_name': file_name,
+                'page_num': page_num,
+                'chunk_number': chunk_numbers[page_num],
+                'chunk_text': chunk_text
+            }
+
+        for page in pages:
+            file_name = page['file_name']
+            # Keep a line break between pages whose text ends up in the same chunk
+            page_tokens = self.tokenizer.encode(f"\n{page['text']}" if tokens else page['text'])
+            tokens.extend(page_tokens)
+            token_pages.extend([page['page_num']] * len(page_tokens))
+
+            while len(tokens) >= self.chunk_size:
+                end = self.boundary(tokens, self.chunk_size)
+                yield from emit(tokens[:end], token_pages[0])
+                # The next chunk starts overlap tokens before this one ends, snapped back the same way
+                start = self.boundary(tokens, max(end - self.overlap, 1))
+                del tokens[:start]
+                del token_pages[:start]
+                covered = end - start
+
+            if not self.cross_page:
+                if len(tokens) > covered:
+                    yield from emit(tokens, token_pages[0])
+                tokens, token_pages, covered = [], [], 0
+
+        if len(tokens) > covered:
+            yield from emit(tokens, token_pages[0])
@@ -0,0 +1,49 @@
+# src/app/embeddings/embedding_cache.py
+
+import logging
+import threading
+import numpy as np
+from typing import List, Optional
+from utils.cache_utils import DiskCache, make_cache_key
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+# Function to normalize chunk text so whitespace-only differences share a cache entry
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_size_mb: float = 1024):
+        """
+        Content-addressed embedding cache keyed by embedding model, model version and
+        the hash of the normalized chunk text.
+        """
+        self.disk_cache = DiskCache(path, max_size_mb)
+
+    def make_key(self, model: str, model_version: str, text: str) -> str:
+        return make_cache_key(model, model_version, normalize_text(text))
+
+    def get_many(self, model: str, model_version: str, texts: List[str]) -> List[Optional[List[float]]]:
+        keys = [self.make_key(model, model_version, text) for text in texts]
+        found = self.disk_cache.get_many(keys)
+        logging.debug(f"Embedding cache hits: {len(found)}/{len(texts)} for {model}")
+        return [np.frombuffer(found[key], dtype=np.float64).tolist() if key in found else None for key in keys]
+
+    def set_many(self, model: str, model_version: str, texts: List[str], embeddings: List[List[float]]):
+        self.disk_cache.set_many(
+            (self.make_key(model, model_version, text), np.asarray(embedding, dtype=np.float64).tobytes())
+            for text, embedding in zip(texts, embeddings)
+            if len(embedding)
+        )
+
+# Function to get the embedding cache configured in config.yaml, or None when disabled
+def get_embedding_cache(cache_config: dict) -> Optional[EmbeddingCache]:
+    if not cache_config or not cache_config.get('enabled', False):
+        return None
+    path = cache_config.get('path', 'data/cache/embeddings.sqlite')
+    # Concurrent experiment runs must share one cache connection per path
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path, cache_config.get('max_size_mb', 1024))
+        return _caches[path]
@@ -0,0 +1,233 @@
+# src/app/embeddings/embedding_store.py
+
+import io
+import os
+import csv
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Tuple
+
+STORE_SUFFIX = ".store"
+VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "metadata.csv"
+OFFSETS_FILE = "metadata.idx"
+MANIFEST_FILE = "store.json"
+METADATA_COLUMNS = ['file_name', 'page_num', 'chunk_number', 'chunk_text']
+FORMAT_VERSION = 1
+
+# Function to check whether a path points to an embedding store directory
+def is_embedding_store(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+# Function to read the store manifest
+def read_store_manifest(store_path: str) -> Dict[str, Any]:
+    with open(os.path.join(store_path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+# Function to check that a file derived from the store vectors was written after them
+def is_derived_file_current(store_path: str, derived_path: str) -> bool:
+    if not os.path.exists(derived_path):
+        return False
+    return os.path.getmtime(derived_path) >= os.path.getmtime(os.path.join(store_path, VECTORS_FILE))
+
+# Function to encode one metadata row as a UTF-8 CSV line
+def encode_csv_row(values: List[Any]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(values)
+    return buffer.getvalue().encode('utf-8')
+
+class EmbeddingStoreWriter:
+    def __init__(self, store_path: str, model: str, checkpoint: Dict[str, Any] = None):
+        """
+        Writes an embedding store: a contiguous float32 vector file, a metadata CSV
+        without embeddings, the int64 byte offset of each metadata row and a small
+        JSON manifest.
+
+        Args:
+            store_path (str): Directory of the store.
+            model (str): Embedding model used to produce the vectors.
+            checkpoint (Dict[str, Any]): A value returned by checkpoint(); the store is
+                truncated back to it and appending continues from there.
+        """
+        self.store_path = store_path
+        self.model = model
+        self.dim = None
+        self.count = 0
+        os.makedirs(store_path, exist_ok=True)
+        vectors_path = os.path.join(store_path, VECTORS_FILE)
+        metadata_path = os.path.join(store_path, METADATA_FILE)
+        offsets_path = os.path.join(store_path, OFFSETS_FILE)
+        if checkpoint is not None:
+            os.truncate(vectors_path, checkpoint['vectors_bytes'])
+            os.truncate(metadata_path, checkpoint['metadata_bytes'])
+            os.truncate(offsets_path, checkpoint['rows'] * 8)
+            self.dim = checkpoint['dim']
+            self.count = checkpoint['rows']
+            self.vectors_file = open(vectors_path, 'ab')
+            self.metadata_file = open(metadata_path, 'ab')
+            self.offsets_file = open(offsets_path, 'ab')
+            logging.info(f"Resuming embedding store {store_path} at {self.count} vectors")
+        else:
+            self.vectors_file = open(vectors_path, 'wb')
+            self.metadata_file = open(metadata_path, 'wb')
+            self.offsets_file = open(offsets_path, 'wb')
+            self.metadata_file.write(encode_csv_row(METADATA_COLUMNS))
+        self.metadata_bytes = self.metadata_file.tell()
+
+    def append(self, records: List[Dict[str, Any]], embeddings: Any):
+        """
+        Appends chunk records and their embeddings to the store.
+
+        Args:
+            records (List[Dict[str, Any]]): Chunk metadata (file_name, page_num, chunk_number, chunk_text).
+            embeddings (Any): Matrix-like of shape (len(records), dim).
+        """
+        if not records:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(records), -1)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}.")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        (vectors / norms).tofile(self.vectors_file)
+        offsets = np.empty(len(records), dtype=np.int64)
+        rows = []
+        for i, record in enumerate(records):
+            row = encode_csv_row([record[column] for column in METADATA_COLUMNS])
+            offsets[i] = self.metadata_bytes
+            self.metadata_bytes += len(row)
+            rows.append(row)
+        self.metadata_file.write(b"".join(rows))
+        offsets.tofile(self.offsets_file)
+        self.count += len(records)
+
+    def flush(self):
+        """
+        Flushes the data files and rewrites the manifest, so everything appended so far
+        is readable even if the writer never gets closed.
+        """
+        self.vectors_file.flush()
+        self.metadata_file.flush()
+        self.offsets_file.flush()
+        self.write_manifest()
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Flushes the store and returns the position to resume from after a crash.
+        """
+        self.flush()
+        return {
+            "rows": self.count,
+            "dim": self.dim,
+            "vectors_bytes": os.fstat(self.vectors_file.fileno()).st_size,
+            "metadata_bytes": self.metadata_bytes
+        }
+
+    def close(self):
+        self.vectors_file.close()
+        self.metadata_file.close()
+        self.offsets_file.close()
+        self.write_manifest()
+        logging.info(f"Embedding store written to {self.store_path} with {self.count} vectors")
+
+    def write_manifest(self):
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "model": self.model,
+            "dtype": "float32",
+            "dim": self.dim or 0,
+            "count": self.count,
+            "normalized": True
+        }
+        with open(os.path.join(self.store_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+# Function to load the vectors and metadata of a store
+def load_embedding_store(store_path: str) -> Tuple[np.ndarray, pd.DataFrame]:
+    manifest = read_store_manifest(store_path)
+    vectors = np.fromfile(os.path.join(store_path, VECTORS_FILE), dtype=np.float32)
+    vectors = vectors.reshape(manifest['count'], manifest['dim'])
+    metadata = pd.read_csv(os.path.join(store_path, METADATA_FILE), keep_default_na=False)
+    logging.debug(f"Loaded {manifest['count']} vectors of dimension {manifest['dim']} from {store_path}")
+    return vectors, metadata
+
+# Function to open the store vectors memory-mapped, without reading them into memory
+def open_store_vectors(store_path: str) -> np.ndarray:
+    manifest = read_store_manifest(store_path)
+    if manifest['count'] == 0:
+        return np.empty((0, manifest['dim']), dtype=np.float32)
+    return np.memmap(os.path.join(store_path, VECTORS_FILE), dtype=np.float32, mode='r', shape=(manifest['count'], manifest['dim']))
+
+# Function to read only the given metadata rows, seeking to them through the row offsets file
+def read_store_metadata_rows(store_path: str, indices: Any, chunk_rows: int = 10000) -> pd.DataFrame:
+    indices = np.asarray(indices, dtype=np.int64)
+    offsets_path = os.path.join(store_path, OFFSETS_FILE)
+    metadata_path = os.path.join(store_path, METADATA_FILE)
+    if not os.path.exists(offsets_path):
+        return scan_store_metadata_rows(store_path, indices, chunk_rows)
+
+    records = []
+    if len(indices) == 0 or os.path.getsize(offsets_path) == 0:
+        return pd.DataFrame(records, columns=METADATA_COLUMNS).astype({'page_num': 'int64', 'chunk_number': 'int64'})
+    # Memory-mapped, so only the pages holding the requested offsets are read
+    offsets = np.memmap(offsets_path, dtype=np.int64, mode='r')
+    metadata_size = os.path.getsize(metadata_path)
+    with open(metadata_path, 'rb') as f:
+        for index in indices:
+            start = int(offsets[index])
+            end = int(offsets[index + 1]) if index + 1 < len(offsets) else metadata_size
+            f.seek(start)
+            values = next(csv.reader(io.StringIO(f.read(end - start).decode('utf-8'))))
+            records.append(dict(zip(METADATA_COLUMNS, values)))
+    metadata = pd.DataFrame(records, columns=METADATA_COLUMNS)
+    return metadata.astype({'page_num': 'int64', 'chunk_number': 'int64'})
+
+# Function to read only the given metadata rows, scanning the metadata table in chunks
+def scan_store_metadata_rows(store_path: str, indices: Any, chunk_rows: int = 10000) -> pd.DataFrame:
+    indices = np.asarray(indices, dtype=np.int64)
+    wanted = set(indices.tolist())
+    selected = []
+    offset = 0
+    for df_chunk in pd.read_csv(os.path.join(store_path, METADATA_FILE), chunksize=chunk_rows, keep_default_na=False):
+        df_chunk.index = range(offset, offset + len(df_chunk))
+        offset += len(df_chunk)
+        rows = df_chunk[df_chunk.index.isin(wanted)]
+        if len(rows):
+            selected.append(rows)
+    if not selected:
+        return pd.DataFrame(columns=METADATA_COLUMNS)
+    # Return the rows in the order they were requested
+    return pd.concat(selected).loc[indices].reset_index(drop=True)
+
+# Function to derive the store path for an existing *_processed_<model>.csv file
+def store_path_for_csv(csv_path: str) -> str:
+    return f"{os.path.splitext(csv_path)[0]}{STORE_SUFFIX}"
+
+# Function to convert a processed embeddings CSV into a store, reading it in chunks
+def convert_csv_to_store(csv_path: str, store_path: str = None, model: str = None, chunk_rows: int = 10000) -> str:
+    if store_path is None:
+        store_path = store_path_for_csv(csv_path)
+    if model is None:
+        model = os.path.splitext(os.path.basename(csv_path))[0].rsplit('_', 1)[-1]
+    logging.info(f"Converting {csv_path} to embedding store {store_path}")
+    with EmbeddingStoreWriter(store_path, model) as writer:
+        for df_chunk in pd.read_csv(csv_path, chunksize=chunk_rows, keep_default_na=False):
+            # Embeddings are stored as list literals, which are valid JSON arrays
+            embeddings = [json.loads(x) if x else [] for x in df_chunk['embedding']]
+            # Chunks whose embedding failed were written as []; skip them and any ragged row
+            dim = writer.dim or next((len(embedding) for embedding in embeddings if embedding), 0)
+            valid = [dim > 0 and len(embedding) == dim for embedding in embeddings]
+            if not all(valid):
+                logging.warning(f"Skipping {len(valid) - sum(valid)} chunks in {csv_path} without a {dim}-dimensional embedding")
+            writer.append(df_chunk[METADATA_COLUMNS][valid].to_dict(orient='records'), [embedding for embedding, ok in zip(embeddings, valid) if ok])
+    return store_path
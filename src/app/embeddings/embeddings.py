@@ -1,9 +1,41 @@
 # src/app/embeddings/embeddings.py
 
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from utils.rate_limit import RateLimiter, RetryPolicy, estimate_tokens
+from utils.metrics import MetricsRegistry, make_call_record
+
+# Function to split texts into batches bounded by item count and estimated tokens
+def split_into_batches(texts: List[str], max_batch_size: int, max_batch_tokens: int) -> List[List[str]]:
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if batch and (len(batch) >= max_batch_size or batch_tokens + tokens > max_batch_tokens):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
 
 class EmbeddingGenerator(ABC):
+    max_batch_size: int = 1
+    max_batch_tokens: int = 8000
+    max_in_flight: int = 1
+    cache: Optional[Any] = None
+    cache_model: str = ""
+    model_version: str = ""
+    rate_limiter: Optional[RateLimiter] = None
+    retry_policy: Optional[RetryPolicy] = None
+    metrics: Optional[MetricsRegistry] = None
+    provider: str = ""
+
     @abstractmethod
     def generate(self, text: str) -> List[float]:
         """
@@ -16,3 +48,86 @@ class EmbeddingGenerator(ABC):
             List[float]: The generated embedding.
         """
         pass
+
+    def generate_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generates embeddings for many texts, splitting them into requests that respect
+        the provider's batch size and token limits. Up to max_in_flight requests are
+        sent concurrently. Texts found in the embedding cache are not sent at all.
+
+        Args:
+            texts (List[str]): The texts to generate embeddings for.
+
+        Returns:
+            List[List[float]]: One embedding per text, in the same order.
+        """
+        if self.cache is None:
+            return self._generate_batches(texts)
+
+        embeddings = self.cache.get_many(self.cache_model, self.model_version, texts)
+        missing_texts = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing_texts:
+            missing_embeddings = self._generate_batches(missing_texts)
+            self.cache.set_many(self.cache_model, self.model_version, missing_texts, missing_embeddings)
+            generated = dict(zip(missing_texts, missing_embeddings))
+            embeddings = [generated[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+        return embeddings
+
+    def _generate_batches(self, texts: List[str]) -> List[List[float]]:
+        batches = split_into_batches(texts, self.max_batch_size, self.max_batch_tokens)
+        if self.max_in_flight > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches))) as executor:
+                # map yields results in submission order, so embeddings stay aligned with texts
+                batch_embeddings = list(executor.map(self.request_batch, batches))
+        else:
+            batch_embeddings = [self.request_batch(batch) for batch in batches]
+        return [embedding for batch in batch_embeddings for embedding in batch]
+
+    def request_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Sends one batch through embed_batch, waiting for the rate limiter and retrying
+        rate limit and transient errors when configured. The request is recorded in the
+        metrics registry when one is set.
+        """
+        started_at = time.perf_counter()
+        stats = {"attempts": 0, "queue_wait_seconds": 0.0}
+        try:
+            if self.retry_policy is not None:
+                embeddings = self.retry_policy.call(self._limited_embed_batch, texts, stats)
+            else:
+                embeddings = self._limited_embed_batch(texts, stats)
+        except Exception:
+            self.record_call(texts, "error", started_at, stats)
+            raise
+        self.record_call(texts, "ok", started_at, stats)
+        return embeddings
+
+    def _limited_embed_batch(self, texts: List[str], stats: Optional[Dict[str, Any]] = None) -> List[List[float]]:
+        stats = stats if stats is not None else {"attempts": 0, "queue_wait_seconds": 0.0}
+        stats["attempts"] += 1
+        if self.rate_limiter is not None:
+            stats["queue_wait_seconds"] += self.rate_limiter.wait(sum(estimate_tokens(text) for text in texts))
+        return self.embed_batch(texts)
+
+    def record_call(self, texts: List[str], status: str, started_at: float, stats: Dict[str, Any]):
+        if self.metrics is None:
+            return
+        self.metrics.record(make_call_record(
+            kind="embedding",
+            provider=self.provider,
+            model=self.cache_model.split("/", 1)[-1],  # cache_model is provider/model
+            status=status,
+            wall_seconds=time.perf_counter() - started_at,
+            queue_wait_seconds=stats["queue_wait_seconds"],
+            retries=max(0, stats["attempts"] - 1),
+            input_tokens=sum(estimate_tokens(text) for text in texts),
+            input_bytes=sum(len(text.encode('utf-8')) for text in texts),
+            items=len(texts)
+        ))
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generates embeddings for a single batch with one provider request. Providers
+        that support list inputs override this; the default calls generate per text.
+        """
+        return [self.generate(text) for text in texts]
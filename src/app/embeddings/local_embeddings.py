@@ -0,0 +1,59 @@
+# src/app/embeddings/local_embeddings.py
+
+import time
+import logging
+import numpy as np
+from typing import Any, Dict, List, Optional
+from app.embeddings.embeddings import EmbeddingGenerator
+from app.embeddings.embedding_cache import EmbeddingCache
+from utils.rate_limit import RateLimiter, RetryPolicy
+from utils.metrics import MetricsRegistry
+from utils.simulation_utils import FaultInjector, LatencyModel, seeded_random
+
+class LocalEmbeddingGenerator(EmbeddingGenerator):
+    provider = "local"
+
+    def __init__(self, model: str = "local-embedding", dimensions: int = 256, max_batch_size: int = 256, max_batch_tokens: int = 100000, max_in_flight: int = 1, cache: Optional[EmbeddingCache] = None, model_version: str = "", latency: Optional[Dict[str, Any]] = None, per_item_seconds: float = 0.0, error_rate: float = 0.0, error_status_codes: Optional[List[int]] = None, seed: Optional[int] = None, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, metrics: Optional[MetricsRegistry] = None):
+        """
+        Offline stand-in for a provider embedding model. Each vector is a unit vector
+        seeded by the model and text, so identical texts always get identical vectors.
+        Request latency and errors are simulated as configured.
+
+        Args:
+            model (str): Model name, part of the vector seed and the cache key.
+            dimensions (int): Vector dimensions.
+            latency (Optional[Dict[str, Any]]): Latency distribution of one request.
+            per_item_seconds (float): Latency added per text in the request.
+            error_rate (float): Fraction of requests failing with an injected error.
+            error_status_codes (Optional[List[int]]): Status codes of the injected errors.
+            seed (Optional[int]): Seed of the latency and error sequences.
+        """
+        self.model = model
+        self.dimensions = dimensions
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_in_flight = max_in_flight
+        self.cache = cache
+        self.cache_model = f"local/{self.model}"
+        self.model_version = model_version
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        self.latency = LatencyModel.from_config(latency, seed)
+        self.per_item_seconds = per_item_seconds
+        self.faults = FaultInjector(error_rate, error_status_codes or [429, 503], seed)
+
+    def generate(self, text: str) -> List[float]:
+        # Single texts go through the batch path for the cache, rate limiter and retries
+        return self.generate_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        logging.debug(f"Generating {len(texts)} local embeddings in one batch")
+        self.faults.maybe_fail(f"local embeddings {self.model}")
+        time.sleep(self.latency.sample() + self.per_item_seconds * len(texts))
+        return [self.embed_text(text) for text in texts]
+
+    def embed_text(self, text: str) -> List[float]:
+        seed = seeded_random(self.model, text).getrandbits(64)
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
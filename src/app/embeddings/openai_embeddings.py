@@ -1,22 +1,41 @@
 import logging
-from typing import List
+from typing import List, Optional
 from openai import OpenAI
 from app.embeddings.embeddings import EmbeddingGenerator
+from app.embeddings.embedding_cache import EmbeddingCache
+from utils.rate_limit import RateLimiter, RetryPolicy
+from utils.metrics import MetricsRegistry
 
 class OpenAIEmbeddingGenerator(EmbeddingGenerator):
-    def __init__(self, api_key: str, model: str = "text-embedding-3-small"):
+    provider = "openai"
+
+    def __init__(self, api_key: str, model: str = "text-embedding-3-small", max_batch_size: int = 2048, max_batch_tokens: int = 300000, max_in_flight: int = 1, cache: Optional[EmbeddingCache] = None, model_version: str = "", client: Optional[OpenAI] = None, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, metrics: Optional[MetricsRegistry] = None):
         self.api_key = api_key
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_in_flight = max_in_flight
+        self.cache = cache
+        self.cache_model = f"openai/{self.model}"
+        self.model_version = model_version
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        self.client = client or OpenAI(api_key=self.api_key)
 
     def generate(self, text: str) -> List[float]:
+        # Single texts go through the batch path for the cache, rate limiter and retries
+        return self.generate_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        logging.debug(f"Requesting {len(texts)} OpenAI embeddings in one batch")
         try:
             response = self.client.embeddings.create(
-                input=text,
+                input=texts,
                 model=self.model,
-                encoding_format="float"  # Use "float" or "base64"
+                encoding_format="float"
             )
-            return response.data[0].embedding
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
         except Exception as e:
-            logging.error(f"Error generating embedding: {e}")
-            return []
+            logging.error(f"Error generating batch of {len(texts)} embeddings: {e}")
+            raise
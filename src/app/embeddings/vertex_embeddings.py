@@ -1,30 +1,51 @@
 import logging
 import numpy as np
-from typing import List
+from typing import List, Optional
 from google.cloud import aiplatform
 from vertexai.language_models import TextEmbeddingModel
 from app.embeddings.embeddings import EmbeddingGenerator
+from app.embeddings.embedding_cache import EmbeddingCache
+from utils.rate_limit import RateLimiter, RetryPolicy
+from utils.metrics import MetricsRegistry
 from utils.config_utils import load_config
 
 class VertexEmbeddingGenerator(EmbeddingGenerator):
-    def __init__(self, project_id: str, location: str, model_name: str = "text-embedding-004"):
+    provider = "vertex"
+
+    def __init__(self, project_id: str, location: str, model_name: str = "text-embedding-004", max_batch_size: int = 250, max_batch_tokens: int = 20000, max_in_flight: int = 1, cache: Optional[EmbeddingCache] = None, model_version: str = "", text_embedding_model: Optional[TextEmbeddingModel] = None, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, metrics: Optional[MetricsRegistry] = None):
         self.project_id = project_id
         self.location = location
         self.model_name = model_name
-        # Initialize Vertex AI
-        aiplatform.init(project=self.project_id, location=self.location)
-        self.text_embedding_model = TextEmbeddingModel.from_pretrained(self.model_name)
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_in_flight = max_in_flight
+        self.cache = cache
+        self.cache_model = f"vertex/{self.model_name}"
+        self.model_version = model_version
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        if text_embedding_model is None:
+            # Initialize Vertex AI
+            aiplatform.init(project=self.project_id, location=self.location)
+            text_embedding_model = TextEmbeddingModel.from_pretrained(self.model_name)
+        self.text_embedding_model = text_embedding_model
 
     def generate(self, text: str, return_array: bool = False) -> List[float]:
-        try:
-            embeddings = self.text_embedding_model.get_embeddings([text])
-            text_embedding = [embedding.values for embedding in embeddings][0]
+        # Single texts go through the batch path for the cache, rate limiter and retries
+        text_embedding = self.generate_batch([text])[0]
 
-            if return_array:
-                text_embedding = np.fromiter(text_embedding, dtype=float)
+        if return_array:
+            text_embedding = np.fromiter(text_embedding, dtype=float)
 
-            # Returns 768-dimensional array or list
-            return text_embedding
+        # Returns 768-dimensional array or list
+        return text_embedding
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        logging.debug(f"Requesting {len(texts)} Vertex AI embeddings in one batch")
+        try:
+            embeddings = self.text_embedding_model.get_embeddings(texts)
+            return [embedding.values for embedding in embeddings]
         except Exception as e:
-            logging.error(f"Error generating embedding with Vertex AI: {e}")
-            return []
+            logging.error(f"Error generating batch of {len(texts)} embeddings with Vertex AI: {e}")
+            raise
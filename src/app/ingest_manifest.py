@@ -0,0 +1,66 @@
+# src/app/ingest_manifest.py
+
+import os
+import json
+import logging
+from typing import Any, Dict, Optional
+
+MANIFEST_FILE = "ingest_manifest.json"
+
+class IngestManifest:
+    def __init__(self, output_dir: str):
+        """
+        Records, per PDF, the content hash and settings it was ingested with, where its
+        output lives and how far ingestion got, so unchanged PDFs can be skipped and
+        interrupted ones resumed.
+
+        Args:
+            output_dir (str): Directory holding the processed outputs and the manifest.
+        """
+        self.path = os.path.join(output_dir, MANIFEST_FILE)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+            logging.debug(f"Loaded ingest manifest with {len(self.entries)} entries from {self.path}")
+
+    def get(self, pdf_path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(os.path.abspath(pdf_path))
+
+    def get_resumable(self, pdf_path: str, content_hash: str, settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Returns the entry of a PDF when its content and settings are unchanged and its
+        output still exists, otherwise None (the PDF must be processed from scratch).
+        """
+        entry = self.get(pdf_path)
+        if entry is None or entry['content_hash'] != content_hash or entry['settings'] != settings:
+            return None
+        if not os.path.exists(entry['output_path']):
+            return None
+        return entry
+
+    def start(self, pdf_path: str, content_hash: str, settings: Dict[str, Any], output_path: str):
+        self.entries[os.path.abspath(pdf_path)] = {
+            "content_hash": content_hash,
+            "settings": settings,
+            "output_path": output_path,
+            "status": "in_progress",
+            "checkpoint": None
+        }
+        self.save()
+
+    def commit(self, pdf_path: str, checkpoint: Dict[str, Any]):
+        self.entries[os.path.abspath(pdf_path)]["checkpoint"] = checkpoint
+        self.save()
+
+    def complete(self, pdf_path: str):
+        self.entries[os.path.abspath(pdf_path)]["status"] = "complete"
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a truncated manifest
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=4)
+        os.replace(temp_path, self.path)
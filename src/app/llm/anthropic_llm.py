@@ -1,47 +1,86 @@
 # src/app/llm/anthropic_llm.py
 
 import logging
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Optional
 import anthropic
+from utils.rate_limit import RateLimiter, RetryPolicy
+from utils.metrics import MetricsRegistry
 from .llm_base import LLMBase
 
 class AnthropicLLM(LLMBase):
-    def __init__(self, system_message: str, model_config: Dict[str, Any]):
+    provider = "anthropic"
+
+    def __init__(self, system_message: str, model_config: Dict[str, Any], cache: Optional[Any] = None, client: Optional[anthropic.Anthropic] = None, get_async_client: Optional[Callable[[], Any]] = None, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, metrics: Optional[MetricsRegistry] = None):
         self.system_message = system_message
         self.model_config = model_config
         self.prices = model_config['prices']
-        self.client = anthropic.Anthropic(api_key=self.model_config['api_key'])
+        self.client = client or anthropic.Anthropic(api_key=self.model_config['api_key'])
+        self.get_async_client = get_async_client  # Returns the shared async client of the running event loop (see app.registry)
         self.model = self.model_config['model']  # Store the current model in use
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
     
-    def call_llm(self, prompt: str) -> Dict[str, Any]:
+    def _call_llm(self, prompt: str) -> Dict[str, Any]:
         logging.info(f"Calling Anthropic LLM")
-        messages = [
-            {"role": "user", "content": prompt}
-        ]
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                system=self.system_message,
-                messages=messages,
-                max_tokens=self.model_config.get('max_tokens', 1000),
-                temperature=self.model_config.get('temperature', 0.7)
-            )
+            response = self.client.messages.create(**self.build_request(prompt))
+            logging.info("Received response from Anthropic LLM")
+            return self.build_llm_response(prompt, response)
+        except Exception as e:
+            logging.error(f"Error calling Anthropic LLM: {e}")
+            raise
+
+    async def _acall_llm(self, prompt: str) -> Dict[str, Any]:
+        logging.info(f"Calling Anthropic LLM (async)")
+        if self.get_async_client is None:
+            # Without a shared async client, the sync client runs in a thread
+            return await super()._acall_llm(prompt)
+        try:
+            response = await self.get_async_client().messages.create(**self.build_request(prompt))
             logging.info("Received response from Anthropic LLM")
-            
-            # Concatenate the text blocks into a single string
-            response_text = ''.join(block.text for block in response.content)
-
-            llm_response = {
-                "prompt": prompt,
-                "response_text": response_text,
-                "system_message": self.system_message,
-                "response": response,
-                "costs": self.calculate_cost(response)
-            }
-            return llm_response
+            return self.build_llm_response(prompt, response)
         except Exception as e:
             logging.error(f"Error calling Anthropic LLM: {e}")
             raise
+
+    def _stream_llm(self, prompt: str, on_token: Callable[[str], None]) -> Dict[str, Any]:
+        logging.info(f"Calling Anthropic LLM (streaming)")
+        try:
+            with self.client.messages.stream(**self.build_request(prompt)) as stream:
+                for text in stream.text_stream:
+                    on_token(text)
+                response = stream.get_final_message()
+            logging.info("Received streamed response from Anthropic LLM")
+            return self.build_llm_response(prompt, response)
+        except Exception as e:
+            logging.error(f"Error streaming Anthropic LLM: {e}")
+            raise
+
+    def build_request(self, prompt: str) -> Dict[str, Any]:
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+        return {
+            "model": self.model,
+            "system": self.system_message,
+            "messages": messages,
+            "max_tokens": self.model_config.get('max_tokens', 1000),
+            "temperature": self.model_config.get('temperature', 0.7)
+        }
+
+    def build_llm_response(self, prompt: str, response: Any) -> Dict[str, Any]:
+        # Concatenate the text blocks into a single string
+        response_text = ''.join(block.text for block in response.content)
+
+        return {
+            "prompt": prompt,
+            "response_text": response_text,
+            "system_message": self.system_message,
+            "response": response,
+            "costs": self.calculate_cost(response)
+        }
     
     def calculate_cost(self, response: Any) -> Dict[str, float]:
         total_tokens = response.usage.input_tokens + response.usage.output_tokens
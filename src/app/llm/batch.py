@@ -0,0 +1,265 @@
+# src/app/llm/batch.py
+
+import os
+import time
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from app.results_store import FileResultsStore, ResultsStore
+
+BATCH_INPUT_FILE = "batch_input.jsonl"
+BATCH_OUTPUT_FILE = "batch_output.jsonl"
+
+# Function to write batch requests as JSONL, one provider-style request per line.
+# Batch JSONL files are working files exchanged with the provider batch APIs (uploaded from
+# and downloaded to disk), not pipeline results, so they are written directly rather than
+# through the ResultsStore; only the responses fanned out by run_llm_batch go to the store.
+def write_batch_jsonl(lines: List[Dict[str, Any]], path: str) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return path
+
+# Function to read a JSONL file into a list of dicts
+def read_batch_jsonl(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class BatchBackend(ABC):
+    # Set by backends whose requests already go through call_llm and its cache
+    stores_in_cache: bool = False
+
+    @abstractmethod
+    def submit(self, requests: List[Dict[str, Any]], batch_dir: str) -> str:
+        """
+        Writes the requests as a batch JSONL under batch_dir and submits it.
+
+        Args:
+            requests (List[Dict[str, Any]]): Requests with custom_id, llm and prompt.
+            batch_dir (str): Directory for the batch input and output files.
+
+        Returns:
+            str: The batch id used to poll for and fetch the results.
+        """
+        pass
+
+    @abstractmethod
+    def poll(self, batch_id: str) -> str:
+        """
+        Returns the batch status: "in_progress", "completed" or "failed".
+        """
+        pass
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the results of a completed batch by custom_id: response_text and costs,
+        or error for requests that failed.
+        """
+        pass
+
+    def wait(self, batch_id: str, timeout: float):
+        """
+        Waits before the next poll of a batch still in progress, at most timeout seconds.
+        Remote backends sleep for the poll interval; backends that can tell when the
+        batch finishes return as soon as it does.
+        """
+        time.sleep(timeout)
+
+class LocalBatchBackend(BatchBackend):
+    stores_in_cache = True
+
+    def __init__(self, max_workers: int = 8):
+        """
+        Stand-in batch backend that runs the batch in this process: every request is
+        sent with call_llm from a thread pool and the results are written to an output
+        JSONL, as a provider batch service would.
+
+        Args:
+            max_workers (int): Requests sent concurrently.
+        """
+        self.max_workers = max_workers
+        self.batches = {}
+
+    def submit(self, requests: List[Dict[str, Any]], batch_dir: str) -> str:
+        write_batch_jsonl([{"custom_id": request["custom_id"], "provider": request["llm"].provider, "model": request["llm"].model, "prompt": request["prompt"]} for request in requests], os.path.join(batch_dir, BATCH_INPUT_FILE))
+        batch_id = f"local-{len(self.batches) + 1}"
+        output_path = os.path.join(batch_dir, BATCH_OUTPUT_FILE)
+        thread = threading.Thread(target=self._run, args=(requests, output_path), name=batch_id, daemon=True)
+        self.batches[batch_id] = {"thread": thread, "output_path": output_path}
+        thread.start()
+        logging.info(f"Submitted local batch {batch_id} with {len(requests)} requests")
+        return batch_id
+
+    def _run(self, requests: List[Dict[str, Any]], output_path: str):
+        def run_request(request: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                llm_response = request["llm"].call_llm(request["prompt"])
+                return {"custom_id": request["custom_id"], "response_text": llm_response["response_text"], "costs": llm_response["costs"], "error": None}
+            except Exception as e:
+                return {"custom_id": request["custom_id"], "response_text": None, "costs": None, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            write_batch_jsonl(list(executor.map(run_request, requests)), output_path)
+
+    def wait(self, batch_id: str, timeout: float):
+        self.batches[batch_id]["thread"].join(timeout)
+
+    def poll(self, batch_id: str) -> str:
+        batch = self.batches[batch_id]
+        if batch["thread"].is_alive():
+            return "in_progress"
+        return "completed" if os.path.exists(batch["output_path"]) else "failed"
+
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        return {line["custom_id"]: line for line in read_batch_jsonl(self.batches[batch_id]["output_path"])}
+
+class OpenAIBatchBackend(BatchBackend):
+    def __init__(self, client: Any, discount: float = 0.5):
+        """
+        Submits requests to the OpenAI Batch API (/v1/chat/completions, 24h window).
+        Costs are computed from the returned usage with the model prices times the
+        batch discount.
+
+        Args:
+            client (Any): OpenAI client.
+            discount (float): Price multiplier applied to batch requests.
+        """
+        self.client = client
+        self.discount = discount
+        self.batches = {}
+
+    def submit(self, requests: List[Dict[str, Any]], batch_dir: str) -> str:
+        lines = [{
+            "custom_id": request["custom_id"],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": request["llm"].build_request(request["prompt"])
+        } for request in requests]
+        input_path = write_batch_jsonl(lines, os.path.join(batch_dir, BATCH_INPUT_FILE))
+        with open(input_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+        self.batches[batch.id] = {"batch_dir": batch_dir, "prices": {request["custom_id"]: request["llm"].prices for request in requests}}
+        logging.info(f"Submitted OpenAI batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    def poll(self, batch_id: str) -> str:
+        status = self.client.batches.retrieve(batch_id).status
+        if status == "completed":
+            return "completed"
+        if status in ("failed", "expired", "cancelled"):
+            return "failed"
+        return "in_progress"
+
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            output_path = os.path.join(self.batches[batch_id]["batch_dir"], f"{file_id}.jsonl")
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(self.client.files.content(file_id).text)
+            for line in read_batch_jsonl(output_path):
+                results[line["custom_id"]] = self.parse_result(line, self.batches[batch_id]["prices"][line["custom_id"]])
+        return results
+
+    def parse_result(self, line: Dict[str, Any], prices: Dict[str, float]) -> Dict[str, Any]:
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            return {"custom_id": line["custom_id"], "response_text": None, "costs": None, "error": str(line.get("error") or response)}
+        body = response["body"]
+        usage = body["usage"]
+        input_cost = usage["prompt_tokens"] * prices['input_token'] * self.discount
+        output_cost = usage["completion_tokens"] * prices['output_token'] * self.discount
+        return {
+            "custom_id": line["custom_id"],
+            "response_text": body["choices"][0]["message"]["content"],
+            "costs": {
+                "input_cost": input_cost,
+                "output_cost": output_cost,
+                "total_cost": input_cost + output_cost,
+                "input_tokens": usage["prompt_tokens"],
+                "output_tokens": usage["completion_tokens"],
+                "total_tokens": usage["total_tokens"]
+            },
+            "error": None
+        }
+
+# Function to run requests through their backends and write each response to its output file
+def run_llm_batch(requests: List[Dict[str, Any]], batch_dir: str, get_backend: Callable[[str], BatchBackend], poll_interval: float = 30, store: Optional[ResultsStore] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Answers cached requests directly, submits the rest as one batch per provider and
+    model, polls until every batch finishes and writes each response_text to the
+    request's output_file.
+
+    Args:
+        requests (List[Dict[str, Any]]): Requests with custom_id, llm (an LLMBase), prompt and output_file.
+        batch_dir (str): Directory for the batch JSONL files (on disk, outside the results store).
+        get_backend (Callable[[str], BatchBackend]): Returns the backend for a provider.
+        poll_interval (float): Longest wait between status checks of remote (provider API) batches.
+        store (Optional[ResultsStore]): Results store the responses are written to (files by default).
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The result of every request by custom_id.
+    """
+    results = {}
+    pending = {}
+    for request in requests:
+        cached = request["llm"].get_cached(request["prompt"])
+        if cached is not None:
+            results[request["custom_id"]] = {"custom_id": request["custom_id"], "response_text": cached["response_text"], "costs": cached["costs"], "error": None}
+        else:
+            pending.setdefault((request["llm"].provider, request["llm"].model), []).append(request)
+    logging.info(f"{len(results)} of {len(requests)} batch requests answered from the cache")
+
+    submitted = []
+    for (provider, model), group in pending.items():
+        backend = get_backend(provider)
+        group_dir = os.path.join(batch_dir, f"{provider}_{model}")
+        submitted.append((backend, backend.submit(group, group_dir), group))
+
+    while submitted:
+        still_running = []
+        for backend, batch_id, group in submitted:
+            status = backend.poll(batch_id)
+            if status == "in_progress":
+                still_running.append((backend, batch_id, group))
+                continue
+            if status == "failed":
+                logging.error(f"Batch {batch_id} failed")
+                results.update({request["custom_id"]: {"custom_id": request["custom_id"], "response_text": None, "costs": None, "error": f"Batch {batch_id} failed"} for request in group})
+                continue
+            batch_results = backend.results(batch_id)
+            for request in group:
+                result = batch_results.get(request["custom_id"], {"custom_id": request["custom_id"], "response_text": None, "costs": None, "error": "Missing from batch output"})
+                results[request["custom_id"]] = result
+                if result["error"] is None and not backend.stores_in_cache:
+                    request["llm"].set_cached(request["prompt"], {"prompt": request["prompt"], "response_text": result["response_text"], "system_message": request["llm"].system_message, "costs": result["costs"]})
+            logging.info(f"Batch {batch_id} completed")
+        submitted = still_running
+        if submitted:
+            logging.info(f"Waiting for {len(submitted)} batches")
+            # Local batches end the wait as soon as they finish; remote ones sleep poll_interval
+            backend, batch_id, _ = min(submitted, key=lambda batch: not isinstance(batch[0], LocalBatchBackend))
+            backend.wait(batch_id, poll_interval)
+
+    # Fan the responses back into the per-request output files, in one transaction
+    store = store or FileResultsStore()
+    failed = 0
+    with store.transaction():
+        for request in requests:
+            result = results[request["custom_id"]]
+            if result["error"] is not None:
+                failed += 1
+                logging.error(f"Batch request {request['custom_id']} ({request['llm'].provider}/{request['llm'].model}) failed: {result['error']}")
+                continue
+            store.write_text(request["output_file"], result["response_text"])
+    if failed:
+        logging.warning(f"{failed} of {len(requests)} batch requests failed")
+    return results
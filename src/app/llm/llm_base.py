@@ -1,17 +1,223 @@
 # src/app/llm/llm_base.py
 
+import time
+import asyncio
+import logging
 from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+from utils.rate_limit import RateLimiter, RetryPolicy, estimate_tokens
+from utils.metrics import MetricsRegistry, make_call_record
+
+class StreamInterruptedError(Exception):
+    """
+    Raised when a streamed response fails after tokens were already delivered, so the
+    call is not retried and the partial output is not duplicated.
+    """
+    pass
+
+class EmptyStreamError(Exception):
+    """
+    Raised when a streamed response ends without delivering any text or token usage,
+    e.g. when the provider blocks the prompt. No output was delivered.
+    """
+    pass
+
+class LatencyTracker:
+    def __init__(self, on_token: Optional[Callable[[str], None]] = None):
+        """
+        Measures one provider call: total time and, when streaming, the time to the
+        first token. Wraps the caller's on_token callback.
+        """
+        self.on_token = on_token
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.chunks = 0
+
+    def __call__(self, token: str):
+        if not token:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+        if self.on_token is not None:
+            self.on_token(token)
+
+    def summary(self, output_tokens: Optional[int], streamed: bool) -> Dict[str, Any]:
+        total_seconds = time.perf_counter() - self.started_at
+        ttft_seconds = self.first_token_at - self.started_at if self.first_token_at is not None else None
+        # Generation speed excludes the wait for the first token when it is known
+        generation_seconds = total_seconds - ttft_seconds if ttft_seconds is not None else total_seconds
+        return {
+            "streamed": streamed,
+            "ttft_seconds": ttft_seconds,
+            "total_seconds": total_seconds,
+            "output_tokens": output_tokens,
+            "stream_chunks": self.chunks,
+            "tokens_per_second": output_tokens / generation_seconds if output_tokens and generation_seconds > 0 else None
+        }
 
 class LLMBase(ABC):
-    @abstractmethod
-    def call_llm(self, prompt: str) -> str:
+    provider: str = ""
+    cache: Optional[Any] = None
+    rate_limiter: Optional[RateLimiter] = None
+    retry_policy: Optional[RetryPolicy] = None
+    metrics: Optional[MetricsRegistry] = None
+
+    def call_llm(self, prompt: str, on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Call the LLM with the given prompt. When an LLM cache is set, an identical earlier
+        request is answered from it without calling the provider. Provider calls wait
+        for the rate limiter and are retried on rate limit and transient errors.
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
+            on_token (Optional[Callable[[str], None]]): When given, the response is streamed
+                and each text fragment is passed to this callback as it arrives.
+
+        Returns:
+            Dict[str, Any]: The response dict (prompt, response_text, system_message, response, costs, cached, latency).
+        """
+        started_at = time.perf_counter()
+        stats = {"attempts": 0, "queue_wait_seconds": 0.0}
+        cached = self.get_cached(prompt)
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached["response_text"])
+            self.record_call(prompt, cached, "cached", started_at, stats)
+            return cached
+        try:
+            if self.retry_policy is not None:
+                llm_response = self.retry_policy.call(self._limited_call_llm, prompt, on_token, stats)
+            else:
+                llm_response = self._limited_call_llm(prompt, on_token, stats)
+        except Exception:
+            self.record_call(prompt, None, "error", started_at, stats)
+            raise
+        self.set_cached(prompt, llm_response)
+        self.record_call(prompt, llm_response, "ok", started_at, stats)
+        return llm_response
+
+    async def acall_llm(self, prompt: str) -> Dict[str, Any]:
         """
-        Call the LLM with the given prompt.
+        Call the LLM with the given prompt without blocking the event loop, going
+        through the same cache as call_llm.
 
         Args:
             prompt (str): The prompt to send to the LLM.
 
         Returns:
-            str: The response from the LLM.
+            Dict[str, Any]: The same response dict as call_llm.
+        """
+        started_at = time.perf_counter()
+        stats = {"attempts": 0, "queue_wait_seconds": 0.0}
+        cached = self.get_cached(prompt)
+        if cached is not None:
+            self.record_call(prompt, cached, "cached", started_at, stats)
+            return cached
+        try:
+            if self.retry_policy is not None:
+                llm_response = await self.retry_policy.acall(self._limited_acall_llm, prompt, stats)
+            else:
+                llm_response = await self._limited_acall_llm(prompt, stats)
+        except Exception:
+            self.record_call(prompt, None, "error", started_at, stats)
+            raise
+        self.set_cached(prompt, llm_response)
+        self.record_call(prompt, llm_response, "ok", started_at, stats)
+        return llm_response
+
+    def _limited_call_llm(self, prompt: str, on_token: Optional[Callable[[str], None]] = None, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        stats = stats if stats is not None else {"attempts": 0, "queue_wait_seconds": 0.0}
+        stats["attempts"] += 1
+        if self.rate_limiter is not None:
+            stats["queue_wait_seconds"] += self.rate_limiter.wait(self.estimate_request_tokens(prompt))
+        tracker = LatencyTracker(on_token)
+        if on_token is None:
+            llm_response = self._call_llm(prompt)
+        else:
+            try:
+                llm_response = self._stream_llm(prompt, tracker)
+            except Exception as e:
+                if tracker.chunks:
+                    raise StreamInterruptedError(f"Stream from {self.provider} model {self.model} failed after {tracker.chunks} chunks: {e}") from e
+                raise
+        llm_response["latency"] = tracker.summary(llm_response["costs"].get("output_tokens"), on_token is not None)
+        return llm_response
+
+    async def _limited_acall_llm(self, prompt: str, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        stats = stats if stats is not None else {"attempts": 0, "queue_wait_seconds": 0.0}
+        stats["attempts"] += 1
+        if self.rate_limiter is not None:
+            stats["queue_wait_seconds"] += await self.rate_limiter.wait_async(self.estimate_request_tokens(prompt))
+        tracker = LatencyTracker()
+        llm_response = await self._acall_llm(prompt)
+        llm_response["latency"] = tracker.summary(llm_response["costs"].get("output_tokens"), False)
+        return llm_response
+
+    def record_call(self, prompt: str, llm_response: Optional[Dict[str, Any]], status: str, started_at: float, stats: Dict[str, Any]):
+        if self.metrics is None:
+            return
+        costs = llm_response["costs"] if llm_response is not None else {}
+        # Latency is only measured for provider calls; cached responses and errors have none
+        latency = (llm_response.get("latency") or {}) if status == "ok" else {}
+        self.metrics.record(make_call_record(
+            kind="llm",
+            provider=self.provider,
+            model=self.model,
+            status=status,
+            wall_seconds=time.perf_counter() - started_at,
+            queue_wait_seconds=stats["queue_wait_seconds"],
+            retries=max(0, stats["attempts"] - 1),
+            input_tokens=costs.get("input_tokens") if status == "ok" else None,
+            output_tokens=costs.get("output_tokens") if status == "ok" else None,
+            input_bytes=len(f"{self.system_message or ''}{prompt}".encode('utf-8')),
+            output_bytes=len(llm_response["response_text"].encode('utf-8')) if llm_response is not None else 0,
+            ttft_seconds=latency.get("ttft_seconds"),
+            streamed=latency.get("streamed", False)
+        ))
+
+    def estimate_request_tokens(self, prompt: str) -> int:
+        # Providers count the completion budget against the tokens-per-minute limit
+        return estimate_tokens(f"{self.system_message or ''}{prompt}") + self.generation_params()['max_tokens']
+
+    @abstractmethod
+    def _call_llm(self, prompt: str) -> Dict[str, Any]:
+        """
+        Sends the prompt to the provider. Implemented by each provider.
         """
         pass
+
+    async def _acall_llm(self, prompt: str) -> Dict[str, Any]:
+        """
+        Async provider call. Providers override this with their async clients; the
+        default runs _call_llm in a thread.
+        """
+        return await asyncio.to_thread(self._call_llm, prompt)
+
+    def _stream_llm(self, prompt: str, on_token: Callable[[str], None]) -> Dict[str, Any]:
+        """
+        Streaming provider call, passing text fragments to on_token as they arrive.
+        Providers override this; the default delivers the whole response at once.
+        """
+        llm_response = self._call_llm(prompt)
+        on_token(llm_response["response_text"])
+        return llm_response
+
+    def generation_params(self) -> Dict[str, Any]:
+        return {
+            "temperature": self.model_config.get('temperature', 0.7),
+            "max_tokens": self.model_config.get('max_tokens', 1000)
+        }
+
+    def get_cached(self, prompt: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        llm_response = self.cache.get(self.provider, self.model, self.system_message, prompt, self.generation_params())
+        if llm_response is not None:
+            logging.info(f"Using cached {self.provider} response for model {self.model}")
+        return llm_response
+
+    def set_cached(self, prompt: str, llm_response: Dict[str, Any]):
+        llm_response["cached"] = False
+        if self.cache is not None:
+            self.cache.set(self.provider, self.model, self.system_message, prompt, self.generation_params(), llm_response)
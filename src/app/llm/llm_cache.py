@@ -0,0 +1,55 @@
+# src/app/llm/llm_cache.py
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+from utils.cache_utils import DiskCache, make_cache_key
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+class LLMCache:
+    def __init__(self, path: str, max_size_mb: float = 512, ttl_hours: float = 0):
+        """
+        LLM response cache keyed by provider, model, system message, prompt and the
+        generation parameters. Only the response text and costs are stored; the raw
+        provider response object is not.
+
+        Args:
+            path (str): Path of the SQLite file.
+            max_size_mb (float): Maximum total size of the stored responses, in megabytes.
+            ttl_hours (float): Age after which a stored response is ignored (0 = never expires).
+        """
+        self.disk_cache = DiskCache(path, max_size_mb, ttl_seconds=ttl_hours * 3600 if ttl_hours else None)
+
+    def make_key(self, provider: str, model: str, system_message: str, prompt: str, params: Dict[str, Any]) -> str:
+        return make_cache_key(provider, model, system_message or "", prompt, json.dumps(params, sort_keys=True))
+
+    def get(self, provider: str, model: str, system_message: str, prompt: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        value = self.disk_cache.get(self.make_key(provider, model, system_message, prompt, params))
+        if value is None:
+            return None
+        llm_response = json.loads(value.decode('utf-8'))
+        llm_response["response"] = None
+        llm_response["cached"] = True
+        return llm_response
+
+    def set(self, provider: str, model: str, system_message: str, prompt: str, params: Dict[str, Any], llm_response: Dict[str, Any]):
+        stored = {key: llm_response[key] for key in ("prompt", "response_text", "system_message", "costs")}
+        try:
+            value = json.dumps(stored, ensure_ascii=False).encode('utf-8')
+        except TypeError as e:
+            logging.warning(f"Could not cache {provider} response for model {model}: {e}")
+            return
+        self.disk_cache.set(self.make_key(provider, model, system_message, prompt, params), value)
+
+# Function to get the LLM cache configured in config.yaml, or None when disabled
+def get_llm_cache(cache_config: dict) -> Optional[LLMCache]:
+    if not cache_config or not cache_config.get('enabled', False):
+        return None
+    path = cache_config.get('path', 'data/cache/llm.sqlite')
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMCache(path, cache_config.get('max_size_mb', 512), cache_config.get('ttl_hours', 0))
+        return _caches[path]
@@ -3,6 +3,7 @@ from llm_base import LLMBase
 from utils.config_utils import load_config
 from openai_llm import OpenAILLM
 from vertex_llm import VertexLLM
+from local_llm import LocalLLM
 
 class LLMFactory:
     @staticmethod
@@ -11,6 +12,8 @@ class LLMFactory:
             return OpenAILLM(system_message, model_config)
         elif model_type == 'vertex':
             return VertexLLM(system_message, model_config)
+        elif model_type == 'local':
+            return LocalLLM(system_message, model_config)
         else:
             raise ValueError(f"Unsupported model type: {model_type}")
 
@@ -0,0 +1,116 @@
+# src/app/llm/local_llm.py
+
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from utils.rate_limit import RateLimiter, RetryPolicy, estimate_tokens
+from utils.metrics import MetricsRegistry
+from utils.simulation_utils import FaultInjector, LatencyModel, seeded_random
+from .llm_base import LLMBase
+
+# Words the simulated responses are made of
+VOCABULARY = (
+    "the answer context document page chunk model query result score relevant evidence "
+    "source retrieval embedding similarity passage based according shows indicates data "
+    "and of to in is that for with as on by this from are it be which not or"
+).split()
+
+class LocalLLM(LLMBase):
+    provider = "local"
+
+    def __init__(self, system_message: str, model_config: Dict[str, Any], cache: Optional[Any] = None, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, metrics: Optional[MetricsRegistry] = None):
+        """
+        Offline stand-in for a provider LLM. The response text and its token count are
+        derived from the model, system message and prompt, so the same request always
+        gets the same answer. Time to first token, generation speed and errors are
+        simulated as configured, so scheduling, caching and I/O run as with a live
+        provider.
+
+        Args:
+            system_message (str): The system message.
+            model_config (Dict[str, Any]): Model configuration: output_tokens {min, max},
+                ttft (latency distribution), tokens_per_second, error_rate, error_status_codes,
+                seed and prices.
+        """
+        self.system_message = system_message
+        self.model_config = model_config
+        self.prices = model_config.get('prices', {'input_token': 0.0, 'output_token': 0.0})
+        self.model = self.model_config['model']  # Store the current model in use
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
+        seed = model_config.get('seed')
+        self.ttft = LatencyModel.from_config(model_config.get('ttft'), seed)
+        self.tokens_per_second = model_config.get('tokens_per_second', 0)
+        self.faults = FaultInjector(model_config.get('error_rate', 0.0), model_config.get('error_status_codes', [429, 503]), seed)
+
+    def _call_llm(self, prompt: str) -> Dict[str, Any]:
+        logging.info(f"Calling local LLM {self.model}")
+        self.faults.maybe_fail(f"local LLM {self.model}")
+        words = self.generate_words(prompt)
+        time.sleep(self.ttft.sample() + self.generation_seconds(len(words)))
+        return self.build_llm_response(prompt, words)
+
+    async def _acall_llm(self, prompt: str) -> Dict[str, Any]:
+        logging.info(f"Calling local LLM {self.model} (async)")
+        self.faults.maybe_fail(f"local LLM {self.model}")
+        words = self.generate_words(prompt)
+        await asyncio.sleep(self.ttft.sample() + self.generation_seconds(len(words)))
+        return self.build_llm_response(prompt, words)
+
+    def _stream_llm(self, prompt: str, on_token: Callable[[str], None]) -> Dict[str, Any]:
+        logging.info(f"Calling local LLM {self.model} (streaming)")
+        self.faults.maybe_fail(f"local LLM {self.model}")
+        words = self.generate_words(prompt)
+        time.sleep(self.ttft.sample())
+        token_seconds = self.generation_seconds(1)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(token_seconds)
+            on_token(word if i == 0 else f" {word}")
+        return self.build_llm_response(prompt, words)
+
+    def generate_words(self, prompt: str) -> List[str]:
+        rng = seeded_random(self.model, self.system_message, prompt)
+        output_tokens = self.model_config.get('output_tokens', {})
+        count = rng.randint(output_tokens.get('min', 50), output_tokens.get('max', 300))
+        count = min(count, self.generation_params()['max_tokens'])
+        return [rng.choice(VOCABULARY) for _ in range(count)]
+
+    def generation_seconds(self, output_tokens: int) -> float:
+        return output_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def build_request(self, prompt: str) -> Dict[str, Any]:
+        messages = [
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": prompt}
+        ]
+        return {
+            "model": self.model,
+            "messages": messages,
+            **self.generation_params()
+        }
+
+    def build_llm_response(self, prompt: str, words: List[str]) -> Dict[str, Any]:
+        return {
+            "prompt": prompt,
+            "response_text": " ".join(words),
+            "system_message": self.system_message,
+            "response": None,
+            "costs": self.calculate_cost(estimate_tokens(f"{self.system_message or ''}{prompt}"), len(words))
+        }
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> Dict[str, float]:
+        input_cost = input_tokens * self.prices['input_token']
+        output_cost = output_tokens * self.prices['output_token']
+
+        return {
+            "input_cost": input_cost,
+            "output_cost": output_cost,
+            "total_cost": input_cost + output_cost,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
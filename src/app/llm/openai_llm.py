@@ -2,48 +2,116 @@
 
 import logging
 from openai import OpenAI
-from typing import Any, Dict
-from .llm_base import LLMBase
+from typing import Any, Callable, Dict, Optional
+from utils.rate_limit import RateLimiter, RetryPolicy, estimate_tokens
+from utils.metrics import MetricsRegistry
+from .llm_base import LLMBase, EmptyStreamError, StreamInterruptedError
 
 class OpenAILLM(LLMBase):
-    def __init__(self, system_message: str, model_config: Dict[str, Any]):
+    provider = "openai"
+
+    def __init__(self, system_message: str, model_config: Dict[str, Any], cache: Optional[Any] = None, client: Optional[OpenAI] = None, get_async_client: Optional[Callable[[], Any]] = None, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, metrics: Optional[MetricsRegistry] = None):
         self.system_message = system_message
         self.model_config = model_config
         self.prices = model_config['prices']
-        self.client = OpenAI(api_key=self.model_config['api_key'])
+        self.client = client or OpenAI(api_key=self.model_config['api_key'])
+        self.get_async_client = get_async_client  # Returns the shared async client of the running event loop (see app.registry)
         self.model = self.model_config['model']  # Store the current model in use
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
     
-    def call_llm(self, prompt: str) -> Dict[str, Any]:
+    def _call_llm(self, prompt: str) -> Dict[str, Any]:
         logging.info(f"Calling OpenAI LLM")
-        messages = [
-            {"role": "system", "content": self.system_message},
-            {"role": "user", "content": prompt}
-        ]
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.model_config.get('temperature', 0.7),
-                max_tokens=self.model_config.get('max_tokens', 1000)
-            )
+            response = self.client.chat.completions.create(**self.build_request(prompt))
+            logging.info("Received response from OpenAI LLM")
+            return self.build_llm_response(prompt, response)
+        except Exception as e:
+            logging.error(f"Error calling OpenAI LLM: {e}")
+            raise
+
+    async def _acall_llm(self, prompt: str) -> Dict[str, Any]:
+        logging.info(f"Calling OpenAI LLM (async)")
+        if self.get_async_client is None:
+            # Without a shared async client, the sync client runs in a thread
+            return await super()._acall_llm(prompt)
+        try:
+            response = await self.get_async_client().chat.completions.create(**self.build_request(prompt))
             logging.info("Received response from OpenAI LLM")
-            
-            llm_response = {
+            return self.build_llm_response(prompt, response)
+        except Exception as e:
+            logging.error(f"Error calling OpenAI LLM: {e}")
+            raise
+
+    def _stream_llm(self, prompt: str, on_token: Callable[[str], None]) -> Dict[str, Any]:
+        logging.info(f"Calling OpenAI LLM (streaming)")
+        try:
+            stream = self.client.chat.completions.create(**self.build_request(prompt), stream=True, stream_options={"include_usage": True})
+            text_parts = []
+            usage_chunk = None
+            finish_reason = None
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text_parts.append(chunk.choices[0].delta.content)
+                    on_token(chunk.choices[0].delta.content)
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                # The last chunk carries the token usage and no choices
+                if chunk.usage is not None:
+                    usage_chunk = chunk
+            response_text = "".join(text_parts)
+            if usage_chunk is not None:
+                costs = self.calculate_cost(usage_chunk)
+            elif not response_text:
+                raise EmptyStreamError(f"Stream from openai model {self.model} ended without a response")
+            elif finish_reason is None:
+                raise StreamInterruptedError(f"Stream from openai model {self.model} ended before the response was finished")
+            else:
+                # A proxy may drop stream_options, leaving a complete response without a usage chunk
+                logging.warning(f"Stream from openai model {self.model} carried no token usage; estimating the costs")
+                input_tokens = estimate_tokens(f"{self.system_message or ''}{prompt}")
+                costs = self.costs_for_tokens(input_tokens, estimate_tokens(response_text))
+            logging.info("Received streamed response from OpenAI LLM")
+            return {
                 "prompt": prompt,
-                "response_text": response.choices[0].message.content,
+                "response_text": response_text,
                 "system_message": self.system_message,
-                "response": response,
-                "costs": self.calculate_cost(response)
+                "response": usage_chunk,
+                "costs": costs
             }
-            return llm_response
         except Exception as e:
-            logging.error(f"Error calling OpenAI LLM: {e}")
+            logging.error(f"Error streaming OpenAI LLM: {e}")
             raise
+
+    def build_request(self, prompt: str) -> Dict[str, Any]:
+        messages = [
+            {"role": "system", "content": self.system_message},
+            {"role": "user", "content": prompt}
+        ]
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.model_config.get('temperature', 0.7),
+            "max_tokens": self.model_config.get('max_tokens', 1000)
+        }
+
+    def build_llm_response(self, prompt: str, response: Any) -> Dict[str, Any]:
+        return {
+            "prompt": prompt,
+            "response_text": response.choices[0].message.content,
+            "system_message": self.system_message,
+            "response": response,
+            "costs": self.calculate_cost(response)
+        }
     
     def calculate_cost(self, response: Any) -> Dict[str, float]:
-        total_tokens = response.usage.total_tokens
-        input_tokens = response.usage.prompt_tokens
-        output_tokens = response.usage.completion_tokens
+        return self.costs_for_tokens(response.usage.prompt_tokens, response.usage.completion_tokens, response.usage.total_tokens)
+
+    def costs_for_tokens(self, input_tokens: int, output_tokens: int, total_tokens: Optional[int] = None) -> Dict[str, float]:
+        if total_tokens is None:
+            total_tokens = input_tokens + output_tokens
 
         input_cost = input_tokens * self.prices['input_token']
         output_cost = output_tokens * self.prices['output_token']
@@ -3,10 +3,15 @@ import re
 import json
 import yaml
 from utils.hash_utils import generate_query_hash
+from app.results_store import get_results_store
+
+store = get_results_store()
 
 def read_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return file.read().strip()
+    return store.read_text(file_path).strip()
+
+def list_dirs(path, prefix=""):
+    return [d for d in store.listdir(path) if d.startswith(prefix) and store.isdir(os.path.join(path, d))]
 
 def extract_best_answer_id(response_text):
     match = re.search(r'ID da melhor resposta: (\S+)', response_text)
@@ -22,20 +27,19 @@ def extract_groundedness_result(response_text):
         return "UNKNOWN"
 
 def read_yaml(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return yaml.safe_load(file)
+    return yaml.safe_load(store.read_text(file_path))
 
 def process_evaluation_responses(evaluation_dir, experiments_dir):
     evaluation_results = {}
 
-    experiment_dirs = [d for d in os.listdir(evaluation_dir) if os.path.isdir(os.path.join(evaluation_dir, d)) and d.startswith("experiment_")]
+    experiment_dirs = list_dirs(evaluation_dir, "experiment_")
 
     for experiment_dir in experiment_dirs:
         experiment_path = os.path.join(evaluation_dir, experiment_dir)
-        response_files = [f for f in os.listdir(experiment_path) if f.startswith("llm_response_") and f.endswith(".txt")]
+        response_files = [f for f in store.listdir(experiment_path) if f.startswith("llm_response_") and f.endswith(".txt")]
 
         query_path = os.path.join(experiments_dir, experiment_dir, "query.txt")
-        query = read_file(query_path) if os.path.exists(query_path) else "Query not found"
+        query = read_file(query_path) if store.exists(query_path) else "Query not found"
 
         evaluation_results[experiment_dir] = {
             "query": query,
@@ -54,21 +58,21 @@ def process_evaluation_responses(evaluation_dir, experiments_dir):
                 }
 
         # Process experiment runs to include params
-        run_dirs = [d for d in os.listdir(os.path.join(experiments_dir, experiment_dir)) if d.startswith("experiment_")]
+        run_dirs = [d for d in store.listdir(os.path.join(experiments_dir, experiment_dir)) if d.startswith("experiment_")]
         for run_dir in run_dirs:
             params_path = os.path.join(experiments_dir, experiment_dir, run_dir, "params.yaml")
-            if os.path.exists(params_path):
+            if store.exists(params_path):
                 params = read_yaml(params_path)
                 evaluation_results[experiment_dir]["runs"][run_dir] = params
 
             # Process groundedness evaluations
             run_hash = generate_query_hash(evaluation_results[experiment_dir]["query"])
             base_groundedness_path = os.path.join(experiment_path, run_dir, run_hash)
-            if os.path.exists(base_groundedness_path):
-                embedding_llm_dirs = [d for d in os.listdir(base_groundedness_path) if os.path.isdir(os.path.join(base_groundedness_path, d))]
+            if store.exists(base_groundedness_path):
+                embedding_llm_dirs = list_dirs(base_groundedness_path)
                 for embedding_llm_dir in embedding_llm_dirs:
                     groundedness_path = os.path.join(base_groundedness_path, embedding_llm_dir)
-                    groundedness_files = [f for f in os.listdir(groundedness_path) if f.startswith("groundedness_evaluation_") and f.endswith(".txt")]
+                    groundedness_files = [f for f in store.listdir(groundedness_path) if f.startswith("groundedness_evaluation_") and f.endswith(".txt")]
                     for groundedness_file in groundedness_files:
                         groundedness_model = groundedness_file.split("groundedness_evaluation_")[1].split(".txt")[0]
                         groundedness_text = read_file(os.path.join(groundedness_path, groundedness_file))
@@ -1,14 +1,37 @@
 import os
 import sys
+import asyncio
 import logging
-from typing import List
-from .openai_llm import OpenAILLM
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from .run_prepare_prompts import read_all_evaluation_prompts
-from .vertex_llm import VertexLLM
-from .anthropic_llm import AnthropicLLM
 from utils.config_utils import load_config
+from app.registry import get_llm, get_batch_backend, get_evaluators
+from app.llm.batch import run_llm_batch
+from app.results_store import get_results_store
 
-def run_evaluators(evaluation_dir: str):
+# Function to send (llm, prompt) calls through acall_llm on one event loop with at most max_concurrency in flight,
+# passing each response to on_response(index, response) as it arrives and returning the responses in order.
+# A failed call is logged and returned as its exception, so it does not cancel the calls still in flight
+def call_llms_concurrently(calls: List[Tuple[Any, str]], max_concurrency: int, on_response: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    async def run_all():
+        slots = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(index, llm, prompt):
+            try:
+                async with slots:
+                    response = await llm.acall_llm(prompt)
+                if on_response is not None:
+                    on_response(index, response)
+            except Exception as e:
+                logging.error(f"LLM call {index + 1} of {len(calls)} failed: {e}")
+                raise
+            return response
+
+        return await asyncio.gather(*(run_one(index, llm, prompt) for index, (llm, prompt) in enumerate(calls)), return_exceptions=True)
+
+    return asyncio.run(run_all())
+
+def run_evaluators(evaluation_dir: str, use_cache: bool = True, batch: bool = False):
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)], force=True)
 
     # Load configuration
@@ -16,41 +39,50 @@ def run_evaluators(evaluation_dir: str):
     if config is None:
         raise SystemExit("Exiting due to missing configuration.")
 
-    # Function to instantiate evaluators based on the provider and model
-    def get_evaluator(provider: str, model_name: str):
-        logging.info(f"Selecting evaluator for provider: {provider}, model: {model_name}")
-        model_config = config['llm']['providers'][provider]['llm_models'][model_name]
-        if provider == "openai":
-            return OpenAILLM(config['llm']['evaluator']['system_message'], model_config)
-        elif provider == "vertex":
-            return VertexLLM(config['llm']['evaluator']['system_message'], model_config)
-        elif provider == "anthropic":
-            return AnthropicLLM(config['llm']['evaluator']['system_message'], model_config)
-        else:
-            logging.error(f"Unsupported LLM provider: {provider}")
-            raise ValueError(f"Unsupported LLM provider: {provider}")
-
-    # Define the providers and models you want to evaluate
-    evaluators = {
-        "vertex": ["gemini-1.5-pro-001"],
-        "openai": ["gpt-4o-2024-05-13"],
-        "anthropic": ["claude-3-5-sonnet-20240620"]
+    # The providers and models to evaluate with (llm.evaluators in config.yaml)
+    evaluators = get_evaluators()
+
+    # Build each evaluator once; every prompt reuses its client
+    evaluator_llms = {
+        (provider, model_name): get_llm(provider, model_name, "evaluator", use_cache)
+        for provider, models in evaluators.items()
+        for model_name in models
     }
 
     all_prompts = read_all_evaluation_prompts(evaluation_dir)
+    store = get_results_store(config.get('results', {}))
+
+    if batch:
+        # Submit every pending prompt at once and write the responses when the batches finish
+        requests = [{
+            "custom_id": f"request-{len(evaluator_llms) * index + offset}",
+            "llm": evaluator,
+            "prompt": evaluation["prompt"],
+            "output_file": os.path.join(evaluation_dir, evaluation["experiment_dir"], f"llm_response_{provider}_{model_name}.txt")
+        } for index, evaluation in enumerate(all_prompts) for offset, ((provider, model_name), evaluator) in enumerate(evaluator_llms.items())]
+        batch_config = config['llm'].get('batch', {})
+        results = run_llm_batch(requests, os.path.join(evaluation_dir, "batches", "evaluation"), get_batch_backend, batch_config.get('poll_interval_seconds', 30), store)
+        failed = sum(1 for result in results.values() if result["error"] is not None)
+        print(f"Batch evaluation finished: {len(requests) - failed} responses written, {failed} failed")
+        return
+
+    # Every prompt goes to every evaluator, with the calls running concurrently (llm.evaluator_concurrency)
+    calls = [(evaluation, provider, model_name) for evaluation in all_prompts for (provider, model_name) in evaluator_llms]
+
+    def save_response(index: int, response: Dict[str, Any]):
+        evaluation, provider, model_name = calls[index]
+        response_file = os.path.join(evaluation_dir, evaluation["experiment_dir"], f"llm_response_{provider}_{model_name}.txt")
+        store.write_text(response_file, response["response_text"])
+
+    responses = call_llms_concurrently([(evaluator_llms[(provider, model_name)], evaluation["prompt"]) for evaluation, provider, model_name in calls], config['llm'].get('evaluator_concurrency', 8), save_response)
+
+    experiment_dir = None
+    for (evaluation, provider, model_name), response in zip(calls, responses):
+        if evaluation["experiment_dir"] != experiment_dir:
+            experiment_dir = evaluation["experiment_dir"]
+            print(f"Prompt from {experiment_dir}:\n")
+        print(f"==== {provider.capitalize()} ({model_name}) Evaluation ====")
+        print(f"Failed: {response}" if isinstance(response, Exception) else response["response_text"])
 
-    for evaluation in all_prompts:
-        experiment_dir = evaluation["experiment_dir"]
-        prompt = evaluation["prompt"]
-        
-        print(f"Prompt from {experiment_dir}:\n")
-
-        for provider, models in evaluators.items():
-            for model_name in models:
-                evaluator = get_evaluator(provider, model_name)
-                response = evaluator.call_llm(prompt)
-                response_file = os.path.join(evaluation_dir, experiment_dir, f"llm_response_{provider}_{model_name}.txt")
-                with open(response_file, 'w') as f:
-                    f.write(response["response_text"])
-                print(f"==== {provider.capitalize()} ({model_name}) Evaluation ====")
-                print(response["response_text"])
+    failed = sum(1 for response in responses if isinstance(response, Exception))
+    print(f"Evaluation finished: {len(responses) - failed} responses written, {failed} failed")
@@ -3,14 +3,15 @@
 import os
 import sys
 import logging
-from typing import List, Dict
-from app.llm.openai_llm import OpenAILLM
-from app.llm.vertex_llm import VertexLLM
-from app.llm.anthropic_llm import AnthropicLLM
+from typing import Any, List, Dict
 from app.llm.run_prepare_prompts import read_file
 from utils.config_utils import load_config
+from app.registry import get_llm, get_batch_backend, get_evaluators
+from app.llm.batch import run_llm_batch
+from app.llm.run_evaluators import call_llms_concurrently
+from app.results_store import get_results_store
 
-def run_groundedness_evaluators(evaluation_dir: str):
+def run_groundedness_evaluators(evaluation_dir: str, use_cache: bool = True, batch: bool = False):
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)], force=True)
 
     # Load configuration
@@ -18,57 +19,66 @@ def run_groundedness_evaluators(evaluation_dir: str):
     if config is None:
         raise SystemExit("Exiting due to missing configuration.")
 
-    # Define the providers and models you want to evaluate
-    evaluators = {
-        "vertex": ["gemini-1.5-pro-001"],
-        "openai": ["gpt-4o-2024-05-13"],
-        "anthropic": ["claude-3-5-sonnet-20240620"]
-    }
-
-    def instantiate_evaluator(provider: str, model_name: str):
-        model_config = config['llm']['providers'][provider]['llm_models'][model_name]
-        if provider == "openai":
-            return OpenAILLM(config['llm']['groundedness_evaluator'].get('system_message'), model_config)
-        elif provider == "vertex":
-            return VertexLLM(config['llm']['groundedness_evaluator'].get('system_message'), model_config)
-        elif provider == "anthropic":
-            return AnthropicLLM(config['llm']['groundedness_evaluator'].get('system_message'), model_config)
-        else:
-            logging.error(f"Unsupported LLM provider: {provider}")
-            raise ValueError(f"Unsupported LLM provider: {provider}")
+    # The providers and models to evaluate with (llm.evaluators in config.yaml)
+    evaluators = get_evaluators()
+    store = get_results_store(config.get('results', {}))
 
     def read_all_groundedness_prompts(evaluation_dir: str) -> List[Dict[str, str]]:
         all_prompts = []
-        for root, dirs, files in os.walk(evaluation_dir):
-            for file in files:
-                if file.startswith("groundedness_prompt_") and file.endswith(".txt"):
-                    model = file.split("groundedness_prompt_")[1].split(".txt")[0]
-                    prompt = read_file(os.path.join(root, file))
-                    experiment_dir = os.path.relpath(root, evaluation_dir)
-                    all_prompts.append({
-                        "experiment_dir": experiment_dir,
-                        "model": model,
-                        "prompt": prompt
-                    })
+        for path in store.iter_files(evaluation_dir):
+            root, file = os.path.split(path)
+            if file.startswith("groundedness_prompt_") and file.endswith(".txt"):
+                model = file.split("groundedness_prompt_")[1].split(".txt")[0]
+                prompt = read_file(path, store)
+                experiment_dir = os.path.relpath(root, evaluation_dir)
+                all_prompts.append({
+                    "experiment_dir": experiment_dir,
+                    "model": model,
+                    "prompt": prompt
+                })
         return all_prompts
 
+    # Build each evaluator once; every prompt reuses its client
+    evaluator_llms = {
+        (provider, model_name): get_llm(provider, model_name, "groundedness_evaluator", use_cache)
+        for provider, models in evaluators.items()
+        for model_name in models
+    }
+
     all_prompts = read_all_groundedness_prompts(evaluation_dir)
 
-    for evaluation in all_prompts:
-        experiment_dir = evaluation["experiment_dir"]
-        model = evaluation["model"]
-        prompt = evaluation["prompt"]
+    if batch:
+        # Submit every pending prompt at once and write the responses when the batches finish
+        requests = [{
+            "custom_id": f"request-{len(evaluator_llms) * index + offset}",
+            "llm": evaluator,
+            "prompt": evaluation["prompt"],
+            "output_file": os.path.join(evaluation_dir, evaluation["experiment_dir"], f"groundedness_evaluation_{provider}_{model_name}.txt")
+        } for index, evaluation in enumerate(all_prompts) for offset, ((provider, model_name), evaluator) in enumerate(evaluator_llms.items())]
+        batch_config = config['llm'].get('batch', {})
+        results = run_llm_batch(requests, os.path.join(evaluation_dir, "batches", "groundedness"), get_batch_backend, batch_config.get('poll_interval_seconds', 30), store)
+        failed = sum(1 for result in results.values() if result["error"] is not None)
+        print(f"Batch groundedness evaluation finished: {len(requests) - failed} responses written, {failed} failed")
+        return
+
+    # Every prompt goes to every evaluator, with the calls running concurrently (llm.evaluator_concurrency)
+    calls = [(evaluation, provider, model_name) for evaluation in all_prompts for (provider, model_name) in evaluator_llms]
+
+    def save_response(index: int, response: Dict[str, Any]):
+        evaluation, provider, model_name = calls[index]
+        response_file = os.path.join(evaluation_dir, evaluation["experiment_dir"], f"groundedness_evaluation_{provider}_{model_name}.txt")
+        store.write_text(response_file, response["response_text"])
+
+    responses = call_llms_concurrently([(evaluator_llms[(provider, model_name)], evaluation["prompt"]) for evaluation, provider, model_name in calls], config['llm'].get('evaluator_concurrency', 8), save_response)
 
-        print("="*80)
-        print(f"Prompt from {experiment_dir} for model {model}:\n")
+    current = None
+    for (evaluation, provider, model_name), response in zip(calls, responses):
+        if evaluation is not current:
+            current = evaluation
+            print("="*80)
+            print(f"Prompt from {evaluation['experiment_dir']} for model {evaluation['model']}:\n")
+        print(f"==== Groundedness Evaluation ({provider}_{model_name}) ====")
+        print(f"Failed: {response}" if isinstance(response, Exception) else response["response_text"])
 
-        for provider, models in evaluators.items():
-            for model_name in models:
-                evaluator = instantiate_evaluator(provider, model_name)
-                response = evaluator.call_llm(prompt)
-                response_file = os.path.join(evaluation_dir, experiment_dir, f"groundedness_evaluation_{provider}_{model_name}.txt")
-                os.makedirs(os.path.dirname(response_file), exist_ok=True)
-                with open(response_file, 'w') as f:
-                    f.write(response["response_text"])
-                print(f"==== Groundedness Evaluation ({provider}_{model_name}) ====")
-                print(response["response_text"])
+    failed = sum(1 for response in responses if isinstance(response, Exception))
+    print(f"Groundedness evaluation finished: {len(responses) - failed} responses written, {failed} failed")
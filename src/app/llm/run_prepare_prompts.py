@@ -1,19 +1,25 @@
 # src/app/llm/run_prepare_prompts.py
 
 import os
+from app.results_store import get_results_store
 
-def read_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return file.read().strip()
+def read_file(file_path, store=None):
+    store = store or get_results_store()
+    return store.read_text(file_path).strip()
+
+# Lists the subdirectories of a results directory whose names start with prefix
+def list_dirs(store, path, prefix=""):
+    return [d for d in store.listdir(path) if d.startswith(prefix) and store.isdir(os.path.join(path, d))]
 
 def read_all_evaluation_prompts(evaluation_dir):
-    evaluation_dirs = [d for d in os.listdir(evaluation_dir) if os.path.isdir(os.path.join(evaluation_dir, d)) and d.startswith("experiment_")]
+    store = get_results_store()
+    evaluation_dirs = list_dirs(store, evaluation_dir, "experiment_")
     all_prompts = []
 
     for experiment_dir in evaluation_dirs:
         prompt_file = os.path.join(evaluation_dir, experiment_dir, "evaluation_prompt.txt")
-        if os.path.exists(prompt_file):
-            prompt_text = read_file(prompt_file)
+        if store.exists(prompt_file):
+            prompt_text = read_file(prompt_file, store)
             all_prompts.append({
                 "experiment_dir": experiment_dir,
                 "prompt": prompt_text
@@ -21,53 +27,53 @@ def read_all_evaluation_prompts(evaluation_dir):
 
     return all_prompts
 
-def prepare_prompt(base_dir, experiment_dir):
+def prepare_prompt(base_dir, experiment_dir, store=None):
+    store = store or get_results_store()
+
     # Read the main query
     query_file = os.path.join(base_dir, "query.txt")
-    query_text = read_file(query_file)
+    query_text = read_file(query_file, store)
 
     prompt = f"Questão (id: {experiment_dir}):\n{query_text}\n\n"
-    run_dirs = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d)) and d.startswith("experiment_")]
+    run_dirs = list_dirs(store, base_dir, "experiment_")
 
     response_id = 1
     for run_dir in run_dirs:
         run_path = os.path.join(base_dir, run_dir)
-        sub_dirs = [d for d in os.listdir(run_path) if os.path.isdir(os.path.join(run_path, d))]
+        sub_dirs = list_dirs(store, run_path)
 
         for sub_dir in sub_dirs:
             sub_path = os.path.join(run_path, sub_dir)
-            inner_dirs = [d for d in os.listdir(sub_path) if os.path.isdir(os.path.join(sub_path, d))]
+            inner_dirs = list_dirs(store, sub_path)
 
             for inner_dir in inner_dirs:
                 inner_path = os.path.join(sub_path, inner_dir)
-                response_files = [f for f in os.listdir(inner_path) if f.startswith("llm_response_") and f.endswith(".txt")]
+                response_files = [f for f in store.listdir(inner_path) if f.startswith("llm_response_") and f.endswith(".txt")]
 
                 for response_file in response_files:
-                    response_text = read_file(os.path.join(inner_path, response_file))
+                    response_text = read_file(os.path.join(inner_path, response_file), store)
                     prompt += f"Resposta {response_id} (id: {run_dir}):\n{response_text}\n\n"
                     response_id += 1
 
     return prompt
 
 def process_experiments(data_dir):
-    experiment_dirs = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)) and d.startswith("experiment_")]
+    store = get_results_store()
+    experiment_dirs = list_dirs(store, data_dir, "experiment_")
 
     for experiment_dir in experiment_dirs:
         base_dir = os.path.join(data_dir, experiment_dir)
-        prompt = prepare_prompt(base_dir, experiment_dir)
+        prompt = prepare_prompt(base_dir, experiment_dir, store)
 
         evaluation_dir = os.path.join("data", "evaluations", experiment_dir)
-        os.makedirs(evaluation_dir, exist_ok=True)
-
         prompt_file = os.path.join(evaluation_dir, "evaluation_prompt.txt")
-        with open(prompt_file, 'w', encoding='utf-8') as file:
-            file.write(prompt)
+        store.write_text(prompt_file, prompt)
 
         print(f"Prompt saved to {prompt_file}")
 
-def prepare_groundedness_prompt(prompt_file, response_file):
-    context = read_file(prompt_file)
-    response = read_file(response_file)
+def prepare_groundedness_prompt(prompt_file, response_file, store=None):
+    context = read_file(prompt_file, store)
+    response = read_file(response_file, store)
 
     evaluation_prompt = (
         f"Instruções de Avaliação:\n\n"
@@ -82,33 +88,32 @@ def prepare_groundedness_prompt(prompt_file, response_file):
     return evaluation_prompt
 
 def process_experiments_for_groundedness(data_dir):
-    experiment_dirs = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)) and d.startswith("experiment_")]
+    store = get_results_store()
+    experiment_dirs = list_dirs(store, data_dir, "experiment_")
 
     for experiment_dir in experiment_dirs:
         base_dir = os.path.join(data_dir, experiment_dir)
 
-        run_dirs = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d)) and d.startswith("experiment_")]
+        run_dirs = list_dirs(store, base_dir, "experiment_")
 
         for run_dir in run_dirs:
             run_path = os.path.join(base_dir, run_dir)
-            sub_dirs = [d for d in os.listdir(run_path) if os.path.isdir(os.path.join(run_path, d))]
+            sub_dirs = list_dirs(store, run_path)
 
             for sub_dir in sub_dirs:
                 sub_path = os.path.join(run_path, sub_dir)
-                inner_dirs = [d for d in os.listdir(sub_path) if os.path.isdir(os.path.join(sub_path, d))]
+                inner_dirs = list_dirs(store, sub_path)
 
                 for inner_dir in inner_dirs:
                     inner_path = os.path.join(sub_path, inner_dir)
-                    prompt_files = [f for f in os.listdir(inner_path) if f.startswith("prompt_") and f.endswith(".txt")]
+                    prompt_files = [f for f in store.listdir(inner_path) if f.startswith("prompt_") and f.endswith(".txt")]
                     
                     for prompt_file in prompt_files:
                         model = prompt_file.split("prompt_")[1].split(".txt")[0]
                         response_file = os.path.join(inner_path, f"llm_response_{model}.txt")
-                        if os.path.exists(response_file):
-                            evaluation_prompt = prepare_groundedness_prompt(os.path.join(inner_path, prompt_file), response_file)
+                        if store.exists(response_file):
+                            evaluation_prompt = prepare_groundedness_prompt(os.path.join(inner_path, prompt_file), response_file, store)
                             evaluation_dir = os.path.join("data", "evaluations", experiment_dir, run_dir, sub_dir, inner_dir)
-                            os.makedirs(evaluation_dir, exist_ok=True)
                             groundedness_prompt_file = os.path.join(evaluation_dir, f"groundedness_prompt_{model}.txt")
-                            with open(groundedness_prompt_file, 'w', encoding='utf-8') as file:
-                                file.write(evaluation_prompt)
+                            store.write_text(groundedness_prompt_file, evaluation_prompt)
                             print(f"Groundedness prompt saved to {groundedness_prompt_file}")
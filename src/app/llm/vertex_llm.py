@@ -8,48 +8,107 @@ from vertexai.generative_models import (
     HarmBlockThreshold,
     HarmCategory,
 )
-from typing import Any, Dict
-from .llm_base import LLMBase
+from typing import Any, Callable, Dict, Optional
+from utils.rate_limit import RateLimiter, RetryPolicy
+from utils.metrics import MetricsRegistry
+from .llm_base import LLMBase, EmptyStreamError
 
 class VertexLLM(LLMBase):
-    def __init__(self, system_message: str, model_config: Dict[str, Any]):
+    provider = "vertex"
+
+    def __init__(self, system_message: str, model_config: Dict[str, Any], cache: Optional[Any] = None, client: Optional[GenerativeModel] = None, rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None, metrics: Optional[MetricsRegistry] = None):
         self.system_message = system_message
         self.model_config = model_config
         self.prices = model_config['prices']
-        aiplatform.init(project=model_config['project_id'], location=model_config['location'])
-        self.client = GenerativeModel(model_config['model'], system_instruction=[self.system_message])
+        if client is None:
+            aiplatform.init(project=model_config['project_id'], location=model_config['location'])
+            client = GenerativeModel(model_config['model'], system_instruction=[self.system_message])
+        self.client = client
         self.model = self.model_config['model']  # Store the current model in use
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.metrics = metrics
     
-    def call_llm(self, prompt: str) -> Dict[str, Any]:
+    def _call_llm(self, prompt: str) -> Dict[str, Any]:
         logging.info(f"Calling Vertex LLM")
         try:
-            response = self.client.generate_content(
-                contents=[prompt],
-                generation_config=GenerationConfig(
-                    temperature=self.model_config.get('temperature', 0.7),
-                    max_output_tokens=self.model_config.get('max_output_tokens', 1000)
-                ),
-                stream=False,
-                safety_settings=self.model_config.get('safety_settings', {
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
-                })
-            )
+            response = self.client.generate_content(**self.build_request(prompt))
             logging.info("Received response from Vertex LLM")
-            
-            llm_response = {
+            return self.build_llm_response(prompt, response)
+        except Exception as e:
+            logging.error(f"Error calling Vertex LLM: {e}")
+            raise
+
+    async def _acall_llm(self, prompt: str) -> Dict[str, Any]:
+        logging.info(f"Calling Vertex LLM (async)")
+        try:
+            response = await self.client.generate_content_async(**self.build_request(prompt))
+            logging.info("Received response from Vertex LLM")
+            return self.build_llm_response(prompt, response)
+        except Exception as e:
+            logging.error(f"Error calling Vertex LLM: {e}")
+            raise
+
+    def _stream_llm(self, prompt: str, on_token: Callable[[str], None]) -> Dict[str, Any]:
+        logging.info(f"Calling Vertex LLM (streaming)")
+        try:
+            request = self.build_request(prompt)
+            request["stream"] = True
+            text_parts = []
+            response = None
+            for response in self.client.generate_content(**request):
+                for candidate in response.candidates[:1]:
+                    for part in candidate.content.parts:
+                        if part.text:
+                            text_parts.append(part.text)
+                            on_token(part.text)
+            if response is None:
+                # An empty stream (e.g. a blocked prompt) has no response to take the usage metadata from
+                raise EmptyStreamError(f"Stream from vertex model {self.model} ended without a response")
+            logging.info("Received streamed response from Vertex LLM")
+            # The last streamed response carries the usage metadata of the whole call
+            return {
                 "prompt": prompt,
-                "response_text": response.candidates[0].content.parts[0].text,
+                "response_text": "".join(text_parts),
                 "system_message": self.client._system_instruction,
                 "response": response,
                 "costs": self.calculate_cost(response, len(prompt))
             }
-            return llm_response
         except Exception as e:
-            logging.error(f"Error calling Vertex LLM: {e}")
+            logging.error(f"Error streaming Vertex LLM: {e}")
             raise
+
+    def build_request(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "contents": [prompt],
+            "generation_config": GenerationConfig(
+                temperature=self.model_config.get('temperature', 0.7),
+                max_output_tokens=self.model_config.get('max_output_tokens', 1000)
+            ),
+            "stream": False,
+            "safety_settings": self.model_config.get('safety_settings', {
+                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
+            })
+        }
+
+    def generation_params(self) -> Dict[str, Any]:
+        return {
+            "temperature": self.model_config.get('temperature', 0.7),
+            "max_tokens": self.model_config.get('max_output_tokens', 1000)
+        }
+
+    def build_llm_response(self, prompt: str, response: Any) -> Dict[str, Any]:
+        return {
+            "prompt": prompt,
+            "response_text": response.candidates[0].content.parts[0].text,
+            "system_message": self.client._system_instruction,
+            "response": response,
+            "costs": self.calculate_cost(response, len(prompt))
+        }
     
     def calculate_cost(self, response: Any, prompt_length: int) -> Dict[str, float]:
         total_tokens = response.usage_metadata.total_token_count
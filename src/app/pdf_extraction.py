@@ -0,0 +1,23 @@
+# src/app/pdf_extraction.py
+
+import os
+import fitz  # PyMuPDF for PDF handling
+from typing import Any, Dict, List, Tuple
+
+# Extraction worker functions. Worker processes are spawned and import this module to
+# unpickle their tasks, so it stays free of the provider SDKs that app.process_docs loads.
+
+# Function to extract the text of pages [start_page, end_page) with its own PyMuPDF document
+def extract_page_range(pdf_path: str, start_page: int, end_page: int) -> List[Dict[str, Any]]:
+    pdf_document = fitz.open(pdf_path)
+    text_data = []
+    for page_num in range(start_page, end_page):
+        page = pdf_document.load_page(page_num)
+        text = page.get_text("text")
+        text_data.append({'file_name': os.path.basename(pdf_path), 'page_num': page_num + 1, 'text': text})
+    pdf_document.close()
+    return text_data
+
+# Function to extract a page range, returning it with the path of its PDF
+def extract_tagged_page_range(pdf_path: str, start_page: int, end_page: int) -> Tuple[str, List[Dict[str, Any]]]:
+    return pdf_path, extract_page_range(pdf_path, start_page, end_page)
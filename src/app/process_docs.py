@@ -1,11 +1,23 @@
 import os
 import fitz  # PyMuPDF for PDF handling
+import itertools
 import pandas as pd
 import logging
-from typing import List, Dict, Any
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from utils.config_utils import load_config
-from app.embeddings.openai_embeddings import OpenAIEmbeddingGenerator
-from app.embeddings.vertex_embeddings import VertexEmbeddingGenerator
+from app.registry import get_embedding_generator
+from utils.hash_utils import generate_file_hash
+from utils.pipeline_utils import ordered_map, prefetch
+from app.ingest_manifest import IngestManifest
+from app.pdf_extraction import extract_tagged_page_range
+from app.chunking import TokenChunker, get_tokenizer
+from app.retrieval.ivf_index import build_ivf_index
+from app.retrieval.quantized_search import quantize_store
+from app.embeddings.embedding_store import EmbeddingStoreWriter, STORE_SUFFIX
+
+CSV_COLUMNS = ['file_name', 'page_num', 'chunk_number', 'chunk_text', 'embedding']
 
 # Load configuration
 config = load_config()
@@ -14,31 +26,42 @@ if config is None:
     logging.error("Configuration could not be loaded. Please check the config.yaml file.")
     raise SystemExit("Exiting due to missing configuration.")
 
-# Function to select embedding generator
-def get_embedding_generator(model: str):
-    logging.debug(f"Selecting embedding generator for model: {model}")
-    if model == "openai":
-        openai_config = config['embeddings']['models']['openai']
-        return OpenAIEmbeddingGenerator(api_key=openai_config['api_key'], model=openai_config['model'])
-    elif model == "vertex":
-        vertex_config = config['embeddings']['models']['vertex']
-        return VertexEmbeddingGenerator(project_id=vertex_config['project_id'], location=vertex_config['location'])
-    else:
-        raise ValueError(f"Unsupported embedding model: {model}")
+# Function to build the process pool used for PDF text extraction, or None to extract in-process
+def get_extraction_executor(workers: int = None) -> Optional[ProcessPoolExecutor]:
+    if workers is None:
+        workers = config.get('ingest', {}).get('extraction_workers', 0) or os.cpu_count()
+    if workers <= 1:
+        return None
+    logging.info(f"Extracting PDF text with {workers} worker processes")
+    # Spawned, not forked: the prefetch and embedding threads may hold locks a forked child would inherit
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
 
-# Function to extract text from a PDF
-def extract_text_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
-    logging.info(f"Extracting text from {pdf_path}")
-    pdf_document = fitz.open(pdf_path)
-    text_data = []
+# Function to split the pages of each PDF into page range extraction tasks
+def generate_page_range_tasks(pdf_paths: List[str], pages_per_task: int, first_pages: Dict[str, int] = None) -> Iterator[Tuple[str, int, int]]:
+    first_pages = first_pages or {}
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as pdf_document:
+            page_count = len(pdf_document)
+        first_page = min(first_pages.get(pdf_path, 0), page_count)
+        # Empty PDFs still get one (empty) task so they produce an output
+        for start_page in range(first_page, max(page_count, first_page + 1), pages_per_task):
+            yield pdf_path, start_page, min(start_page + pages_per_task, page_count)
 
-    for page_num in range(len(pdf_document)):
-        page = pdf_document.load_page(page_num)
-        text = page.get_text("text")
-        text_data.append({'file_name': os.path.basename(pdf_path), 'page_num': page_num + 1, 'text': text})
+# Function to extract the page ranges of several PDFs in order, parallelizing across files and page ranges
+def iter_pdf_page_ranges(pdf_paths: List[str], executor: Optional[ProcessPoolExecutor] = None, pages_per_task: int = None, first_pages: Dict[str, int] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    ingest_config = config.get('ingest', {})
+    if pages_per_task is None:
+        pages_per_task = ingest_config.get('pages_per_task', 32)
+    tasks = generate_page_range_tasks(pdf_paths, pages_per_task, first_pages)
+    if executor is None:
+        return (extract_tagged_page_range(*task) for task in tasks)
+    max_pending = 2 * (ingest_config.get('extraction_workers', 0) or os.cpu_count())
+    return ordered_map(executor, extract_tagged_page_range, tasks, max_pending=max_pending)
 
-    logging.info(f"Extracted {len(text_data)} pages from {pdf_path}")
-    return text_data
+# Function to extract the pages of several PDFs, yielding each PDF with a lazy iterator over its pages
+def extract_texts_from_pdfs(pdf_paths: List[str], executor: Optional[ProcessPoolExecutor] = None, first_pages: Dict[str, int] = None) -> Iterator[Tuple[str, Iterator[Dict[str, Any]]]]:
+    for pdf_path, page_ranges in itertools.groupby(iter_pdf_page_ranges(pdf_paths, executor, first_pages=first_pages), key=lambda page_range: page_range[0]):
+        yield pdf_path, (page for _, pages in page_ranges for page in pages)
 
 # Function to generate text chunks
 def generate_chunks(text: str, chunk_size: int = None) -> List[str]:
@@ -50,47 +73,127 @@ def generate_chunks(text: str, chunk_size: int = None) -> List[str]:
     logging.info(f"Generated {len(chunks)} chunks of text")
     return chunks
 
-# Function to process a PDF and return a DataFrame with text and embeddings
-def process_pdf(pdf_path: str, chunk_size: int = None, model: str = None) -> pd.DataFrame:
+# Function to turn a stream of pages into a stream of chunk records
+def iter_chunks(pages: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[Dict[str, Any]]:
+    chunking_config = config['embeddings'].get('chunking', {})
+    if chunking_config.get('strategy', 'words') == "tokens":
+        chunker = TokenChunker(
+            get_tokenizer(chunking_config.get('tokenizer', 'cl100k_base')),
+            chunk_size,
+            overlap=chunking_config.get('overlap', 0),
+            cross_page=chunking_config.get('cross_page', False)
+        )
+        yield from chunker.iter_chunks(pages)
+        return
+
+    for page in pages:
+        chunks = generate_chunks(page['text'], chunk_size=chunk_size)
+        for chunk_num, chunk_text in enumerate(chunks):
+            yield {
+                'file_name': page['file_name'],
+                'page_num': page['page_num'],
+                'chunk_number': chunk_num + 1,
+                'chunk_text': chunk_text
+            }
+
+# Function to embed a stream of chunk records in windows, yielding each window with its embeddings
+def iter_embedded_windows(chunks: Iterable[Dict[str, Any]], embedding_generator, window_size: int) -> Iterator[Tuple[List[Dict[str, Any]], List[List[float]]]]:
+    chunk_iterator = iter(chunks)
+    while True:
+        window = list(itertools.islice(chunk_iterator, window_size))
+        if not window:
+            return
+        logging.debug(f"Generating embeddings for a window of {len(window)} chunks")
+        embeddings = embedding_generator.generate_batch([chunk['chunk_text'] for chunk in window])
+        yield window, embeddings
+
+# Function to run the page -> chunk -> embed pipeline for a PDF, with bounded queues between stages
+def stream_pdf(pdf_path: str, chunk_size: int = None, model: str = None, pages: Iterable[Dict[str, Any]] = None, resume_after: Tuple[int, int] = None) -> Iterator[Tuple[List[Dict[str, Any]], List[List[float]]]]:
     if model is None:
         model = config['embeddings']['default']
     if chunk_size is None:
         chunk_size = config['embeddings']['models'][model]['chunk_size']
+    ingest_config = config.get('ingest', {})
+    queue_size = ingest_config.get('queue_size', 4)
 
     logging.info(f"Processing PDF: {pdf_path} with model: {model} and chunk_size: {chunk_size}")
     embedding_generator = get_embedding_generator(model)
-    text_data = extract_text_from_pdf(pdf_path)
-    all_chunks = []
+    if pages is None:
+        pages = (page for _, page_range in iter_pdf_page_ranges([pdf_path]) for page in page_range)
 
-    for page in text_data:
-        chunks = generate_chunks(page['text'], chunk_size=chunk_size)
-        for chunk_num, chunk_text in enumerate(chunks):
-            logging.debug(f"Generating embedding for chunk {chunk_num + 1} on page {page['page_num']}")
-            embedding = embedding_generator.generate(chunk_text)
-            all_chunks.append({
-                'file_name': page['file_name'],
-                'page_num': page['page_num'],
-                'chunk_number': chunk_num + 1,
-                'chunk_text': chunk_text,
-                'embedding': embedding
-            })
+    # Extraction and embedding each run ahead of their consumer by at most queue_size items
+    chunks = iter_chunks(prefetch(pages, queue_size), chunk_size)
+    if resume_after is not None:
+        # Drop the chunks already committed by an interrupted run
+        chunks = (chunk for chunk in chunks if (chunk['page_num'], chunk['chunk_number']) > resume_after)
+    return prefetch(iter_embedded_windows(chunks, embedding_generator, ingest_config.get('embedding_window', 1024)), queue_size)
+
+class CsvChunkWriter:
+    def __init__(self, output_path: str, checkpoint: Dict[str, Any] = None):
+        """
+        Incrementally writes processed chunks, with their embeddings, to a CSV file.
+        When a checkpoint is given, the file is truncated back to it and appended to.
+        """
+        self.output_path = output_path
+        self.count = 0
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if checkpoint is not None:
+            os.truncate(output_path, checkpoint['csv_bytes'])
+            self.count = checkpoint['rows']
+            self.output_file = open(output_path, 'a', encoding='utf-8', newline='')
+            logging.info(f"Resuming {output_path} at {self.count} chunks")
+        else:
+            self.output_file = open(output_path, 'w', encoding='utf-8', newline='')
+            pd.DataFrame(columns=CSV_COLUMNS).to_csv(self.output_file, index=False)
+
+    def append(self, records: List[Dict[str, Any]], embeddings: List[List[float]]):
+        df = pd.DataFrame(records, columns=CSV_COLUMNS[:-1])
+        df['embedding'] = [list(embedding) for embedding in embeddings]
+        df.to_csv(self.output_file, header=False, index=False)
+        self.count += len(records)
+
+    def flush(self):
+        self.output_file.flush()
 
-    logging.info(f"Processed {len(all_chunks)} chunks for PDF: {pdf_path}")
-    df_chunks = pd.DataFrame(all_chunks)
-    return df_chunks
+    def checkpoint(self) -> Dict[str, Any]:
+        self.flush()
+        return {"rows": self.count, "csv_bytes": os.fstat(self.output_file.fileno()).st_size}
 
-# Function to save DataFrame to CSV with model suffix
-def save_to_csv(df: pd.DataFrame, output_path: str, model: str):
-    output_path = f"{os.path.splitext(output_path)[0]}_{model}.csv"
+    def close(self):
+        self.output_file.close()
+        logging.info(f"Data saved successfully to {self.output_path} with {self.count} chunks")
+
+# Function to derive the output path for the given format, with model suffix
+def get_output_path(output_path: str, model: str, output_format: str) -> str:
+    if output_format == "store":
+        return f"{os.path.splitext(output_path)[0]}_{model}{STORE_SUFFIX}"
+    return f"{os.path.splitext(output_path)[0]}_{model}.csv"
+
+# Function to open an incremental writer for the given output format, optionally resuming from a checkpoint
+def open_chunk_writer(output_path: str, model: str, output_format: str, checkpoint: Dict[str, Any] = None):
+    output_path = get_output_path(output_path, model, output_format)
     logging.info(f"Saving processed data to {output_path}")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df.to_csv(output_path, index=False)
-    logging.info(f"Data saved successfully to {output_path}")
+    if output_format == "store":
+        return EmbeddingStoreWriter(output_path, model, checkpoint)
+    return CsvChunkWriter(output_path, checkpoint)
+
+# Function to collect the settings that change the output of a PDF, recorded in the ingest manifest
+def get_ingest_settings(model: str, output_format: str) -> Dict[str, Any]:
+    model_config = config['embeddings']['models'][model]
+    return {
+        "embedding_model": model,
+        "embedding_model_name": model_config.get('model'),
+        "chunk_size": model_config['chunk_size'],
+        "chunking": config['embeddings'].get('chunking', {}),
+        "output_format": output_format
+    }
 
 # Main function to process documents
-def process_docs(output_dir: str, input_dir: str = None, pdf_file: str = None, model: str = None):
+def process_docs(output_dir: str, input_dir: str = None, pdf_file: str = None, model: str = None, output_format: str = None, force: bool = False):
     if model is None:
         model = config['embeddings']['default']
+    if output_format is None:
+        output_format = config['embeddings'].get('output_format', 'csv')
 
     if input_dir:
         logging.info(f"Starting document processing from directory {input_dir} to {output_dir} using {model} model")
@@ -101,12 +204,64 @@ def process_docs(output_dir: str, input_dir: str = None, pdf_file: str = None, m
     else:
         raise ValueError("Either input_dir or pdf_file must be provided.")
     
+    existing_pdf_files = []
     for pdf_path in pdf_files:
         if not os.path.exists(pdf_path):
             logging.warning(f"File {pdf_path} does not exist and will be skipped.")
             continue
-        output_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(pdf_path))[0]}_processed.csv")
-        logging.debug(f"Processing file {pdf_path} with output to {output_path}")
-        df_chunks = process_pdf(pdf_path, model=model)
-        save_to_csv(df_chunks, output_path, model)
+        existing_pdf_files.append(pdf_path)
+
+    manifest = IngestManifest(output_dir) if config.get('ingest', {}).get('manifest', True) else None
+    settings = get_ingest_settings(model, output_format)
+    planned = {}
+    first_pages = {}
+    for pdf_path in existing_pdf_files:
+        content_hash = generate_file_hash(pdf_path) if manifest is not None else None
+        entry = manifest.get_resumable(pdf_path, content_hash, settings) if manifest is not None and not force else None
+        if entry is not None and entry['status'] == "complete":
+            logging.info(f"Skipping {pdf_path}: unchanged since it was processed to {entry['output_path']}")
+            continue
+        checkpoint = entry['checkpoint'] if entry is not None else None
+        if checkpoint is not None:
+            logging.info(f"Resuming {pdf_path} after page {checkpoint['last_page']}, chunk {checkpoint['last_chunk']}")
+            # Cross-page chunks only line up again when chunking restarts from the first page
+            if not settings['chunking'].get('cross_page', False):
+                first_pages[pdf_path] = checkpoint['last_page'] - 1
+        planned[pdf_path] = (content_hash, checkpoint)
+
+    ann_config = config.get('retrieval', {}).get('ann', {})
+    quantization = config.get('retrieval', {}).get('quantization', {}).get('dtype', 'none')
+    executor = get_extraction_executor()
+    try:
+        for pdf_path, pages in extract_texts_from_pdfs(list(planned), executor, first_pages):
+            content_hash, checkpoint = planned[pdf_path]
+            output_path = os.path.join(output_dir, f"{os.path.splitext(os.path.basename(pdf_path))[0]}_processed.csv")
+            logging.debug(f"Processing file {pdf_path} with output to {output_path}")
+            if manifest is not None and checkpoint is None:
+                manifest.start(pdf_path, content_hash, settings, get_output_path(output_path, model, output_format))
+            resume_after = (checkpoint['last_page'], checkpoint['last_chunk']) if checkpoint is not None else None
+            writer = open_chunk_writer(output_path, model, output_format, checkpoint['writer'] if checkpoint is not None else None)
+            try:
+                # Each embedded window is written and flushed (committed to the manifest) as soon as it is produced
+                for window, embeddings in stream_pdf(pdf_path, model=model, pages=pages, resume_after=resume_after):
+                    writer.append(window, embeddings)
+                    if manifest is not None:
+                        manifest.commit(pdf_path, {
+                            "writer": writer.checkpoint(),
+                            "last_page": window[-1]['page_num'],
+                            "last_chunk": window[-1]['chunk_number']
+                        })
+                    else:
+                        writer.flush()
+            finally:
+                writer.close()
+            if output_format == "store" and ann_config.get('enabled', False):
+                build_ivf_index(writer.store_path, nlist=ann_config.get('nlist'), iterations=ann_config.get('train_iterations', 10))
+            if output_format == "store" and quantization != 'none':
+                quantize_store(writer.store_path, quantization)
+            if manifest is not None:
+                manifest.complete(pdf_path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
     logging.info(f"Document processing completed for directory {input_dir} or file {pdf_file}")
@@ -1,5 +1,6 @@
 # src/app/process_llm.py
 
+import io
 import os
 import logging
 import json
@@ -8,9 +9,8 @@ from typing import Any, List, Dict, Optional
 from utils.hash_utils import generate_query_hash
 from app.process_query import process_query
 from utils.config_utils import load_config
-from app.llm.anthropic_llm import AnthropicLLM
-from app.llm.openai_llm import OpenAILLM
-from app.llm.vertex_llm import VertexLLM
+from app.registry import get_llm
+from app.results_store import ResultsStore, get_results_store
 
 # Load configuration
 config = load_config()
@@ -32,75 +32,62 @@ def prepare_llm_prompt(query: str, top_chunks: List[Dict], system_message: str)
     }
 
 # Function to save the prompt
-def save_prompt(prompt_data: Dict[str, str], query_dir: str, model: str):
+def save_prompt(prompt_data: Dict[str, str], query_dir: str, model: str, store: Optional[ResultsStore] = None):
+    store = store or get_results_store(config.get('results', {}))
     prompt_file = os.path.join(query_dir, f"prompt_{model}.txt")
-    os.makedirs(os.path.dirname(prompt_file), exist_ok=True)  # Ensure the directory exists
-    with open(prompt_file, 'w', encoding='utf-8') as f:
-        f.write(prompt_data["text"])
+    store.write_text(prompt_file, prompt_data["text"])
     logging.info(f"Prompt saved to {prompt_file}")
     return prompt_file
 
 # Function to save the LLM result
-def save_llm_result(response: str, prompt_sent: str, query_dir: str, model: str):
+def save_llm_result(response: str, prompt_sent: str, query_dir: str, model: str, store: Optional[ResultsStore] = None):
+    store = store or get_results_store(config.get('results', {}))
     result_file = os.path.join(query_dir, f"llm_response_{model}.txt")
-    os.makedirs(os.path.dirname(result_file), exist_ok=True)  # Ensure the directory exists
-    with open(result_file, 'w', encoding='utf-8') as f:
-        f.write(response)
+    store.write_text(result_file, response)
     logging.info(f"LLM response saved to {result_file}")
 
     # Save the exact prompt sent to the LLM
     prompt_file = os.path.join(query_dir, f"sent_prompt_{model}.txt")
-    with open(prompt_file, 'w', encoding='utf-8') as f:
-        f.write(str(prompt_sent))
+    store.write_text(prompt_file, str(prompt_sent))
     logging.info(f"Prompt sent to LLM saved to {prompt_file}")
 
     return result_file, prompt_file
 
 # Function to save the costs
-def save_llm_costs(costs: Dict[str, Any], query_dir: str, model: str):
+def save_llm_costs(costs: Dict[str, Any], query_dir: str, model: str, store: Optional[ResultsStore] = None):
+    store = store or get_results_store(config.get('results', {}))
     costs_file = os.path.join(query_dir, f"llm_costs_{model}.json")
-    os.makedirs(os.path.dirname(costs_file), exist_ok=True)  # Ensure the directory exists
-    with open(costs_file, 'w', encoding='utf-8') as f:
-        json.dump(costs, f, ensure_ascii=False, indent=4)
+    store.write_text(costs_file, json.dumps(costs, ensure_ascii=False, indent=4))
     logging.info(f"LLM costs saved to {costs_file}")
     return costs_file
 
+# Function to save the latency metrics (time to first token, tokens per second)
+def save_llm_latency(latency: Dict[str, Any], query_dir: str, model: str, store: Optional[ResultsStore] = None):
+    store = store or get_results_store(config.get('results', {}))
+    latency_file = os.path.join(query_dir, f"llm_latency_{model}.json")
+    store.write_text(latency_file, json.dumps(latency, ensure_ascii=False, indent=4))
+    logging.info(f"LLM latency saved to {latency_file}")
+    return latency_file
+
 # Function to save the entire call_llm response
-def save_call_llm_response(llm_response: Dict[str, Any], query_dir: str, model: str):
+def save_call_llm_response(llm_response: Dict[str, Any], query_dir: str, model: str, store: Optional[ResultsStore] = None):
+    store = store or get_results_store(config.get('results', {}))
     response_file = os.path.join(query_dir, f"call_llm_response_{model}.txt")
-    os.makedirs(os.path.dirname(response_file), exist_ok=True)  # Ensure the directory exists
-    with open(response_file, 'w', encoding='utf-8') as f:
-        f.write(str(llm_response))
+    store.write_text(response_file, str(llm_response))
     logging.info(f"call_llm response saved to {response_file}")
     return response_file
 
-# Function to select the LLM function based on the model
-def get_llm(provider: str, model_name: str):
-    logging.info(f"Selecting LLM function for provider: {provider}, model: {model_name}")
-    model_config = config['llm']['providers'][provider]['llm_models'][model_name]
-    if provider == "openai":
-        return OpenAILLM(config['llm']['assistant']['system_message'], model_config)
-    elif provider == "vertex":
-        return VertexLLM(config['llm']['assistant']['system_message'], model_config)
-    elif provider == "anthropic":
-        return AnthropicLLM(config['llm']['assistant']['system_message'], model_config)
-    else:
-        logging.error(f"Unsupported LLM provider: {provider}")
-        raise ValueError(f"Unsupported LLM provider: {provider}")
-
 # Main function to process the LLM
-def process_llm(query: str, top_chunks_csv: Optional[str], system_message: str, output_dir: str, llm_provider: str, llm_model: str, embedding_model: Optional[str], embeddings_csv: Optional[str] = None, top_k: int = 5):
+def process_llm(query: str, top_chunks_csv: Optional[str], system_message: str, output_dir: str, llm_provider: str, llm_model: str, embedding_model: Optional[str], embeddings_csv: Optional[str] = None, top_k: int = 5, use_cache: bool = True, stream: Optional[bool] = None):
     logging.info(f"Starting LLM processing for query: {query} with provider: {llm_provider}, model: {llm_model} and embeddings from {embedding_model}")
     
+    store = get_results_store(config.get('results', {}))
     query_hash = generate_query_hash(query)
     base_query_dir = os.path.join(output_dir, query_hash)
-    os.makedirs(base_query_dir, exist_ok=True)
-    logging.info(f"Created base query directory at {base_query_dir}")
 
     # Save the query for reference
     query_file = os.path.join(base_query_dir, "query.txt")
-    with open(query_file, 'w', encoding='utf-8') as f:
-        f.write(query)
+    store.write_text(query_file, query)
     logging.info(f"Query saved to {query_file}")
 
     if not top_chunks_csv and embeddings_csv:
@@ -119,23 +106,42 @@ def process_llm(query: str, top_chunks_csv: Optional[str], system_message: str,
         logging.error("Either top_chunks_csv or embeddings_csv must be provided.")
         raise ValueError("Either top_chunks_csv or embeddings_csv must be provided.")
 
-    # Create directory for the specific embedding and LLM model combination
+    # Directory for the specific embedding and LLM model combination
     query_dir = os.path.join(base_query_dir, f"{embedding_model}_{llm_model}")
-    os.makedirs(query_dir, exist_ok=True)
-    logging.info(f"Created query directory for {embedding_model}_{llm_model} at {query_dir}")
 
-    # Read top chunks for LLM processing
+    # Read top chunks for LLM processing, from the results store unless given as a file outside it
     logging.info(f"Reading top chunks from {top_chunks_csv} for LLM processing")
-    top_chunks = pd.read_csv(top_chunks_csv).to_dict(orient='records')
+    if store.exists(top_chunks_csv):
+        top_chunks = pd.read_csv(io.StringIO(store.read_text(top_chunks_csv))).to_dict(orient='records')
+    else:
+        top_chunks = pd.read_csv(top_chunks_csv).to_dict(orient='records')
     prompt_data = prepare_llm_prompt(query, top_chunks, system_message)
-    save_prompt(prompt_data, query_dir, llm_model)
+    save_prompt(prompt_data, query_dir, llm_model, store)
     
-    llm = get_llm(llm_provider, llm_model)
-    llm_response = llm.call_llm(prompt_data["text"])
+    llm = get_llm(llm_provider, llm_model, "assistant", use_cache)
+    if stream is None:
+        stream = config['llm'].get('stream', False)
+    if stream and store.backend == "files":
+        # Write the response file as tokens arrive (the SQLite store gets the response once complete)
+        result_file = os.path.join(query_dir, f"llm_response_{llm_model}.txt")
+        os.makedirs(query_dir, exist_ok=True)
+        with open(result_file, 'w', encoding='utf-8') as f:
+            def write_token(token: str):
+                f.write(token)
+                f.flush()
+            llm_response = llm.call_llm(prompt_data["text"], on_token=write_token)
+    elif stream:
+        llm_response = llm.call_llm(prompt_data["text"], on_token=lambda token: None)
+    else:
+        llm_response = llm.call_llm(prompt_data["text"])
     
-    save_llm_result(llm_response["response_text"], prompt_data["text"], query_dir, llm_model)
-    save_llm_costs(llm_response["costs"], query_dir, llm_model)
-    save_call_llm_response(llm_response, query_dir, llm_model)
+    # The response files of a run are stored together or not at all
+    with store.transaction():
+        save_llm_result(llm_response["response_text"], prompt_data["text"], query_dir, llm_model, store)
+        save_llm_costs(llm_response["costs"], query_dir, llm_model, store)
+        if llm_response.get("latency"):
+            save_llm_latency(llm_response["latency"], query_dir, llm_model, store)
+        save_call_llm_response(llm_response, query_dir, llm_model, store)
 
     logging.info(f"LLM processing completed for query: {query}")
 
@@ -1,12 +1,18 @@
 import os
+import json
 import logging
+import numpy as np
 import pandas as pd
-from typing import List, Dict
-from sklearn.metrics.pairwise import cosine_similarity
+from collections import Counter
+from typing import List, Dict, Tuple
 from utils.hash_utils import generate_query_hash
 from utils.config_utils import load_config
-from app.embeddings.openai_embeddings import OpenAIEmbeddingGenerator
-from app.embeddings.vertex_embeddings import VertexEmbeddingGenerator
+from app.registry import get_embedding_generator
+from app.results_store import get_results_store
+from app.embeddings.embedding_store import is_embedding_store, load_embedding_store
+from app.retrieval.exact_search import ExactSearchEngine, MemoryMappedSearchEngine
+from app.retrieval.ivf_index import IVFSearchEngine, load_ivf_index
+from app.retrieval.quantized_search import QuantizedSearchEngine, load_quantized_vectors
 
 # Load configuration
 config = load_config()
@@ -15,37 +21,86 @@ if config is None:
     logging.error("Configuration could not be loaded. Please check the config.yaml file.")
     raise SystemExit("Exiting due to missing configuration.")
 
-# Function to select the embedding generator based on the model
-def get_embedding_generator(model: str):
-    logging.debug(f"Selecting embedding generator for model: {model}")
-    if model == "openai":
-        openai_config = config['embeddings']['models']['openai']
-        return OpenAIEmbeddingGenerator(api_key=openai_config['api_key'], model=openai_config['model'])
-    elif model == "vertex":
-        vertex_config = config['embeddings']['models']['vertex']
-        return VertexEmbeddingGenerator(
-            project_id=vertex_config['project_id'],
-            location=vertex_config['location'],
-            model_name=vertex_config['model']
-        )
-    else:
-        raise ValueError(f"Unsupported embedding model: {model}")
+# Function to load an embeddings CSV into a float32 matrix and its chunk metadata
+def load_embeddings_csv(embeddings_csv: str) -> Tuple[np.ndarray, pd.DataFrame]:
+    df_chunks = pd.read_csv(embeddings_csv)
+    # Embeddings are stored as list literals, which are valid JSON arrays
+    parsed = [json.loads(x) if isinstance(x, str) else [] for x in df_chunks['embedding']]
+    # Chunks whose embedding failed were written as [] and cannot be searched; skip them and any ragged row
+    dims = Counter(len(embedding) for embedding in parsed if embedding)
+    dim = dims.most_common(1)[0][0] if dims else 0
+    valid = [dim > 0 and len(embedding) == dim for embedding in parsed]
+    skipped = len(parsed) - sum(valid)
+    if skipped:
+        logging.warning(f"Skipping {skipped} of {len(parsed)} chunks in {embeddings_csv} without a {dim}-dimensional embedding")
+    embeddings = np.array([embedding for embedding, ok in zip(parsed, valid) if ok], dtype=np.float32).reshape(sum(valid), dim)
+    metadata = df_chunks[valid].drop(columns=['embedding']).reset_index(drop=True)
+    return embeddings, metadata
+
+# Function to load embeddings from either an embedding store or a processed CSV
+def load_embeddings(embeddings_path: str) -> Tuple[np.ndarray, pd.DataFrame]:
+    if is_embedding_store(embeddings_path):
+        return load_embedding_store(embeddings_path)
+    return load_embeddings_csv(embeddings_path)
+
+# Function to build the search engine for an embeddings CSV or store
+def get_search_engine(embeddings_path: str, mmap: bool = None, nprobe: int = None):
+    retrieval_config = config.get('retrieval', {})
+    ann_config = retrieval_config.get('ann', {})
+    quantization_config = retrieval_config.get('quantization', {})
+    quantization = quantization_config.get('dtype', 'none')
+    block_size = retrieval_config.get('block_size', 65536)
+    if mmap is None:
+        mmap = retrieval_config.get('mmap', False)
+    if nprobe is None and ann_config.get('enabled', False):
+        nprobe = ann_config.get('nprobe', 8)
+
+    if nprobe is not None and is_embedding_store(embeddings_path):
+        index = load_ivf_index(embeddings_path)
+        if index is not None:
+            logging.info(f"Searching {embeddings_path} with its IVF index (nprobe={nprobe})")
+            return IVFSearchEngine(embeddings_path, index, nprobe=nprobe, block_size=block_size)
+        logging.warning(f"No usable IVF index for {embeddings_path}, falling back to exact search")
+    if quantization != 'none' and is_embedding_store(embeddings_path):
+        quantized = load_quantized_vectors(embeddings_path, quantization)
+        if quantized is not None:
+            logging.info(f"Searching {embeddings_path} with its {quantization} vectors and exact re-ranking")
+            return QuantizedSearchEngine(embeddings_path, *quantized, rerank_factor=quantization_config.get('rerank_factor', 4), block_size=block_size)
+        logging.warning(f"No {quantization} vectors for {embeddings_path}, falling back to full-precision search")
+    if mmap and is_embedding_store(embeddings_path):
+        logging.info(f"Opening embedding store {embeddings_path} memory-mapped")
+        return MemoryMappedSearchEngine(embeddings_path, block_size=block_size)
+    embeddings, metadata = load_embeddings(embeddings_path)
+    logging.debug(f"Loaded {len(metadata)} embeddings from {embeddings_path}")
+    return ExactSearchEngine(embeddings, metadata)
+
+# Function to save the top chunks of a query under its query hash directory
+def save_query_result(query: str, result_df: pd.DataFrame, output_dir: str, model: str) -> str:
+    query_dir = os.path.join(output_dir, generate_query_hash(query))
+    store = get_results_store(config.get('results', {}))
+
+    top_chunks_file = os.path.join(query_dir, f"top_chunks_{model}.csv")
+    query_file = os.path.join(query_dir, "query.txt")
+    with store.transaction():
+        # Save the result DataFrame
+        store.write_text(top_chunks_file, result_df.to_csv(index=False))
+        # Save the query for reference
+        store.write_text(query_file, query)
+    logging.info(f"Top chunks saved to {top_chunks_file}")
+    logging.debug(f"Query saved to {query_file}")
+
+    return top_chunks_file
 
 # Function to process the query
-def process_query(query: str, embeddings_csv: str, top_k: int, output_dir: str, model: str):
+def process_query(query: str, embeddings_csv: str, top_k: int, output_dir: str, model: str, mmap: bool = None, nprobe: int = None):
     logging.info(f"Processing query: {query} with model: {model}")
-    query_hash = generate_query_hash(query)
-    query_dir = os.path.join(output_dir, query_hash)
-    os.makedirs(query_dir, exist_ok=True)
-    logging.debug(f"Created query directory at {query_dir}")
 
     # Load the embeddings
     if not os.path.exists(embeddings_csv):
         logging.error(f"Embeddings file {embeddings_csv} does not exist.")
         raise FileNotFoundError(f"{embeddings_csv} not found.")
     logging.info(f"Loading embeddings from {embeddings_csv}")
-    df_chunks = pd.read_csv(embeddings_csv)
-    logging.debug(f"Loaded {len(df_chunks)} embeddings from {embeddings_csv}")
+    search_engine = get_search_engine(embeddings_csv, mmap, nprobe)
 
     # Generate query embedding
     embedding_generator = get_embedding_generator(model)
@@ -54,24 +109,41 @@ def process_query(query: str, embeddings_csv: str, top_k: int, output_dir: str,
 
     # Calculate similarities
     logging.info(f"Calculating similarities for top {top_k} chunks.")
-    df_chunks['similarity'] = df_chunks['embedding'].apply(lambda x: cosine_similarity([query_embedding], [eval(x)])[0][0])
-    top_chunks = df_chunks.nlargest(top_k, 'similarity')
-    logging.debug(f"Selected top {top_k} chunks based on similarity.")
+    result_df = search_engine.search(query_embedding, top_k)
+    logging.info(f"Selected top {len(result_df)} chunks based on similarity.")
 
-    # Create result DataFrame with selected columns and rank
-    result_df = top_chunks[['file_name', 'page_num', 'chunk_number', 'chunk_text', 'similarity']].reset_index(drop=True)
-    result_df['rank'] = result_df.index + 1  # Add rank based on the index
-    logging.info(f"Created result DataFrame with ranks.")
+    return save_query_result(query, result_df, output_dir, model)
 
-    # Save the result DataFrame
-    top_chunks_file = os.path.join(query_dir, f"top_chunks_{model}.csv")
-    result_df.to_csv(top_chunks_file, index=False)
-    logging.info(f"Top chunks saved to {top_chunks_file}")
+# Function to read a queries file: one query per line, or a JSON list of strings
+def load_queries(queries_file: str) -> List[str]:
+    with open(queries_file, 'r') as f:
+        content = f.read()
+    if queries_file.endswith('.json'):
+        queries = json.loads(content)
+    else:
+        queries = content.splitlines()
+    # Drop blank lines and repeated queries, which would write the same directory
+    return list(dict.fromkeys(query.strip() for query in queries if query.strip()))
 
-    # Save the query for reference
-    query_file = os.path.join(query_dir, "query.txt")
-    with open(query_file, 'w') as f:
-        f.write(query)
-    logging.info(f"Query saved to {query_file}")
+# Function to process many queries with one corpus load and batched embedding and scoring
+def process_queries(queries_file: str, embeddings_csv: str, top_k: int, output_dir: str, model: str, mmap: bool = None, nprobe: int = None) -> Dict[str, str]:
+    queries = load_queries(queries_file)
+    logging.info(f"Processing {len(queries)} queries from {queries_file} with model: {model}")
 
-    return top_chunks_file
+    # Load the embeddings once for all queries
+    if not os.path.exists(embeddings_csv):
+        logging.error(f"Embeddings file {embeddings_csv} does not exist.")
+        raise FileNotFoundError(f"{embeddings_csv} not found.")
+    logging.info(f"Loading embeddings from {embeddings_csv}")
+    search_engine = get_search_engine(embeddings_csv, mmap, nprobe)
+
+    # Generate the query embeddings in provider-sized batches
+    embedding_generator = get_embedding_generator(model)
+    query_embeddings = embedding_generator.generate_batch(queries)
+    logging.info(f"Generated {len(query_embeddings)} query embeddings")
+
+    # Score every query against the corpus at once
+    logging.info(f"Calculating similarities for top {top_k} chunks per query.")
+    results = search_engine.search_batch(query_embeddings, top_k)
+
+    return {query: save_query_result(query, result_df, output_dir, model) for query, result_df in zip(queries, results)}
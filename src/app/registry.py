@@ -0,0 +1,220 @@
+# src/app/registry.py
+
+import asyncio
+import logging
+import threading
+import weakref
+from functools import partial
+from typing import Any, Callable, Dict, List
+import anthropic
+from openai import AsyncOpenAI, OpenAI
+from google.cloud import aiplatform
+from vertexai.generative_models import GenerativeModel
+from vertexai.language_models import TextEmbeddingModel
+from utils.config_utils import load_config
+from utils.rate_limit import RetryPolicy, get_rate_limiter
+from utils.metrics import get_metrics
+from app.llm.anthropic_llm import AnthropicLLM
+from app.llm.openai_llm import OpenAILLM
+from app.llm.vertex_llm import VertexLLM
+from app.llm.local_llm import LocalLLM
+from app.llm.llm_cache import get_llm_cache
+from app.llm.batch import BatchBackend, LocalBatchBackend, OpenAIBatchBackend
+from app.embeddings.openai_embeddings import OpenAIEmbeddingGenerator
+from app.embeddings.vertex_embeddings import VertexEmbeddingGenerator
+from app.embeddings.local_embeddings import LocalEmbeddingGenerator
+from app.embeddings.embedding_cache import get_embedding_cache
+
+# Load configuration
+config = load_config()
+
+if config is None:
+    logging.error("Configuration could not be loaded. Please check the config.yaml file.")
+    raise SystemExit("Exiting due to missing configuration.")
+
+# Evaluator models used when llm.evaluators is not set
+DEFAULT_EVALUATORS = {
+    "vertex": ["gemini-1.5-pro-001"],
+    "openai": ["gpt-4o-2024-05-13"],
+    "anthropic": ["claude-3-5-sonnet-20240620"]
+}
+
+# Process-wide clients and instances, built on first use
+_lock = threading.RLock()
+_clients = {}
+# Async clients hold connections bound to the event loop they are used in, so they are shared per loop
+_async_clients = weakref.WeakKeyDictionary()
+_llms = {}
+_embedding_generators = {}
+_batch_backends = {}
+_vertex_target = None
+
+# Function to build the retry policy shared by all provider calls
+def get_retry_policy() -> RetryPolicy:
+    retry_config = config.get('retry', {})
+    return RetryPolicy(
+        max_retries=retry_config.get('max_retries', 5),
+        base_delay=retry_config.get('base_delay', 1.0),
+        max_delay=retry_config.get('max_delay', 60.0)
+    )
+
+# Function to get the shared OpenAI client for an API key (one connection pool per key)
+def get_openai_client(api_key: str) -> OpenAI:
+    with _lock:
+        if ("openai", api_key) not in _clients:
+            logging.debug("Creating OpenAI client")
+            # Retries are handled by the shared retry policy, not by the SDK
+            _clients[("openai", api_key)] = OpenAI(api_key=api_key, max_retries=0)
+        return _clients[("openai", api_key)]
+
+# Function to get the shared Anthropic client for an API key (one connection pool per key)
+def get_anthropic_client(api_key: str) -> anthropic.Anthropic:
+    with _lock:
+        if ("anthropic", api_key) not in _clients:
+            logging.debug("Creating Anthropic client")
+            # Retries are handled by the shared retry policy, not by the SDK
+            _clients[("anthropic", api_key)] = anthropic.Anthropic(api_key=api_key, max_retries=0)
+        return _clients[("anthropic", api_key)]
+
+# Function to get the shared async client of a provider and API key in the running event loop
+def get_async_client(provider: str, api_key: str, create: Callable[[], Any]) -> Any:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        if (provider, api_key) not in clients:
+            logging.debug(f"Creating async {provider} client")
+            clients[(provider, api_key)] = create()
+        return clients[(provider, api_key)]
+
+# Function to get the shared async OpenAI client for an API key (one connection pool per key and event loop)
+def get_async_openai_client(api_key: str) -> AsyncOpenAI:
+    # Retries are handled by the shared retry policy, not by the SDK
+    return get_async_client("openai", api_key, lambda: AsyncOpenAI(api_key=api_key, max_retries=0))
+
+# Function to get the shared async Anthropic client for an API key (one connection pool per key and event loop)
+def get_async_anthropic_client(api_key: str) -> anthropic.AsyncAnthropic:
+    return get_async_client("anthropic", api_key, lambda: anthropic.AsyncAnthropic(api_key=api_key, max_retries=0))
+
+# Function to point Vertex AI at a project and location, only when it is not already initialized for them
+def init_vertex(project_id: str, location: str):
+    global _vertex_target
+    with _lock:
+        if _vertex_target != (project_id, location):
+            logging.debug(f"Initializing Vertex AI for project {project_id} in {location}")
+            aiplatform.init(project=project_id, location=location)
+            _vertex_target = (project_id, location)
+
+# Function to get the LLM for a provider and model, with the system message of a role (assistant, evaluator, ...)
+def get_llm(provider: str, model_name: str, role: str = "assistant", use_cache: bool = True):
+    system_message = config['llm'].get(role, {}).get('system_message')
+    key = (provider, model_name, system_message, use_cache)
+    with _lock:
+        if key in _llms:
+            return _llms[key]
+        logging.info(f"Selecting LLM for provider: {provider}, model: {model_name}, role: {role}")
+        model_config = config['llm']['providers'][provider]['llm_models'][model_name]
+        cache = get_llm_cache(config['llm'].get('cache')) if use_cache else None
+        limits = {
+            "rate_limiter": get_rate_limiter(f"{provider}/{model_name}", model_config.get('requests_per_minute'), model_config.get('tokens_per_minute')),
+            "retry_policy": get_retry_policy(),
+            "metrics": get_metrics(config.get('metrics'))
+        }
+        if provider == "openai":
+            llm = OpenAILLM(system_message, model_config, cache=cache, client=get_openai_client(model_config['api_key']), get_async_client=partial(get_async_openai_client, model_config['api_key']), **limits)
+        elif provider == "vertex":
+            init_vertex(model_config['project_id'], model_config['location'])
+            client = GenerativeModel(model_config['model'], system_instruction=[system_message])
+            llm = VertexLLM(system_message, model_config, cache=cache, client=client, **limits)
+        elif provider == "anthropic":
+            llm = AnthropicLLM(system_message, model_config, cache=cache, client=get_anthropic_client(model_config['api_key']), get_async_client=partial(get_async_anthropic_client, model_config['api_key']), **limits)
+        elif provider == "local":
+            llm = LocalLLM(system_message, model_config, cache=cache, **limits)
+        else:
+            logging.error(f"Unsupported LLM provider: {provider}")
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+        _llms[key] = llm
+        return llm
+
+# Function to get the embedding generator for a model
+def get_embedding_generator(model: str):
+    with _lock:
+        if model in _embedding_generators:
+            return _embedding_generators[model]
+        logging.debug(f"Selecting embedding generator for model: {model}")
+        cache = get_embedding_cache(config['embeddings'].get('cache'))
+        if model == "openai":
+            openai_config = config['embeddings']['models']['openai']
+            embedding_generator = OpenAIEmbeddingGenerator(
+                api_key=openai_config['api_key'],
+                model=openai_config['model'],
+                max_batch_size=openai_config.get('batch_size', 2048),
+                max_batch_tokens=openai_config.get('max_batch_tokens', 300000),
+                max_in_flight=openai_config.get('max_in_flight', 1),
+                cache=cache,
+                model_version=openai_config.get('model_version', ''),
+                client=get_openai_client(openai_config['api_key']),
+                rate_limiter=get_rate_limiter(f"embeddings/openai/{openai_config['model']}", openai_config.get('requests_per_minute'), openai_config.get('tokens_per_minute')),
+                retry_policy=get_retry_policy(),
+                metrics=get_metrics(config.get('metrics'))
+            )
+        elif model == "vertex":
+            vertex_config = config['embeddings']['models']['vertex']
+            init_vertex(vertex_config['project_id'], vertex_config['location'])
+            embedding_generator = VertexEmbeddingGenerator(
+                project_id=vertex_config['project_id'],
+                location=vertex_config['location'],
+                model_name=vertex_config['model'],
+                max_batch_size=vertex_config.get('batch_size', 250),
+                max_batch_tokens=vertex_config.get('max_batch_tokens', 20000),
+                max_in_flight=vertex_config.get('max_in_flight', 1),
+                cache=cache,
+                model_version=vertex_config.get('model_version', ''),
+                text_embedding_model=TextEmbeddingModel.from_pretrained(vertex_config['model']),
+                rate_limiter=get_rate_limiter(f"embeddings/vertex/{vertex_config['model']}", vertex_config.get('requests_per_minute'), vertex_config.get('tokens_per_minute')),
+                retry_policy=get_retry_policy(),
+                metrics=get_metrics(config.get('metrics'))
+            )
+        elif model == "local":
+            local_config = config['embeddings']['models']['local']
+            embedding_generator = LocalEmbeddingGenerator(
+                model=local_config['model'],
+                dimensions=local_config.get('dimensions', 256),
+                max_batch_size=local_config.get('batch_size', 256),
+                max_batch_tokens=local_config.get('max_batch_tokens', 100000),
+                max_in_flight=local_config.get('max_in_flight', 1),
+                cache=cache,
+                model_version=local_config.get('model_version', ''),
+                latency=local_config.get('latency'),
+                per_item_seconds=local_config.get('per_item_seconds', 0.0),
+                error_rate=local_config.get('error_rate', 0.0),
+                error_status_codes=local_config.get('error_status_codes'),
+                seed=local_config.get('seed'),
+                rate_limiter=get_rate_limiter(f"embeddings/local/{local_config['model']}", local_config.get('requests_per_minute'), local_config.get('tokens_per_minute')),
+                retry_policy=get_retry_policy(),
+                metrics=get_metrics(config.get('metrics'))
+            )
+        else:
+            raise ValueError(f"Unsupported embedding model: {model}")
+        _embedding_generators[model] = embedding_generator
+        return embedding_generator
+
+# Function to get the evaluator models by provider, from llm.evaluators in config.yaml
+def get_evaluators() -> Dict[str, List[str]]:
+    return config['llm'].get('evaluators') or DEFAULT_EVALUATORS
+
+# Function to get the batch backend configured for a provider ("local" unless set in llm.batch.backends)
+def get_batch_backend(provider: str) -> BatchBackend:
+    batch_config = config['llm'].get('batch', {})
+    backend_name = batch_config.get('backends', {}).get(provider, "local")
+    with _lock:
+        if backend_name in _batch_backends:
+            return _batch_backends[backend_name]
+        if backend_name == "local":
+            backend = LocalBatchBackend(max_workers=batch_config.get('local_workers', 8))
+        elif backend_name == "openai":
+            model_configs = config['llm']['providers']['openai']['llm_models']
+            backend = OpenAIBatchBackend(get_openai_client(next(iter(model_configs.values()))['api_key']), discount=batch_config.get('discount', 0.5))
+        else:
+            raise ValueError(f"Unsupported batch backend: {backend_name}")
+        _batch_backends[backend_name] = backend
+        return backend
@@ -0,0 +1,237 @@
+# src/app/results_store.py
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from utils.config_utils import load_config
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+# Function to normalize a result path into the key used by the stores ("./data/x/" -> "data/x")
+def normalize_path(path: str) -> str:
+    path = os.path.normpath(path).replace(os.sep, "/")
+    return "" if path == "." else path
+
+class ResultsStore(ABC):
+    """
+    Storage of the pipeline results (queries, params, prompts, responses, costs and
+    evaluations), addressed by the same relative paths as the data/ tree.
+    """
+    backend = None
+
+    @abstractmethod
+    def write_text(self, path: str, text: str):
+        pass
+
+    @abstractmethod
+    def read_text(self, path: str) -> str:
+        pass
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    def isdir(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    def listdir(self, path: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    def iter_files(self, path: str) -> Iterator[str]:
+        """
+        Yields the path of every file under a directory, at any depth.
+        """
+        pass
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups writes so they are stored together or not at all. Stores without
+        transactions write each file as it comes.
+        """
+        yield self
+
+class FileResultsStore(ResultsStore):
+    backend = "files"
+
+    def __init__(self, root: str = ""):
+        """
+        Results written as one file per result, the layout the pipeline has always used.
+
+        Args:
+            root (str): Directory the result paths are relative to (the working directory by default).
+        """
+        self.root = root
+
+    def full_path(self, path: str) -> str:
+        return os.path.join(self.root, path) if self.root else path
+
+    def write_text(self, path: str, text: str):
+        full_path = self.full_path(path)
+        if os.path.dirname(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def read_text(self, path: str) -> str:
+        with open(self.full_path(path), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(self.full_path(path))
+
+    def isdir(self, path: str) -> bool:
+        return os.path.isdir(self.full_path(path))
+
+    def listdir(self, path: str) -> List[str]:
+        return os.listdir(self.full_path(path))
+
+    def iter_files(self, path: str) -> Iterator[str]:
+        for directory, dirs, files in os.walk(self.full_path(path)):
+            for name in files:
+                yield normalize_path(os.path.relpath(os.path.join(directory, name), self.root or "."))
+
+class SQLiteResultsStore(ResultsStore):
+    backend = "sqlite"
+
+    def __init__(self, path: str):
+        """
+        Results kept in a single SQLite file (WAL journal) instead of a tree of small
+        files. Each entry is keyed by its result path and its parent directory, so
+        listing a directory or walking a subtree is an indexed query. Directories exist
+        implicitly as the parents of the stored files.
+
+        Args:
+            path (str): Path of the SQLite file.
+        """
+        self.path = path
+        self.lock = threading.RLock()
+        self.depth = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly by transaction()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "path TEXT PRIMARY KEY, parent TEXT NOT NULL, name TEXT NOT NULL, "
+            "is_dir INTEGER NOT NULL, content TEXT, updated_at REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_parent ON results (parent)")
+
+    @contextmanager
+    def transaction(self):
+        # Nested transactions of the same thread join the outermost one
+        with self.lock:
+            if self.depth == 0:
+                self.connection.execute("BEGIN IMMEDIATE")
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.connection.execute("ROLLBACK")
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.connection.execute("COMMIT")
+
+    def write_text(self, path: str, text: str):
+        path = normalize_path(path)
+        now = time.time()
+        rows = [(path, os.path.dirname(path), os.path.basename(path), 0, text, now)]
+        parent = os.path.dirname(path)
+        while parent:
+            rows.append((parent, os.path.dirname(parent), os.path.basename(parent), 1, None, now))
+            parent = os.path.dirname(parent)
+        with self.transaction():
+            existing = self.connection.execute("SELECT is_dir FROM results WHERE path = ?", (path,)).fetchone()
+            if existing and existing[0]:
+                raise IsADirectoryError(f"{path} is a directory in the results store {self.path}")
+            self.connection.execute("INSERT OR REPLACE INTO results (path, parent, name, is_dir, content, updated_at) VALUES (?, ?, ?, ?, ?, ?)", rows[0])
+            self.connection.executemany("INSERT OR IGNORE INTO results (path, parent, name, is_dir, content, updated_at) VALUES (?, ?, ?, ?, ?, ?)", rows[1:])
+
+    def read_text(self, path: str) -> str:
+        with self.lock:
+            row = self.connection.execute("SELECT content FROM results WHERE path = ? AND is_dir = 0", (normalize_path(path),)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"{path} not found in the results store {self.path}")
+        return row[0]
+
+    def exists(self, path: str) -> bool:
+        path = normalize_path(path)
+        if not path:
+            return True
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM results WHERE path = ?", (path,)).fetchone() is not None
+
+    def isdir(self, path: str) -> bool:
+        path = normalize_path(path)
+        if not path:
+            return True
+        with self.lock:
+            row = self.connection.execute("SELECT is_dir FROM results WHERE path = ?", (path,)).fetchone()
+        return bool(row and row[0])
+
+    def listdir(self, path: str) -> List[str]:
+        if not self.isdir(path):
+            raise FileNotFoundError(f"{path} is not a directory in the results store {self.path}")
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT name FROM results WHERE parent = ? ORDER BY name", (normalize_path(path),))]
+
+    def iter_files(self, path: str) -> Iterator[str]:
+        path = normalize_path(path)
+        with self.lock:
+            if path:
+                # Every path under the directory sorts between "path/" and "path0" ("0" follows "/")
+                rows = self.connection.execute("SELECT path FROM results WHERE is_dir = 0 AND path >= ? AND path < ? ORDER BY path", (f"{path}/", f"{path}0")).fetchall()
+            else:
+                rows = self.connection.execute("SELECT path FROM results WHERE is_dir = 0 ORDER BY path").fetchall()
+        for row in rows:
+            yield row[0]
+
+# Function to copy every file under the given directories from one store to another, returning the number copied
+def copy_results(source: ResultsStore, target: ResultsStore, paths: List[str]) -> int:
+    copied = 0
+    with target.transaction():
+        for path in paths:
+            if not source.exists(path):
+                logging.warning(f"{path} not found in the {source.backend} results store")
+                continue
+            files = [path] if not source.isdir(path) else source.iter_files(path)
+            for file_path in files:
+                target.write_text(file_path, source.read_text(file_path))
+                copied += 1
+    return copied
+
+# Function to export results to the file tree layout under output_dir, returning the number of files written
+def export_results(store: ResultsStore, output_dir: str, paths: List[str]) -> int:
+    return copy_results(store, FileResultsStore(output_dir), paths)
+
+# Function to get the results store configured in config.yaml (results.backend), shared within the process
+def get_results_store(results_config: Optional[dict] = None) -> ResultsStore:
+    if results_config is None:
+        config = load_config() or {}
+        results_config = config.get('results', {})
+    backend = results_config.get('backend', 'files')
+    if backend == 'files':
+        return FileResultsStore()
+    if backend != 'sqlite':
+        raise ValueError(f"Unsupported results backend: {backend}")
+    path = results_config.get('path', 'data/results.sqlite')
+    with _stores_lock:
+        if path not in _stores:
+            logging.info(f"Opening results store {path}")
+            _stores[path] = SQLiteResultsStore(path)
+        return _stores[path]
@@ -0,0 +1,161 @@
+# src/app/retrieval/exact_search.py
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from app.embeddings.embedding_store import open_store_vectors, read_store_manifest, read_store_metadata_rows
+
+RESULT_COLUMNS = ['file_name', 'page_num', 'chunk_number', 'chunk_text', 'similarity', 'rank']
+
+# Function to L2-normalize the rows of a matrix as float32
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+# Function to select the indices of the top_k scores, best first, using a partial sort
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+# Function to select the top_k column indices of each row of a score matrix, best first
+def top_k_indices_rows(scores: np.ndarray, top_k: int) -> np.ndarray:
+    top_k = min(top_k, scores.shape[1])
+    if top_k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+class ExactSearchEngine:
+    def __init__(self, embeddings: np.ndarray, metadata: pd.DataFrame):
+        """
+        Holds the corpus as one pre-normalized float32 matrix so a query is scored
+        with a single matrix-vector product.
+
+        Args:
+            embeddings (np.ndarray): Matrix of shape (num_chunks, dim).
+            metadata (pd.DataFrame): One row per chunk with file_name, page_num, chunk_number and chunk_text.
+        """
+        if len(embeddings) != len(metadata):
+            raise ValueError(f"Embeddings ({len(embeddings)}) and metadata ({len(metadata)}) row counts differ.")
+        self.embeddings = normalize_rows(embeddings)
+        self.metadata = metadata.reset_index(drop=True)
+        logging.debug(f"Search engine ready with {len(self.metadata)} chunks of dimension {self.embeddings.shape[-1]}")
+
+    def search(self, query_embedding: List[float], top_k: int) -> pd.DataFrame:
+        """
+        Returns the top_k chunks most similar to the query embedding.
+
+        Args:
+            query_embedding (List[float]): The query embedding.
+            top_k (int): Number of chunks to return.
+
+        Returns:
+            pd.DataFrame: The selected chunks with similarity and rank columns.
+        """
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        scores = self.embeddings @ query
+        indices = top_k_indices(scores, top_k)
+        return build_result_frame(self.metadata, indices, scores[indices])
+
+    def search_batch(self, query_embeddings: List[List[float]], top_k: int, query_block_size: int = 256) -> List[pd.DataFrame]:
+        """
+        Returns the top_k chunks for each query, scoring a block of queries against
+        the corpus with one matrix-matrix product.
+
+        Args:
+            query_embeddings (List[List[float]]): One embedding per query.
+            top_k (int): Number of chunks to return per query.
+            query_block_size (int): Number of queries scored per product, bounding the score matrix size.
+
+        Returns:
+            List[pd.DataFrame]: One result frame per query, in the same order.
+        """
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        results = []
+        for start in range(0, len(queries), query_block_size):
+            scores = queries[start:start + query_block_size] @ self.embeddings.T
+            indices = top_k_indices_rows(scores, top_k)
+            for row_indices, row_scores in zip(indices, np.take_along_axis(scores, indices, axis=1)):
+                results.append(build_result_frame(self.metadata, row_indices, row_scores))
+        return results
+
+# Function to scan a (possibly memory-mapped) matrix in blocks, keeping only a running top_k
+def block_top_k(vectors: np.ndarray, query: np.ndarray, top_k: int, block_size: int, normalized: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    best_indices = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        if not normalized:
+            block = normalize_rows(block)
+        block_scores = block @ query
+        block_best = top_k_indices(block_scores, top_k)
+        # Merge the block winners into the running top_k
+        scores = np.concatenate([best_scores, block_scores[block_best]])
+        indices = np.concatenate([best_indices, block_best + start])
+        keep = top_k_indices(scores, top_k)
+        best_scores, best_indices = scores[keep], indices[keep]
+    return best_indices, best_scores
+
+# Function to scan a (possibly memory-mapped) matrix in blocks for many queries at once
+def block_top_k_batch(vectors: np.ndarray, queries: np.ndarray, top_k: int, block_size: int, normalized: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    best_indices = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        if not normalized:
+            block = normalize_rows(block)
+        block_scores = queries @ block.T
+        block_best = top_k_indices_rows(block_scores, top_k)
+        scores = np.concatenate([best_scores, np.take_along_axis(block_scores, block_best, axis=1)], axis=1)
+        indices = np.concatenate([best_indices, block_best + start], axis=1)
+        keep = top_k_indices_rows(scores, top_k)
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_indices = np.take_along_axis(indices, keep, axis=1)
+    return best_indices, best_scores
+
+class MemoryMappedSearchEngine:
+    def __init__(self, store_path: str, block_size: int = 65536):
+        """
+        Searches an embedding store without loading it: vectors are memory-mapped and
+        scanned in fixed-size blocks, and only the selected metadata rows are read.
+
+        Args:
+            store_path (str): Directory of the embedding store.
+            block_size (int): Number of vectors scored per block.
+        """
+        self.store_path = store_path
+        self.block_size = block_size
+        self.normalized = read_store_manifest(store_path).get('normalized', False)
+        self.embeddings = open_store_vectors(store_path)
+        logging.debug(f"Memory-mapped {len(self.embeddings)} vectors from {store_path}")
+
+    def search(self, query_embedding: List[float], top_k: int) -> pd.DataFrame:
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        indices, scores = block_top_k(self.embeddings, query, top_k, self.block_size, self.normalized)
+        metadata = read_store_metadata_rows(self.store_path, indices)
+        return build_result_frame(metadata, np.arange(len(indices)), scores)
+
+    def search_batch(self, query_embeddings: List[List[float]], top_k: int, query_block_size: int = 256) -> List[pd.DataFrame]:
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        results = []
+        # Each pass over the vectors scores a whole block of queries
+        for start in range(0, len(queries), query_block_size):
+            indices, scores = block_top_k_batch(self.embeddings, queries[start:start + query_block_size], top_k, self.block_size, self.normalized)
+            for row_indices, row_scores in zip(indices, scores):
+                metadata = read_store_metadata_rows(self.store_path, row_indices)
+                results.append(build_result_frame(metadata, np.arange(len(row_indices)), row_scores))
+        return results
+
+# Function to build the top chunks DataFrame expected by process_llm
+def build_result_frame(metadata: pd.DataFrame, indices: np.ndarray, scores: np.ndarray) -> pd.DataFrame:
+    result_df = metadata.iloc[indices][['file_name', 'page_num', 'chunk_number', 'chunk_text']].reset_index(drop=True)
+    result_df['similarity'] = np.asarray(scores, dtype=np.float64)
+    result_df['rank'] = result_df.index + 1
+    return result_df[RESULT_COLUMNS]
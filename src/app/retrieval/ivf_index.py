@@ -0,0 +1,133 @@
+# src/app/retrieval/ivf_index.py
+
+import os
+import math
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from app.embeddings.embedding_store import is_derived_file_current, open_store_vectors, read_store_manifest, read_store_metadata_rows
+from app.retrieval.exact_search import block_top_k, block_top_k_batch, build_result_frame, normalize_rows, top_k_indices
+
+INDEX_FILE = "ivf_index.npz"
+
+# Function to pick the number of inverted lists for a corpus size
+def default_nlist(count: int) -> int:
+    return max(1, min(count, int(4 * math.sqrt(count))))
+
+# Function to assign each vector to its most similar centroid, scanning in blocks
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray, block_size: int) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+# Function to train spherical k-means centroids on a sample of the vectors
+def train_centroids(vectors: np.ndarray, nlist: int, iterations: int, sample_size: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sample_ids = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+    sample = normalize_rows(vectors[sample_ids])
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+    for iteration in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Re-seed empty lists with random sample vectors
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+        logging.debug(f"k-means iteration {iteration + 1}/{iterations}: {int(empty.sum())} empty lists")
+    return centroids
+
+# Function to build an IVF index for an embedding store and persist it next to the vectors
+def build_ivf_index(store_path: str, nlist: int = None, iterations: int = 10, sample_size: int = None, block_size: int = 65536) -> Optional[str]:
+    manifest = read_store_manifest(store_path)
+    count = manifest['count']
+    if count == 0:
+        logging.warning(f"Embedding store {store_path} is empty, no IVF index built")
+        return None
+    if not nlist:
+        nlist = default_nlist(count)
+    nlist = min(nlist, count)
+    if sample_size is None:
+        sample_size = max(nlist * 64, 10000)
+
+    logging.info(f"Building IVF index with {nlist} lists for {count} vectors in {store_path}")
+    vectors = open_store_vectors(store_path)
+    centroids = train_centroids(vectors, nlist, iterations, sample_size)
+    assignments = assign_to_centroids(vectors, centroids, block_size)
+    list_ids = np.argsort(assignments, kind='stable')
+    list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))])
+
+    index_path = os.path.join(store_path, INDEX_FILE)
+    np.savez(index_path, centroids=centroids, list_offsets=list_offsets, list_ids=list_ids, count=np.int64(count))
+    logging.info(f"IVF index saved to {index_path}")
+    return index_path
+
+# Function to load the IVF index of a store, or None when missing or built for a different store size
+def load_ivf_index(store_path: str) -> Optional[Dict[str, Any]]:
+    index_path = os.path.join(store_path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None
+    if not is_derived_file_current(store_path, index_path):
+        logging.warning(f"IVF index {index_path} is stale (vectors rewritten after it was built)")
+        return None
+    with np.load(index_path) as index:
+        index = {key: index[key] for key in index.files}
+    if int(index['count']) != read_store_manifest(store_path)['count']:
+        logging.warning(f"IVF index {index_path} is stale (store size changed)")
+        return None
+    return index
+
+class IVFSearchEngine:
+    def __init__(self, store_path: str, index: Dict[str, Any], nprobe: int = 8, block_size: int = 65536):
+        """
+        Approximate search over an embedding store with an inverted file index: only the
+        vectors of the nprobe lists whose centroids are closest to the query are scored.
+        When nprobe covers every list the search is exact.
+
+        Args:
+            store_path (str): Directory of the embedding store.
+            index (Dict[str, Any]): Index returned by load_ivf_index.
+            nprobe (int): Number of inverted lists scanned per query (higher = better recall, slower).
+            block_size (int): Number of vectors scored per block for exact scans.
+        """
+        self.store_path = store_path
+        self.centroids = index['centroids']
+        self.list_offsets = index['list_offsets']
+        self.list_ids = index['list_ids']
+        self.nprobe = nprobe
+        self.block_size = block_size
+        self.embeddings = open_store_vectors(store_path)
+
+    def search_ids(self, query: np.ndarray, top_k: int):
+        nlist = len(self.centroids)
+        if self.nprobe >= nlist:
+            return block_top_k(self.embeddings, query, top_k, self.block_size)
+        probe_lists = top_k_indices(self.centroids @ query, self.nprobe)
+        candidate_ids = np.sort(np.concatenate([self.list_ids[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe_lists]))
+        scores = np.asarray(self.embeddings[candidate_ids], dtype=np.float32) @ query
+        best = top_k_indices(scores, top_k)
+        return candidate_ids[best], scores[best]
+
+    def search(self, query_embedding: List[float], top_k: int) -> pd.DataFrame:
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        indices, scores = self.search_ids(query, top_k)
+        metadata = read_store_metadata_rows(self.store_path, indices)
+        return build_result_frame(metadata, np.arange(len(indices)), scores)
+
+    def search_batch(self, query_embeddings: List[List[float]], top_k: int) -> List[pd.DataFrame]:
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        if self.nprobe >= len(self.centroids):
+            indices, scores = block_top_k_batch(self.embeddings, queries, top_k, self.block_size)
+        else:
+            # Each query probes its own lists, so candidates are scored per query
+            indices, scores = zip(*(self.search_ids(query, top_k) for query in queries)) if len(queries) else ([], [])
+        results = []
+        for row_indices, row_scores in zip(indices, scores):
+            metadata = read_store_metadata_rows(self.store_path, row_indices)
+            results.append(build_result_frame(metadata, np.arange(len(row_indices)), row_scores))
+        return results
@@ -0,0 +1,116 @@
+# src/app/retrieval/quantized_search.py
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+from app.embeddings.embedding_store import is_derived_file_current, open_store_vectors, read_store_manifest, read_store_metadata_rows
+from app.retrieval.exact_search import build_result_frame, normalize_rows, top_k_indices_rows
+
+QUANTIZED_FILES = {"float16": "vectors.f16", "int8": "vectors.i8"}
+SCALES_FILE = "vectors.i8.scale"
+
+# Function to write a float16 or int8 copy of the store vectors next to the float32 ones
+def quantize_store(store_path: str, dtype: str, block_size: int = 65536) -> Optional[str]:
+    if dtype not in QUANTIZED_FILES:
+        raise ValueError(f"Unsupported quantization dtype: {dtype}")
+    vectors = open_store_vectors(store_path)
+    quantized_path = os.path.join(store_path, QUANTIZED_FILES[dtype])
+    logging.info(f"Quantizing {len(vectors)} vectors of {store_path} to {dtype}")
+    with open(quantized_path, 'wb') as f:
+        scales_file = open(os.path.join(store_path, SCALES_FILE), 'wb') if dtype == "int8" else None
+        try:
+            for start in range(0, len(vectors), block_size):
+                block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+                if dtype == "float16":
+                    block.astype(np.float16).tofile(f)
+                    continue
+                # Symmetric per-vector scale: the largest component maps to 127
+                scales = np.abs(block).max(axis=1) / 127.0
+                scales[scales == 0] = 1.0
+                np.round(block / scales[:, None]).astype(np.int8).tofile(f)
+                scales.astype(np.float32).tofile(scales_file)
+        finally:
+            if scales_file is not None:
+                scales_file.close()
+    logging.info(f"Quantized vectors saved to {quantized_path}")
+    return quantized_path
+
+# Function to load the quantized vectors (and int8 scales) of a store, or None when missing or older than the vectors
+def load_quantized_vectors(store_path: str, dtype: str) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    manifest = read_store_manifest(store_path)
+    quantized_path = os.path.join(store_path, QUANTIZED_FILES[dtype])
+    item_type = np.float16 if dtype == "float16" else np.int8
+    expected_size = manifest['count'] * manifest['dim'] * np.dtype(item_type).itemsize
+    if not is_derived_file_current(store_path, quantized_path) or os.path.getsize(quantized_path) != expected_size:
+        return None
+    vectors = np.fromfile(quantized_path, dtype=item_type).reshape(manifest['count'], manifest['dim'])
+    scales = None
+    if dtype == "int8":
+        scales_path = os.path.join(store_path, SCALES_FILE)
+        if not is_derived_file_current(store_path, scales_path) or os.path.getsize(scales_path) != manifest['count'] * 4:
+            return None
+        scales = np.fromfile(scales_path, dtype=np.float32)
+    return vectors, scales
+
+class QuantizedSearchEngine:
+    def __init__(self, store_path: str, vectors: np.ndarray, scales: Optional[np.ndarray] = None, rerank_factor: int = 4, block_size: int = 65536):
+        """
+        Searches an embedding store with its quantized vectors held in memory. The
+        quantized scan selects top_k * rerank_factor candidates, which are re-scored
+        with the full-precision float32 vectors (memory-mapped) for the final top_k.
+
+        Args:
+            store_path (str): Directory of the embedding store.
+            vectors (np.ndarray): float16 or int8 matrix returned by load_quantized_vectors.
+            scales (Optional[np.ndarray]): Per-vector scales of int8 vectors.
+            rerank_factor (int): Candidate pool size as a multiple of top_k.
+            block_size (int): Number of quantized vectors scored per block.
+        """
+        self.store_path = store_path
+        self.vectors = vectors
+        self.scales = scales
+        self.rerank_factor = max(1, rerank_factor)
+        self.block_size = block_size
+        self.embeddings = open_store_vectors(store_path)
+        logging.debug(f"Quantized search over {len(vectors)} {vectors.dtype} vectors from {store_path}")
+
+    def search_ids(self, queries: np.ndarray, top_k: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        pool_size = top_k * self.rerank_factor
+        pool_indices = np.empty((len(queries), 0), dtype=np.int64)
+        pool_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.vectors), self.block_size):
+            block_scores = queries @ self.vectors[start:start + self.block_size].astype(np.float32).T
+            if self.scales is not None:
+                block_scores *= self.scales[start:start + self.block_size]
+            block_best = top_k_indices_rows(block_scores, pool_size)
+            scores = np.concatenate([pool_scores, np.take_along_axis(block_scores, block_best, axis=1)], axis=1)
+            indices = np.concatenate([pool_indices, block_best + start], axis=1)
+            keep = top_k_indices_rows(scores, pool_size)
+            pool_scores = np.take_along_axis(scores, keep, axis=1)
+            pool_indices = np.take_along_axis(indices, keep, axis=1)
+
+        # Re-rank each candidate pool with the full-precision vectors
+        best_indices = []
+        best_scores = []
+        for query, candidates in zip(queries, pool_indices):
+            candidates = np.sort(candidates)
+            exact_scores = np.asarray(self.embeddings[candidates], dtype=np.float32) @ query
+            best = top_k_indices_rows(exact_scores.reshape(1, -1), top_k)[0]
+            best_indices.append(candidates[best])
+            best_scores.append(exact_scores[best])
+        return best_indices, best_scores
+
+    def search(self, query_embedding: List[float], top_k: int) -> pd.DataFrame:
+        return self.search_batch([query_embedding], top_k)[0]
+
+    def search_batch(self, query_embeddings: List[List[float]], top_k: int, query_block_size: int = 256) -> List[pd.DataFrame]:
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        results = []
+        for start in range(0, len(queries), query_block_size):
+            indices, scores = self.search_ids(queries[start:start + query_block_size], top_k)
+            for row_indices, row_scores in zip(indices, scores):
+                metadata = read_store_metadata_rows(self.store_path, row_indices)
+                results.append(build_result_frame(metadata, np.arange(len(row_indices)), row_scores))
+        return results
@@ -0,0 +1,270 @@
+# src/benchmarks/pipeline_benchmark.py
+
+import os
+import sys
+import json
+import random
+import shutil
+import logging
+import tempfile
+import subprocess
+import fitz  # PyMuPDF for PDF generation
+import yaml
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from app.results_store import FileResultsStore, SQLiteResultsStore
+from benchmarks.retrieval_benchmark import SRC_DIR, environment_info
+
+REPO_DIR = os.path.dirname(SRC_DIR)
+STAGES = ["process-docs", "run-experiments", "prepare-evaluation-prompts", "run-evaluators", "parse-evaluations"]
+LOGS_DIR = "logs"
+METRICS_PATH = "data/metrics/calls.jsonl"
+EXPERIMENTS_DIR = "data/experiments"
+
+# Words the generated documents and queries are made of
+WORDS = (
+    "o a de que e do da em um para com não uma os no se na por mais as dos como mas "
+    "consumidor fornecedor serviço produto contrato direito prazo cancelamento oferta "
+    "garantia reparação dano informação publicidade cláusula pagamento multa defeito "
+    "prestação relação proteção código artigo parágrafo inciso responsabilidade"
+).split()
+
+# Function to generate deterministic sentences of the benchmark vocabulary
+def generate_text(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 20))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        words -= length
+    return " ".join(sentences)
+
+# Function to write the benchmark PDFs, returning their paths
+def generate_pdfs(pdf_dir: str, num_pdfs: int, pages_per_pdf: int, words_per_page: int, seed: int = 0) -> List[str]:
+    os.makedirs(pdf_dir, exist_ok=True)
+    pdf_paths = []
+    for pdf_index in range(num_pdfs):
+        rng = random.Random(f"{seed}-{pdf_index}")
+        pdf_path = os.path.join(pdf_dir, f"benchmark_{pdf_index:03d}.pdf")
+        with fitz.open() as document:
+            for _ in range(pages_per_pdf):
+                page = document.new_page()
+                page.insert_textbox(page.rect + (50, 50, -50, -50), generate_text(rng, words_per_page), fontsize=7)
+            document.save(pdf_path)
+        pdf_paths.append(pdf_path)
+    return pdf_paths
+
+# Function to write the benchmark config.yaml: the base config switched to the local providers and paths inside the work directory
+def write_benchmark_config(base_config_path: str, config_path: str, llm_models: List[str], provider_latency: bool = True, results_backend: str = "files") -> Dict[str, Any]:
+    with open(base_config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['embeddings']['default'] = "local"
+    config['embeddings']['output_format'] = "store"
+    config['embeddings'].setdefault('cache', {})['path'] = "data/cache/embeddings.sqlite"
+    config['llm'].setdefault('cache', {})['path'] = "data/cache/llm.sqlite"
+    config['llm']['evaluators'] = {"local": llm_models}
+    config['metrics'] = dict(config.get('metrics', {}), enabled=True, path=METRICS_PATH)
+    config['results'] = dict(config.get('results', {}), backend=results_backend, path="data/results.sqlite")
+    if not provider_latency:
+        config['embeddings']['models']['local'].update({"latency": {"distribution": "fixed", "mean_seconds": 0.0}, "per_item_seconds": 0.0})
+        for model_config in config['llm']['providers']['local']['llm_models'].values():
+            model_config.update({"ttft": {"distribution": "fixed", "mean_seconds": 0.0}, "tokens_per_second": 0})
+    with open(config_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+    return config
+
+# Function to write the experiments configuration: one experiment per query, every local LLM against every PDF store
+def write_benchmark_experiments(experiments_path: str, pdf_paths: List[str], llm_models: List[str], num_queries: int, max_workers: int, seed: int = 0) -> str:
+    rng = random.Random(f"{seed}-queries")
+    embeddings = [{"csv": os.path.join("data", "processed", f"{os.path.splitext(os.path.basename(pdf_path))[0]}_processed_local.store"), "model": "local"} for pdf_path in pdf_paths]
+    experiments = {
+        "concurrency": {"max_workers": max_workers, "per_provider": {"local": max_workers}},
+        "experiments": {
+            f"experiment_{i + 1}": {
+                "params_fixed": {"query": generate_text(rng, 12).rstrip(".") + "?", "system_message": "", "top_k": 5},
+                "params_variations": {
+                    "llm_model": [{"provider": "local", "model": model} for model in llm_models],
+                    "embeddings": embeddings
+                }
+            } for i in range(num_queries)
+        }
+    }
+    with open(experiments_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(experiments, f, allow_unicode=True, sort_keys=False)
+    return experiments_path
+
+# Function to list the command of each pipeline stage, run from the work directory
+def stage_commands(experiments_path: str) -> List[Tuple[str, List[str]]]:
+    cli = [sys.executable, os.path.join(SRC_DIR, "cli", "main.py")]
+    return [
+        ("process-docs", cli + ["process-docs", "--pdf_dir", "data/pdfs", "--output_dir", "data/processed", "--embedding_model", "local"]),
+        ("run-experiments", cli + ["run-experiments", "--config", experiments_path]),
+        ("prepare-evaluation-prompts", cli + ["prepare-evaluation-prompts", "--data_dir", "data/experiments"]),
+        ("run-evaluators", cli + ["run-evaluators", "--evaluation_dir", "data/evaluations"]),
+        ("parse-evaluations", [sys.executable, os.path.join(SRC_DIR, "app", "llm", "parse_evaluations.py")])
+    ]
+
+# Function to snapshot the size and modification time of every file under a directory
+def snapshot_files(root: str, exclude: Tuple[str, ...] = ()) -> Dict[str, Tuple[int, int]]:
+    files = {}
+    for directory, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if os.path.join(directory, d) not in exclude]
+        for name in names:
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+# Function to count the provider calls recorded in the metrics file after a byte offset, by kind and status
+def count_provider_calls(metrics_path: str, offset: int) -> Dict[str, int]:
+    counts = {}
+    if not os.path.exists(metrics_path):
+        return counts
+    with open(metrics_path, 'r', encoding='utf-8') as f:
+        f.seek(offset)
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                key = f"{record['kind']}_{record['status']}"
+                counts[key] = counts.get(key, 0) + 1
+    return counts
+
+# Function to run one stage through the stage runner and measure its time, memory, files written and provider calls
+def run_stage(name: str, command: List[str], work_dir: str, env: Dict[str, str]) -> Dict[str, Any]:
+    log_path = os.path.join(work_dir, LOGS_DIR, f"{name}.log")
+    result_path = os.path.join(work_dir, LOGS_DIR, f"{name}.json")
+    metrics_path = os.path.join(work_dir, METRICS_PATH)
+    exclude = (os.path.join(work_dir, LOGS_DIR),)
+    before = snapshot_files(work_dir, exclude)
+    metrics_offset = os.path.getsize(metrics_path) if os.path.exists(metrics_path) else 0
+
+    logging.info(f"Running stage {name}")
+    with open(log_path, 'w', encoding='utf-8') as log_file:
+        # The stage runner launches the stage, so its peak RSS does not start from this process' memory
+        subprocess.run([sys.executable, "-m", "benchmarks.stage_runner", result_path, work_dir] + command, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    with open(result_path, 'r', encoding='utf-8') as f:
+        stage = dict({"stage": name}, **json.load(f))
+
+    after = snapshot_files(work_dir, exclude)
+    written = [path for path, stat in after.items() if before.get(path) != stat]
+    stage.update({
+        "cpu_seconds": stage['user_cpu_seconds'] + stage['system_cpu_seconds'],
+        "files_written": len(written),
+        "bytes_written": sum(after[path][0] for path in written),
+        "provider_calls": count_provider_calls(metrics_path, metrics_offset),
+        "log": log_path
+    })
+    return stage
+
+# Function to count the run directories written by run-experiments, in the results store of the stages
+def count_run_dirs(work_dir: str, results_backend: str) -> int:
+    if results_backend == "sqlite":
+        store = SQLiteResultsStore(os.path.join(work_dir, "data", "results.sqlite"))
+    else:
+        store = FileResultsStore(work_dir)
+    if not store.exists(EXPERIMENTS_DIR):
+        return 0
+    count = 0
+    for experiment_id in store.listdir(EXPERIMENTS_DIR):
+        experiment_dir = os.path.join(EXPERIMENTS_DIR, experiment_id)
+        if experiment_id.startswith("experiment_") and store.isdir(experiment_dir):
+            count += sum(1 for name in store.listdir(experiment_dir) if name.startswith("experiment_") and store.isdir(os.path.join(experiment_dir, name)))
+    return count
+
+# Function to run the whole pipeline once in a fresh work directory
+def run_pipeline_once(work_dir: str, base_config_path: str, num_pdfs: int, pages_per_pdf: int, words_per_page: int, num_queries: int, llm_models: List[str], max_workers: int, provider_latency: bool, results_backend: str, seed: int) -> Dict[str, Any]:
+    os.makedirs(os.path.join(work_dir, LOGS_DIR), exist_ok=True)
+    config_path = os.path.join(work_dir, "config.yaml")
+    experiments_path = os.path.join(work_dir, "experiments.yaml")
+    pdf_paths = generate_pdfs(os.path.join(work_dir, "data", "pdfs"), num_pdfs, pages_per_pdf, words_per_page, seed)
+    write_benchmark_config(base_config_path, config_path, llm_models, provider_latency, results_backend)
+    write_benchmark_experiments(experiments_path, pdf_paths, llm_models, num_queries, max_workers, seed)
+    env = dict(os.environ, CONFIG_PATH=config_path, PYTHONPATH=os.pathsep.join([SRC_DIR, os.path.join(SRC_DIR, "experiments")]))
+
+    stages = []
+    for name, command in stage_commands(experiments_path):
+        stage = run_stage(name, command, work_dir, env)
+        stages.append(stage)
+        logging.info(f"Stage {name}: {stage['wall_seconds']:.2f}s wall, {stage['cpu_seconds']:.2f}s CPU, {stage['peak_rss_mb']:.0f} MB peak, {stage['files_written']} files written")
+        if stage['returncode'] != 0:
+            logging.error(f"Stage {name} failed with exit code {stage['returncode']}, see {stage['log']}")
+            break
+        if name == "run-experiments":
+            # Runs sharing a directory would overwrite each other, and the later stages would measure fewer of them
+            stage['run_dirs'] = count_run_dirs(work_dir, results_backend)
+            expected = num_queries * len(llm_models) * num_pdfs
+            if stage['run_dirs'] != expected:
+                raise RuntimeError(f"run-experiments wrote {stage['run_dirs']} run directories, expected {expected} ({num_queries} queries x {len(llm_models)} models x {num_pdfs} PDFs), see {stage['log']}")
+    return {"work_dir": work_dir, "stages": stages}
+
+# Function to run the pipeline benchmark, optionally several times, and summarize each stage by its median
+def run_pipeline_benchmark(base_config_path: str, num_pdfs: int = 4, pages_per_pdf: int = 20, words_per_page: int = 400, num_queries: int = 4, llm_models: List[str] = None, max_workers: int = 4, provider_latency: bool = True, results_backend: str = "files", repeat: int = 1, seed: int = 0, work_dir: Optional[str] = None, keep: bool = False) -> Dict[str, Any]:
+    """
+    Runs process-docs, run-experiments, prepare-evaluation-prompts, run-evaluators and
+    parse_evaluations on generated PDFs with the local providers, each stage as its
+    own subprocess in a fresh work directory, and measures wall time, CPU time, peak
+    memory, files written and provider calls per stage.
+
+    Args:
+        base_config_path (str): config.yaml the benchmark config is derived from.
+        num_pdfs (int): Generated PDFs.
+        pages_per_pdf (int): Pages per PDF.
+        words_per_page (int): Words per page.
+        num_queries (int): Experiments (one query each); each runs every LLM model against every PDF store.
+        llm_models (List[str]): Local LLM models used by the experiments and the evaluators.
+        max_workers (int): Experiment runs executed in parallel.
+        provider_latency (bool): Keep the simulated provider latency of the config (False = no waiting).
+        results_backend (str): Results store the stages write to ("files" or "sqlite").
+        repeat (int): Pipeline runs, each in a fresh work directory.
+        seed (int): Seed of the generated PDFs and queries.
+        work_dir (Optional[str]): Parent directory of the run directories (a temporary directory by default).
+        keep (bool): Keep the run directories after the benchmark.
+
+    Returns:
+        Dict[str, Any]: The environment, parameters, every run and the per-stage medians.
+    """
+    llm_models = llm_models or ["local-llm"]
+    parent_dir = work_dir or tempfile.mkdtemp(prefix="pipeline_benchmark_")
+    report = {
+        "environment": environment_info(),
+        "parameters": {"num_pdfs": num_pdfs, "pages_per_pdf": pages_per_pdf, "words_per_page": words_per_page, "num_queries": num_queries, "llm_models": llm_models, "max_workers": max_workers, "provider_latency": provider_latency, "results_backend": results_backend, "repeat": repeat, "seed": seed},
+        "runs": []
+    }
+    try:
+        for run in range(repeat):
+            run_dir = os.path.join(parent_dir, f"run_{run + 1}")
+            if os.path.exists(run_dir):
+                raise FileExistsError(f"Benchmark run directory {run_dir} already exists")
+            report['runs'].append(run_pipeline_once(run_dir, base_config_path, num_pdfs, pages_per_pdf, words_per_page, num_queries, llm_models, max_workers, provider_latency, results_backend, seed))
+    finally:
+        if not keep and work_dir is None:
+            shutil.rmtree(parent_dir, ignore_errors=True)
+
+    report['stages'] = summarize_stages(report['runs'])
+    return report
+
+# Function to take the median of each stage measurement over the runs where the stage succeeded
+def summarize_stages(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    summary = []
+    for name in STAGES:
+        measured = [stage for run in runs for stage in run['stages'] if stage['stage'] == name and stage['returncode'] == 0]
+        if not measured:
+            continue
+        row = {"stage": name, "runs": len(measured)}
+        for key in ("wall_seconds", "cpu_seconds", "user_cpu_seconds", "system_cpu_seconds", "peak_rss_mb", "files_written", "bytes_written"):
+            row[key] = float(np.median([stage[key] for stage in measured]))
+        summary.append(row)
+    return summary
+
+# Function to compare the stage medians of a report with a baseline report, returning the stages that got slower
+def compare_stage_reports(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.1) -> List[Dict[str, Any]]:
+    baseline_stages = {stage['stage']: stage for stage in baseline.get('stages', [])}
+    regressions = []
+    for stage in report['stages']:
+        previous = baseline_stages.get(stage['stage'])
+        if previous is None:
+            continue
+        for key in ("wall_seconds", "cpu_seconds", "peak_rss_mb"):
+            if previous[key] and stage[key] / previous[key] - 1 > tolerance:
+                regressions.append({"stage": stage['stage'], "measure": key, "value": stage[key], "baseline": previous[key]})
+    return regressions
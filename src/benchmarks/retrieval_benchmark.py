@@ -0,0 +1,266 @@
+# src/benchmarks/retrieval_benchmark.py
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import resource
+import subprocess
+import numpy as np
+from typing import Any, Dict, List, Optional
+from app.embeddings.embedding_store import EmbeddingStoreWriter, is_embedding_store, load_embedding_store, open_store_vectors, read_store_manifest
+from app.retrieval.exact_search import ExactSearchEngine, MemoryMappedSearchEngine, block_top_k_batch, normalize_rows
+from app.retrieval.ivf_index import IVFSearchEngine, build_ivf_index, load_ivf_index
+from app.retrieval.quantized_search import QUANTIZED_FILES, QuantizedSearchEngine, load_quantized_vectors, quantize_store
+
+SYNTHETIC_FILE = "synthetic.json"
+QUERIES_FILE = "queries.npy"
+GROUND_TRUTH_FILE = "ground_truth.npy"
+ENGINES = ["exact", "mmap", "ivf"] + list(QUANTIZED_FILES)
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Function to generate a block of clustered unit vectors; the same seed and block always give the same vectors
+def generate_vectors(centers: np.ndarray, count: int, spread: float, seed: int, block: int) -> np.ndarray:
+    rng = np.random.default_rng([seed, block])
+    assignments = rng.integers(0, len(centers), size=count)
+    # Noise is scaled by the dimension so spread is the expected distance from the cluster center
+    noise = rng.standard_normal((count, centers.shape[1]), dtype=np.float32) * (spread / np.sqrt(centers.shape[1]))
+    vectors = centers[assignments] + noise
+    return normalize_rows(vectors)
+
+# Function to generate the cluster centers of a synthetic corpus
+def generate_centers(dim: int, clusters: int, seed: int) -> np.ndarray:
+    return normalize_rows(np.random.default_rng([seed, 0x5EED]).standard_normal((clusters, dim), dtype=np.float32))
+
+# Function to write a synthetic embedding store, reusing an existing one generated with the same parameters
+def generate_synthetic_store(store_path: str, count: int, dim: int, clusters: int = 1000, spread: float = 0.35, seed: int = 0, block_rows: int = 100000) -> str:
+    parameters = {"count": count, "dim": dim, "clusters": clusters, "spread": spread, "seed": seed}
+    synthetic_path = os.path.join(store_path, SYNTHETIC_FILE)
+    if is_embedding_store(store_path) and os.path.exists(synthetic_path):
+        with open(synthetic_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == parameters and read_store_manifest(store_path)['count'] == count:
+                logging.info(f"Reusing synthetic store {store_path}")
+                return store_path
+
+    logging.info(f"Generating synthetic store {store_path} with {count} vectors of dimension {dim}")
+    centers = generate_centers(dim, clusters, seed)
+    with EmbeddingStoreWriter(store_path, "synthetic") as writer:
+        for block, start in enumerate(range(0, count, block_rows)):
+            rows = min(block_rows, count - start)
+            # chunk_number holds the row id, so search results can be matched against the ground truth
+            records = [{"file_name": f"synthetic_{i // 10000}.pdf", "page_num": i // 10 % 1000, "chunk_number": i, "chunk_text": f"synthetic chunk {i}"} for i in range(start, start + rows)]
+            writer.append(records, generate_vectors(centers, rows, spread, seed, block + 1))
+    with open(synthetic_path, 'w', encoding='utf-8') as f:
+        json.dump(parameters, f, indent=4)
+    for derived_file in (QUERIES_FILE, GROUND_TRUTH_FILE):
+        if os.path.exists(os.path.join(store_path, derived_file)):
+            os.remove(os.path.join(store_path, derived_file))
+    return store_path
+
+# Function to generate the benchmark queries of a store (same distribution, different seed) and their exact top results
+def prepare_queries(store_path: str, num_queries: int, max_top_k: int, block_size: int = 65536) -> Dict[str, np.ndarray]:
+    with open(os.path.join(store_path, SYNTHETIC_FILE), 'r', encoding='utf-8') as f:
+        parameters = json.load(f)
+    queries_path = os.path.join(store_path, QUERIES_FILE)
+    ground_truth_path = os.path.join(store_path, GROUND_TRUTH_FILE)
+    if os.path.exists(queries_path) and os.path.exists(ground_truth_path):
+        queries = np.load(queries_path)
+        ground_truth = np.load(ground_truth_path)
+        if len(queries) == num_queries and ground_truth.shape[1] >= max_top_k:
+            return {"queries": queries, "ground_truth": ground_truth}
+
+    centers = generate_centers(parameters['dim'], parameters['clusters'], parameters['seed'])
+    queries = generate_vectors(centers, num_queries, parameters['spread'], parameters['seed'], 0)
+    logging.info(f"Computing exact top {max_top_k} of {num_queries} queries for {store_path}")
+    ground_truth, _ = block_top_k_batch(open_store_vectors(store_path), queries, max_top_k, block_size)
+    np.save(queries_path, queries)
+    np.save(ground_truth_path, ground_truth)
+    return {"queries": queries, "ground_truth": ground_truth}
+
+# Function to build the index or quantized vectors an engine needs, returning the build time in seconds
+def prepare_engine(store_path: str, engine: str, nlist: Optional[int] = None) -> float:
+    started_at = time.perf_counter()
+    if engine == "ivf" and load_ivf_index(store_path) is None:
+        build_ivf_index(store_path, nlist=nlist)
+    elif engine in QUANTIZED_FILES and load_quantized_vectors(store_path, engine) is None:
+        quantize_store(store_path, engine)
+    else:
+        return 0.0
+    return time.perf_counter() - started_at
+
+# Function to open a search engine over a store the way process_query does
+def open_engine(store_path: str, engine: str, nprobe: Optional[int] = None, rerank_factor: int = 4, block_size: int = 65536):
+    if engine == "exact":
+        return ExactSearchEngine(*load_embedding_store(store_path))
+    if engine == "mmap":
+        return MemoryMappedSearchEngine(store_path, block_size=block_size)
+    if engine == "ivf":
+        return IVFSearchEngine(store_path, load_ivf_index(store_path), nprobe=nprobe, block_size=block_size)
+    if engine in QUANTIZED_FILES:
+        return QuantizedSearchEngine(store_path, *load_quantized_vectors(store_path, engine), rerank_factor=rerank_factor, block_size=block_size)
+    raise ValueError(f"Unsupported search engine: {engine}")
+
+# Function to get the peak resident set size of this process, in megabytes
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# Function to summarize latencies in seconds as milliseconds percentiles
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "qps": float(len(latencies) / (latencies_ms.sum() / 1000)) if latencies_ms.sum() > 0 else None
+    }
+
+# Function to run one benchmark case (store, engine and parameters) in the current process
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    baseline_rss_mb = peak_rss_mb()
+    prepared = prepare_queries(case['store_path'], case['num_queries'], max(case['top_k']))
+    queries, ground_truth = prepared['queries'], prepared['ground_truth']
+
+    started_at = time.perf_counter()
+    engine = open_engine(case['store_path'], case['engine'], case.get('nprobe'), case.get('rerank_factor', 4))
+    load_seconds = time.perf_counter() - started_at
+
+    results = []
+    for top_k in case['top_k']:
+        for query in queries[:case.get('warmup', 3)]:
+            engine.search(query, top_k)
+        latencies = []
+        recalls = []
+        for query, exact_ids in zip(queries, ground_truth):
+            started_at = time.perf_counter()
+            result_df = engine.search(query, top_k)
+            latencies.append(time.perf_counter() - started_at)
+            found_ids = set(result_df['chunk_number'].astype(np.int64).tolist())
+            recalls.append(len(found_ids.intersection(exact_ids[:top_k].tolist())) / min(top_k, len(exact_ids)))
+        results.append({"top_k": top_k, "latency": latency_summary(latencies), "recall": float(np.mean(recalls))})
+    return {
+        "load_seconds": load_seconds,
+        "baseline_rss_mb": baseline_rss_mb,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results
+    }
+
+# Function to run a benchmark case in a fresh subprocess, so its peak memory is measured on its own
+def run_case_subprocess(case: Dict[str, Any]) -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run([sys.executable, "-m", "benchmarks.retrieval_benchmark", json.dumps(case)], env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark case {case['engine']} on {case['store_path']} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+# Function to describe the machine and code version the benchmark ran on
+def environment_info() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=SRC_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count()
+    }
+
+# Function to run the retrieval benchmark over synthetic stores of several sizes
+def run_retrieval_benchmark(store_dir: str, sizes: List[int], engines: List[str], top_k: List[int], dim: int = 256, num_queries: int = 100, nprobe: List[int] = None, nlist: Optional[int] = None, rerank_factor: int = 4, clusters: int = 1000, seed: int = 0, exact_max_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Generates (or reuses) a synthetic store per size and measures every engine on it
+    in its own subprocess: load time, per-query latency percentiles, peak RSS and
+    recall against exact search, per top_k.
+
+    Args:
+        store_dir (str): Directory holding the synthetic stores, reused across runs.
+        sizes (List[int]): Number of chunks of each store.
+        engines (List[str]): Engines to measure: exact, mmap, ivf, float16, int8.
+        top_k (List[int]): top_k values to measure.
+        dim (int): Vector dimensions.
+        num_queries (int): Queries per top_k.
+        nprobe (List[int]): nprobe values measured for the ivf engine.
+        nlist (Optional[int]): IVF lists (defaults to default_nlist of the store size).
+        rerank_factor (int): Candidates re-ranked per result by the quantized engines.
+        clusters (int): Clusters of the synthetic vector distribution.
+        seed (int): Seed of the synthetic vectors and queries.
+        exact_max_size (Optional[int]): Largest store loaded by the in-memory exact engine.
+
+    Returns:
+        Dict[str, Any]: The environment, parameters and one entry per size, engine and top_k.
+    """
+    report = {
+        "environment": environment_info(),
+        "parameters": {"sizes": sizes, "engines": engines, "top_k": top_k, "dim": dim, "num_queries": num_queries, "nprobe": nprobe, "nlist": nlist, "rerank_factor": rerank_factor, "clusters": clusters, "seed": seed},
+        "results": []
+    }
+    for size in sizes:
+        store_path = os.path.join(store_dir, f"synthetic_{size}_{dim}d.store")
+        started_at = time.perf_counter()
+        generate_synthetic_store(store_path, size, dim, clusters=clusters, seed=seed)
+        prepare_queries(store_path, num_queries, max(top_k))
+        logging.info(f"Store of {size} vectors ready in {time.perf_counter() - started_at:.1f}s")
+        for engine in engines:
+            if engine == "exact" and exact_max_size is not None and size > exact_max_size:
+                logging.info(f"Skipping the in-memory exact engine for {size} vectors (above {exact_max_size})")
+                continue
+            build_seconds = prepare_engine(store_path, engine, nlist)
+            for engine_nprobe in (nprobe or [8]) if engine == "ivf" else [None]:
+                case = {"store_path": store_path, "engine": engine, "nprobe": engine_nprobe, "rerank_factor": rerank_factor, "num_queries": num_queries, "top_k": top_k}
+                logging.info(f"Benchmarking {engine}{f' (nprobe={engine_nprobe})' if engine_nprobe else ''} on {size} vectors")
+                measured = run_case_subprocess(case)
+                for result in measured['results']:
+                    report['results'].append({
+                        "size": size,
+                        "dim": dim,
+                        "engine": engine,
+                        "nprobe": engine_nprobe,
+                        "top_k": result['top_k'],
+                        "build_seconds": build_seconds,
+                        "load_seconds": measured['load_seconds'],
+                        "baseline_rss_mb": measured['baseline_rss_mb'],
+                        "peak_rss_mb": measured['peak_rss_mb'],
+                        "latency": result['latency'],
+                        "recall": result['recall']
+                    })
+    return report
+
+# Function to compare a report with a baseline report, returning the cases whose p95 latency or recall got worse
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any], latency_tolerance: float = 0.1, recall_tolerance: float = 0.01) -> List[Dict[str, Any]]:
+    def case_key(result: Dict[str, Any]):
+        return (result['size'], result['dim'], result['engine'], result['nprobe'], result['top_k'])
+
+    baseline_results = {case_key(result): result for result in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        previous = baseline_results.get(case_key(result))
+        if previous is None:
+            continue
+        p95_change = result['latency']['p95_ms'] / previous['latency']['p95_ms'] - 1 if previous['latency']['p95_ms'] else 0.0
+        recall_change = result['recall'] - previous['recall']
+        if p95_change > latency_tolerance or recall_change < -recall_tolerance:
+            regressions.append({
+                "size": result['size'],
+                "engine": result['engine'],
+                "nprobe": result['nprobe'],
+                "top_k": result['top_k'],
+                "p95_ms": result['latency']['p95_ms'],
+                "baseline_p95_ms": previous['latency']['p95_ms'],
+                "recall": result['recall'],
+                "baseline_recall": previous['recall']
+            })
+    return regressions
+
+if __name__ == '__main__':
+    # Worker entry point of run_case_subprocess: logs go to stderr, the result is the last stdout line
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    print(json.dumps(run_case(json.loads(sys.argv[1]))))
@@ -0,0 +1,36 @@
+# src/benchmarks/stage_runner.py
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+# Runs one pipeline stage and writes its exit code, wall time and rusage to a JSON file.
+# Kept free of third-party imports: a child's peak RSS starts from the memory of the
+# process that spawned it, so stages are launched from this small process instead of
+# the benchmark itself.
+#
+# Usage: python -m benchmarks.stage_runner <result_json> <cwd> <command...>
+
+def main(argv):
+    result_path, cwd, command = argv[0], argv[1], argv[2:]
+    started_at = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd)
+    # wait4 reaps the stage and returns its resource usage, including the worker processes it waited for
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    result = {
+        "returncode": process.returncode,
+        "wall_seconds": time.perf_counter() - started_at,
+        "user_cpu_seconds": rusage.ru_utime,
+        "system_cpu_seconds": rusage.ru_stime,
+        # Linux reports kilobytes, macOS bytes
+        "peak_rss_mb": rusage.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else rusage.ru_maxrss / 1024
+    }
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    return process.returncode
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,64 @@
+# src/cli/benchmark_pipeline.py
+
+import os
+import json
+import time
+import logging
+import argparse
+from benchmarks.pipeline_benchmark import REPO_DIR, compare_stage_reports, run_pipeline_benchmark
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline end to end (process-docs to parse_evaluations) on generated PDFs with the local providers')
+    parser.add_argument('--num_pdfs', type=int, default=4, help='Generated PDFs')
+    parser.add_argument('--pages_per_pdf', type=int, default=20, help='Pages per generated PDF')
+    parser.add_argument('--words_per_page', type=int, default=400, help='Words per generated page')
+    parser.add_argument('--num_queries', type=int, default=4, help='Experiments, one query each, run against every PDF store')
+    parser.add_argument('--llm_models', type=str, nargs='+', default=['local-llm'], help='Local LLM models (llm.providers.local in config.yaml) used by the experiments and evaluators')
+    parser.add_argument('--max_workers', type=int, default=4, help='Experiment runs executed in parallel')
+    parser.add_argument('--no_provider_latency', action='store_true', help='Disable the simulated provider latency, measuring only our own overhead')
+    parser.add_argument('--results_backend', type=str, default='files', choices=['files', 'sqlite'], help='Results store the stages write to')
+    parser.add_argument('--repeat', type=int, default=1, help='Pipeline runs; stages are summarized by their median')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated PDFs and queries')
+    parser.add_argument('--base_config', type=str, default=os.path.join(REPO_DIR, 'config.yaml'), help='config.yaml the benchmark config is derived from')
+    parser.add_argument('--work_dir', type=str, default=None, help='Directory for the run directories (a temporary directory, removed afterwards, by default)')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary run directories')
+    parser.add_argument('--output', type=str, default=None, help='JSON report path (defaults to data/benchmarks/pipeline_<timestamp>.json)')
+    parser.add_argument('--baseline', type=str, default=None, help='Earlier JSON report to compare stage wall time, CPU time and peak memory against')
+    return parser
+
+def main(args):
+    report = run_pipeline_benchmark(
+        base_config_path=args.base_config,
+        num_pdfs=args.num_pdfs,
+        pages_per_pdf=args.pages_per_pdf,
+        words_per_page=args.words_per_page,
+        num_queries=args.num_queries,
+        llm_models=args.llm_models,
+        max_workers=args.max_workers,
+        provider_latency=not args.no_provider_latency,
+        results_backend=args.results_backend,
+        repeat=args.repeat,
+        seed=args.seed,
+        work_dir=args.work_dir,
+        keep=args.keep
+    )
+    output = args.output or os.path.join('./data/benchmarks', f"pipeline_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['regressions'] = compare_stage_reports(report, json.load(f))
+        for regression in report['regressions']:
+            logging.warning(f"Regression: {regression}")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    logging.info(f"Benchmark report saved to {output}")
+
+    print(f"{'stage':<28} {'runs':>4} {'wall_s':>8} {'cpu_s':>8} {'rss_mb':>8} {'files':>6} {'bytes':>12}")
+    for stage in report['stages']:
+        print(f"{stage['stage']:<28} {stage['runs']:>4} {stage['wall_seconds']:>8.2f} {stage['cpu_seconds']:>8.2f} {stage['peak_rss_mb']:>8.1f} {stage['files_written']:>6.0f} {stage['bytes_written']:>12.0f}")
+
+if __name__ == '__main__':
+    parser = parse_args()
+    args = parser.parse_args()
+    main(args)
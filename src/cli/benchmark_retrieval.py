@@ -0,0 +1,61 @@
+# src/cli/benchmark_retrieval.py
+
+import os
+import json
+import time
+import logging
+import argparse
+from benchmarks.retrieval_benchmark import ENGINES, compare_reports, run_retrieval_benchmark
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark retrieval (exact and approximate search) on synthetic embedding stores')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000, 10000000], help='Number of chunks of each synthetic store (a store takes about size * dim * 4 bytes on disk)')
+    parser.add_argument('--engines', type=str, nargs='+', default=ENGINES, choices=ENGINES, help='Search engines to measure')
+    parser.add_argument('--top_k', type=int, nargs='+', default=[1, 10, 100], help='top_k values to measure')
+    parser.add_argument('--dim', type=int, default=256, help='Vector dimensions')
+    parser.add_argument('--num_queries', type=int, default=100, help='Queries measured per top_k')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 8, 32], help='nprobe values measured for the ivf engine')
+    parser.add_argument('--nlist', type=int, default=None, help='IVF lists (defaults to 4 * sqrt(size))')
+    parser.add_argument('--rerank_factor', type=int, default=4, help='Candidates re-ranked per result by the quantized engines')
+    parser.add_argument('--exact_max_size', type=int, default=1000000, help='Largest store loaded by the in-memory exact engine; it is skipped for larger stores (mmap still gives exact results)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic vectors and queries')
+    parser.add_argument('--store_dir', type=str, default='./data/benchmarks/stores', help='Directory of the synthetic stores, reused across runs')
+    parser.add_argument('--output', type=str, default=None, help='JSON report path (defaults to data/benchmarks/retrieval_<timestamp>.json)')
+    parser.add_argument('--baseline', type=str, default=None, help='Earlier JSON report to compare p95 latency and recall against')
+    return parser
+
+def main(args):
+    report = run_retrieval_benchmark(
+        store_dir=args.store_dir,
+        sizes=args.sizes,
+        engines=args.engines,
+        top_k=args.top_k,
+        dim=args.dim,
+        num_queries=args.num_queries,
+        nprobe=args.nprobe,
+        nlist=args.nlist,
+        rerank_factor=args.rerank_factor,
+        seed=args.seed,
+        exact_max_size=args.exact_max_size
+    )
+    output = args.output or os.path.join('./data/benchmarks', f"retrieval_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['regressions'] = compare_reports(report, json.load(f))
+        for regression in report['regressions']:
+            logging.warning(f"Regression: {regression}")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    logging.info(f"Benchmark report saved to {output}")
+
+    print(f"{'size':>10} {'engine':<8} {'nprobe':>6} {'top_k':>5} {'load_s':>8} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'rss_mb':>8} {'recall':>7}")
+    for result in report['results']:
+        latency = result['latency']
+        print(f"{result['size']:>10} {result['engine']:<8} {result['nprobe'] or '-':>6} {result['top_k']:>5} {result['load_seconds']:>8.3f} {latency['p50_ms']:>9.3f} {latency['p95_ms']:>9.3f} {latency['p99_ms']:>9.3f} {result['peak_rss_mb']:>8.1f} {result['recall']:>7.3f}")
+
+if __name__ == '__main__':
+    parser = parse_args()
+    args = parser.parse_args()
+    main(args)
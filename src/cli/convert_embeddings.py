@@ -0,0 +1,29 @@
+# src/cli/convert_embeddings.py
+
+import os
+import argparse
+from app.embeddings.embedding_store import convert_csv_to_store
+from app.retrieval.quantized_search import QUANTIZED_FILES, quantize_store
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Convert processed embeddings CSV files to the binary embedding store format')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--csv_dir', type=str, help='Directory containing *_processed_<model>.csv files')
+    group.add_argument('--csv_file', type=str, help='Processed embeddings CSV file to convert')
+    parser.add_argument('--quantize', type=str, default=None, choices=list(QUANTIZED_FILES), help='Also write a quantized copy of the vectors for process-query')
+    return parser
+
+def main(args):
+    if args.csv_dir:
+        csv_files = [os.path.join(args.csv_dir, f) for f in os.listdir(args.csv_dir) if f.endswith('.csv') and '_processed_' in f]
+    else:
+        csv_files = [args.csv_file]
+    for csv_file in csv_files:
+        store_path = convert_csv_to_store(csv_file)
+        if args.quantize:
+            quantize_store(store_path, args.quantize)
+
+if __name__ == '__main__':
+    parser = parse_args()
+    args = parser.parse_args()
+    main(args)
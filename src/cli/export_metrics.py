@@ -0,0 +1,49 @@
+# src/cli/export_metrics.py
+
+import json
+import time
+import argparse
+from utils.config_utils import load_config
+from utils.metrics import load_metrics
+
+# Load configuration
+config = load_config()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Summarize recorded provider call metrics or export them in Prometheus text format')
+    parser.add_argument('--metrics_file', type=str, nargs='+', default=[config.get('metrics', {}).get('path', 'data/metrics/calls.jsonl')], help='JSONL files of call records')
+    parser.add_argument('--format', type=str, default='summary', choices=['summary', 'json', 'prometheus'], help='summary: p50/p95/p99 table per model; json: the same rows as JSON; prometheus: text exposition format')
+    parser.add_argument('--since_hours', type=float, default=None, help='Only include calls from the last N hours')
+    parser.add_argument('--output', type=str, default=None, help='File to write to instead of stdout')
+    return parser
+
+# Function to format a value for the summary table
+def format_cell(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+def main(args):
+    since = time.time() - args.since_hours * 3600 if args.since_hours is not None else None
+    metrics = load_metrics(args.metrics_file, since=since)
+    if args.format == 'prometheus':
+        output = metrics.to_prometheus()
+    elif args.format == 'json':
+        output = json.dumps(metrics.summary(), indent=4) + "\n"
+    else:
+        columns = ["kind", "provider", "model", "calls", "error", "cached", "call_seconds_p50", "call_seconds_p95", "call_seconds_p99", "queue_wait_seconds_p95", "ttft_seconds_p50", "tokens_per_second_p50"]
+        rows = [[format_cell(row.get(column)) for column in columns] for row in metrics.summary()]
+        widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+        lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+        lines.extend("  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+        output = "\n".join(lines) + "\n"
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output, end="")
+
+if __name__ == '__main__':
+    parser = parse_args()
+    args = parser.parse_args()
+    main(args)
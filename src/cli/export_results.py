@@ -0,0 +1,31 @@
+# src/cli/export_results.py
+
+import logging
+import argparse
+from utils.config_utils import load_config
+from app.results_store import FileResultsStore, SQLiteResultsStore, copy_results, export_results
+
+# Load configuration
+config = load_config()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export the SQLite results store to the data/ file tree, or import an existing file tree into it')
+    parser.add_argument('--database', type=str, default=config.get('results', {}).get('path', 'data/results.sqlite'), help='SQLite results database')
+    parser.add_argument('--paths', type=str, nargs='+', default=['data/experiments', 'data/evaluations'], help='Result directories to copy')
+    parser.add_argument('--output_dir', type=str, default='.', help='Directory the exported paths are written under')
+    parser.add_argument('--import_files', action='store_true', help='Copy the file tree under --output_dir into the database instead')
+    return parser
+
+def main(args):
+    store = SQLiteResultsStore(args.database)
+    if args.import_files:
+        copied = copy_results(FileResultsStore(args.output_dir), store, args.paths)
+        logging.info(f"Imported {copied} files into {args.database}")
+    else:
+        copied = export_results(store, args.output_dir, args.paths)
+        logging.info(f"Exported {copied} files from {args.database} to {args.output_dir}")
+
+if __name__ == '__main__':
+    parser = parse_args()
+    args = parser.parse_args()
+    main(args)
@@ -11,6 +11,11 @@ from prepare_groundedness_prompts import main as prepare_groundedness_prompts_ma
 from run_groundedness_evaluators import main as run_groundedness_evaluators_main, parse_args as run_groundedness_evaluators_parse_args
 from run_evaluators import main as run_evaluators_main, parse_args as run_evaluators_parse_args
 from run_experiments import main as run_experiments_main, parse_args as run_experiments_parse_args
+from convert_embeddings import main as convert_embeddings_main, parse_args as convert_embeddings_parse_args
+from export_metrics import main as export_metrics_main, parse_args as export_metrics_parse_args
+from export_results import main as export_results_main, parse_args as export_results_parse_args
+from benchmark_retrieval import main as benchmark_retrieval_main, parse_args as benchmark_retrieval_parse_args
+from benchmark_pipeline import main as benchmark_pipeline_main, parse_args as benchmark_pipeline_parse_args
 
 # Define available commands
 COMMANDS = {
@@ -22,6 +27,11 @@ COMMANDS = {
     'run-groundedness-evaluators': (run_groundedness_evaluators_main, run_groundedness_evaluators_parse_args),
     'run-evaluators': (run_evaluators_main, run_evaluators_parse_args),
     'run-experiments': (run_experiments_main, run_experiments_parse_args),
+    'convert-embeddings': (convert_embeddings_main, convert_embeddings_parse_args),
+    'export-metrics': (export_metrics_main, export_metrics_parse_args),
+    'export-results': (export_results_main, export_results_parse_args),
+    'benchmark-retrieval': (benchmark_retrieval_main, benchmark_retrieval_parse_args),
+    'benchmark-pipeline': (benchmark_pipeline_main, benchmark_pipeline_parse_args),
 }
 
 def main():
@@ -9,11 +9,13 @@ def parse_args():
     group.add_argument('--pdf_dir', type=str, help='Directory containing PDF files')
     group.add_argument('--pdf_file', type=str, help='File to be processed')
     parser.add_argument('--output_dir', type=str, required=True, help='Directory to store output files')
-    parser.add_argument('--embedding_model', type=str, default='openai', choices=['openai', 'vertex'], help='Embedding model to use')
+    parser.add_argument('--embedding_model', type=str, default='openai', choices=['openai', 'vertex', 'local'], help='Embedding model to use')
+    parser.add_argument('--output_format', type=str, default=None, choices=['csv', 'store'], help='Output format for embeddings (defaults to embeddings.output_format in config.yaml)')
+    parser.add_argument('--force', action='store_true', help='Reprocess every PDF, ignoring the ingest manifest')
     return parser
 
 def main(args):
-    process_docs(args.output_dir, args.pdf_dir, args.pdf_file, args.embedding_model)
+    process_docs(args.output_dir, args.pdf_dir, args.pdf_file, args.embedding_model, args.output_format, args.force)
 
 if __name__ == '__main__':
     parser = parse_args()
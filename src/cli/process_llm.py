@@ -14,22 +14,37 @@ def parse_args():
     parser.add_argument('--top_chunks_csv', type=str, required=False, help='Path to the CSV file with top chunks')
     parser.add_argument('--system_message', type=str, default=config.get('llm', {}).get('system_message', 'Default system message'), help='System message for the LLM')
     parser.add_argument('--output_dir', type=str, default='./data/result', help='Directory to save LLM results')
-    parser.add_argument('--llm_model', type=str, default=config.get('llm', {}).get('default', 'openai'), choices=['openai', 'vertex', 'anthropic'], help='LLM model to use')
-    parser.add_argument('--embedding_model', type=str, default=config.get('embeddings', {}).get('default', 'openai'), choices=['openai', 'vertex'], help='Embedding model to use')
+    parser.add_argument('--llm_provider', type=str, default=config.get('llm', {}).get('default', 'openai'), choices=['openai', 'vertex', 'anthropic', 'local'], help='LLM provider to use')
+    parser.add_argument('--llm_model', type=str, required=False, help='LLM model to use, one of the provider llm_models in config.yaml (defaults to the first one)')
+    parser.add_argument('--embedding_model', type=str, default=config.get('embeddings', {}).get('default', 'openai'), choices=['openai', 'vertex', 'local'], help='Embedding model to use')
     parser.add_argument('--embeddings_csv', type=str, required=False, help='Path to the embeddings CSV file for similarity search')
     parser.add_argument('--top_k', type=int, default=5, help='Number of top chunks to retrieve')
+    parser.add_argument('--no_cache', action='store_true', help='Always call the LLM instead of answering from the LLM response cache')
+    parser.add_argument('--stream', action='store_true', default=None, help='Stream the response, writing it as tokens arrive and recording time to first token (defaults to llm.stream in config.yaml)')
     return parser
 
+# Function to pick the LLM model of the provider, checking it is configured
+def get_llm_model(llm_provider: str, llm_model: str = None) -> str:
+    llm_models = list(config['llm']['providers'][llm_provider]['llm_models'])
+    if llm_model is None:
+        return llm_models[0]
+    if llm_model not in llm_models:
+        raise SystemExit(f"Unknown {llm_provider} model {llm_model}; configured models: {', '.join(llm_models)}")
+    return llm_model
+
 def main(args):
     process_llm(
         query=args.query,
         top_chunks_csv=args.top_chunks_csv,
         system_message=args.system_message,
         output_dir=args.output_dir,
-        llm_model=args.llm_model,
+        llm_provider=args.llm_provider,
+        llm_model=get_llm_model(args.llm_provider, args.llm_model),
         embedding_model=args.embedding_model,
         embeddings_csv=args.embeddings_csv,
-        top_k=args.top_k
+        top_k=args.top_k,
+        use_cache=not args.no_cache,
+        stream=args.stream
     )
 
 if __name__ == '__main__':
@@ -1,19 +1,26 @@
 # src/cli/process_query.py
 
 import argparse
-from app.process_query import process_query
+from app.process_query import process_query, process_queries
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Process query to find similar document chunks')
-    parser.add_argument('--query', type=str, required=True, help='The query string to search for')
-    parser.add_argument('--embeddings_csv', type=str, required=True, help='Path to the CSV file with precomputed embeddings')
+    query_group = parser.add_mutually_exclusive_group(required=True)
+    query_group.add_argument('--query', type=str, help='The query string to search for')
+    query_group.add_argument('--queries_file', type=str, help='File with one query per line (or a JSON list) to search for in one batch')
+    parser.add_argument('--embeddings_csv', type=str, required=True, help='Path to the CSV file or embedding store with precomputed embeddings')
     parser.add_argument('--top_k', type=int, default=5, help='Number of top similar chunks to retrieve')
     parser.add_argument('--result_dir', type=str, default='./data/result', help='Directory to save query results')
-    parser.add_argument('--embedding_model', type=str, default='openai', choices=['openai', 'vertex'], help='Embedding model to use')
+    parser.add_argument('--embedding_model', type=str, default='openai', choices=['openai', 'vertex', 'local'], help='Embedding model to use')
+    parser.add_argument('--mmap', action='store_true', default=None, help='Memory-map the embedding store and scan it in blocks (defaults to retrieval.mmap in config.yaml)')
+    parser.add_argument('--nprobe', type=int, default=None, help='Search the IVF index of the embedding store, scanning this many lists (defaults to retrieval.ann in config.yaml)')
     return parser
 
 def main(args):
-    process_query(args.query, args.embeddings_csv, args.top_k, args.result_dir, args.embedding_model)
+    if args.queries_file:
+        process_queries(args.queries_file, args.embeddings_csv, args.top_k, args.result_dir, args.embedding_model, args.mmap, args.nprobe)
+        return
+    process_query(args.query, args.embeddings_csv, args.top_k, args.result_dir, args.embedding_model, args.mmap, args.nprobe)
 
 if __name__ == '__main__':
     parser = parse_args()
@@ -4,10 +4,12 @@ from app.llm.run_evaluators import run_evaluators
 def parse_args():
     parser = argparse.ArgumentParser(description='Run evaluators for LLM responses')
     parser.add_argument('--evaluation_dir', type=str, required=True, help='Directory containing evaluation data')
+    parser.add_argument('--no_cache', action='store_true', help='Always call the evaluators instead of answering from the LLM response cache')
+    parser.add_argument('--batch', action='store_true', help='Submit all prompts as batches through the backends in llm.batch and write the responses when they finish')
     return parser
 
 def main(args):
-    run_evaluators(args.evaluation_dir)
+    run_evaluators(args.evaluation_dir, use_cache=not args.no_cache, batch=args.batch)
 
 if __name__ == '__main__':
     parser = parse_args()
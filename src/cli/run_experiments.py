@@ -4,10 +4,12 @@ from experiments.run_experiments import run_experiments_from_config
 def parse_args():
     parser = argparse.ArgumentParser(description='Run experiments based on YAML configuration')
     parser.add_argument('--config', type=str, required=True, help='Path to the YAML configuration file')
+    parser.add_argument('--max_workers', type=int, default=None, help='Number of experiment runs executed in parallel (defaults to concurrency.max_workers in the configuration file)')
+    parser.add_argument('--no_cache', action='store_true', help='Always call the LLMs instead of answering from the LLM response cache')
     return parser
 
 def main(args):
-    run_experiments_from_config(args.config)
+    run_experiments_from_config(args.config, args.max_workers, use_cache=not args.no_cache)
 
 if __name__ == '__main__':
     parser = parse_args()
@@ -2,12 +2,17 @@
 
 import sys
 import os
+import json
 import yaml
 import argparse
 import itertools
 import logging
-from typing import List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 from app.process_llm import process_llm
+from app.results_store import get_results_store
+from utils.hash_utils import generate_query_hash
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)], force=True)
 
@@ -34,8 +39,16 @@ def generate_combinations(params_variations: Dict[str, List]) -> List[Dict[str,
         logging.debug(f"Generated combination: {combination}")
         yield dict(zip(keys, combination))
 
-# Run an individual experiment
-def run_experiment(query: str, system_message: str, top_k: int, params: Dict, experiment_id: str):
+# Function to name the directory of one run, unique per full parameter combination
+def get_run_dir(experiment_id: str, params: Dict) -> str:
+    embedding_model = params['embeddings']['model']
+    llm_model = params['llm_model']['model']
+    # Combinations that differ only in other parameters, e.g. the embeddings CSV, get their own directory
+    params_hash = generate_query_hash(json.dumps(params, sort_keys=True, default=str), length=8)
+    return os.path.join(BASE_DIR, experiment_id, f"{experiment_id}_{embedding_model}_{llm_model}_{params_hash}")
+
+# Run an individual experiment, returning whether it succeeded
+def run_experiment(query: str, system_message: str, top_k: int, params: Dict, experiment_id: str, use_cache: bool = True) -> bool:
     logging.info(f"Running experiment {experiment_id}")
     
     try:
@@ -43,18 +56,16 @@ def run_experiment(query: str, system_message: str, top_k: int, params: Dict, ex
         llm_provider = params['llm_model']['provider']
         llm_model = params['llm_model']['model']
         embedding_model = params['embeddings']['model']
-        run_dir = os.path.join(experiment_dir, f"{experiment_id}_{embedding_model}_{llm_model}")
-        os.makedirs(run_dir, exist_ok=True)
+        run_dir = get_run_dir(experiment_id, params)
+        store = get_results_store()
 
-        # Save query.txt at the root of the experiment directory
+        # Save query.txt at the root of the experiment directory, with the run parameters
         query_file = os.path.join(experiment_dir, "query.txt")
-        with open(query_file, 'w') as f:
-            f.write(query)
-        logging.info(f"Query saved to {query_file}")
-
         params_file = os.path.join(run_dir, "params.yaml")
-        with open(params_file, 'w') as f:
-            yaml.dump(params, f)
+        with store.transaction():
+            store.write_text(query_file, query)
+            store.write_text(params_file, yaml.dump(params))
+        logging.info(f"Query saved to {query_file}")
         logging.info(f"Parameters saved to {params_file}")
 
         embeddings_csv = params['embeddings']['csv']
@@ -68,20 +79,49 @@ def run_experiment(query: str, system_message: str, top_k: int, params: Dict, ex
             llm_model=llm_model,
             embedding_model=embedding_model,
             embeddings_csv=embeddings_csv,
-            top_k=top_k
+            top_k=top_k,
+            use_cache=use_cache
         )
         
         logging.info(f"Experiment {experiment_id} completed successfully")
+        return True
     except Exception as e:
-        logging.error(f"Error in experiment {experiment_id}: {e}")
+        logging.error(f"Error in experiment {experiment_id} with params {params}: {e}")
+        return False
+
+# Run experiment runs in parallel: one thread pool per LLM provider, bounded by a global limit
+def run_experiments_concurrently(runs: List[Dict], max_workers: int, provider_limits: Dict[str, int]) -> List[bool]:
+    global_slots = threading.BoundedSemaphore(max_workers)
+
+    def run_with_slot(run: Dict) -> bool:
+        with global_slots:
+            return run_experiment(**run)
+
+    executors = {}
+    futures = []
+    try:
+        for run in runs:
+            provider = run['params']['llm_model']['provider']
+            if provider not in executors:
+                provider_workers = min(provider_limits.get(provider, max_workers), max_workers)
+                executors[provider] = ThreadPoolExecutor(max_workers=max(1, provider_workers), thread_name_prefix=f"experiments-{provider}")
+            futures.append(executors[provider].submit(run_with_slot, run))
+        return [future.result() for future in futures]
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
 
 # Run all experiments based on the configuration file
-def run_experiments_from_config(config_path: str):
+def run_experiments_from_config(config_path: str, max_workers: Optional[int] = None, use_cache: bool = True):
     logging.info(f"Starting to run experiments from {config_path}")
     try:
         config = load_config(config_path)
         experiments = config['experiments']
+        concurrency = config.get('concurrency', {})
+        if max_workers is None:
+            max_workers = concurrency.get('max_workers', 1)
 
+        runs = []
         for experiment_id, experiment_config in experiments.items():
             logging.info(f"Setting up experiment {experiment_id}")
             params_fixed = experiment_config['params_fixed']
@@ -92,16 +132,24 @@ def run_experiments_from_config(config_path: str):
             top_k = params_fixed['top_k']
 
             # Ensure the query.txt is saved at the root of the experiment directory
-            experiment_dir = os.path.join(BASE_DIR, experiment_id)
-            os.makedirs(experiment_dir, exist_ok=True)
-            query_file = os.path.join(experiment_dir, "query.txt")
-            with open(query_file, 'w') as f:
-                f.write(query)
+            query_file = os.path.join(BASE_DIR, experiment_id, "query.txt")
+            get_results_store().write_text(query_file, query)
             logging.info(f"Query saved to {query_file}")
 
             for params in generate_combinations(params_variations):
-                run_experiment(query, system_message, top_k, params, experiment_id)
-        logging.info("All experiments completed successfully")
+                runs.append({'query': query, 'system_message': system_message, 'top_k': top_k, 'params': params, 'experiment_id': experiment_id, 'use_cache': use_cache})
+
+        if max_workers > 1:
+            logging.info(f"Running {len(runs)} experiment runs with up to {max_workers} in parallel")
+            results = run_experiments_concurrently(runs, max_workers, concurrency.get('per_provider', {}))
+        else:
+            results = [run_experiment(**run) for run in runs]
+
+        failed = results.count(False)
+        if failed:
+            logging.warning(f"{failed} of {len(runs)} experiment runs failed")
+        else:
+            logging.info("All experiments completed successfully")
     except Exception as e:
         logging.error(f"Failed to run experiments: {e}")
         raise
@@ -0,0 +1,111 @@
+# src/utils/cache_utils.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Function to hash the parts of a cache key into a fixed-length key
+def make_cache_key(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+class DiskCache:
+    def __init__(self, path: str, max_size_mb: float = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Persistent key/value cache stored in a local SQLite file. When the stored
+        values exceed max_size_mb, the least recently used entries are evicted.
+
+        Args:
+            path (str): Path of the SQLite file.
+            max_size_mb (float): Maximum total size of the stored values, in megabytes.
+            ttl_seconds (Optional[float]): Age after which entries are treated as missing and evicted.
+        """
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)")
+        # Running total of the stored sizes, kept by triggers so inserts never sum the table
+        self.connection.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        if self.connection.execute("SELECT 1 FROM cache_meta WHERE name = 'total_size'").fetchone() is None:
+            # Caches created before the running total get it computed once
+            self.connection.execute("INSERT OR IGNORE INTO cache_meta (name, value) SELECT 'total_size', COALESCE(SUM(size), 0) FROM cache")
+        self.connection.execute("CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache BEGIN UPDATE cache_meta SET value = value + NEW.size WHERE name = 'total_size'; END")
+        self.connection.execute("CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache BEGIN UPDATE cache_meta SET value = value - OLD.size WHERE name = 'total_size'; END")
+        self.connection.execute("CREATE TRIGGER IF NOT EXISTS cache_size_update AFTER UPDATE OF size ON cache BEGIN UPDATE cache_meta SET value = value + NEW.size - OLD.size WHERE name = 'total_size'; END")
+        self.connection.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        found = {}
+        created_after = time.time() - self.ttl_seconds if self.ttl_seconds else 0
+        with self.lock:
+            # Query in slices to stay under SQLite's host parameter limit
+            for start in range(0, len(keys), 500):
+                key_slice = keys[start:start + 500]
+                placeholders = ",".join("?" * len(key_slice))
+                rows = self.connection.execute(f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND created_at >= ?", key_slice + [created_after]).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self.connection.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?", [(now, key) for key in found])
+                self.connection.commit()
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Iterable[Tuple[str, bytes]]):
+        now = time.time()
+        rows = [(key, value, len(value), now, now) for key, value in items]
+        if not rows:
+            return
+        with self.lock:
+            # An upsert (not INSERT OR REPLACE) so replacing an entry fires the size update trigger
+            self.connection.executemany(
+                "INSERT INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                rows
+            )
+            self._evict()
+            self.connection.commit()
+
+    def set(self, key: str, value: bytes):
+        self.set_many([(key, value)])
+
+    def total_size(self) -> int:
+        return self.connection.execute("SELECT value FROM cache_meta WHERE name = 'total_size'").fetchone()[0]
+
+    def _evict(self):
+        if self.ttl_seconds:
+            expired = self.connection.execute("DELETE FROM cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)).rowcount
+            if expired:
+                logging.debug(f"Evicted {expired} expired entries from cache {self.path}")
+        total_size = self.total_size()
+        if total_size <= self.max_bytes:
+            return
+        # Evict down to 90% of the limit so eviction does not run on every insert
+        excess = total_size - int(self.max_bytes * 0.9)
+        # Walk the accessed_at index only as far as needed to count the entries to evict
+        evicted = 0
+        freed = 0
+        for (size,) in self.connection.execute("SELECT size FROM cache ORDER BY accessed_at, rowid"):
+            if freed >= excess:
+                break
+            freed += size
+            evicted += 1
+        self.connection.execute("DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY accessed_at, rowid LIMIT ?)", (evicted,))
+        logging.debug(f"Evicted {evicted} entries ({freed} bytes) from cache {self.path}")
@@ -4,3 +4,10 @@ import hashlib
 
 def generate_query_hash(query: str, length: int = 10) -> str:
     return hashlib.sha256(query.encode()).hexdigest()[:length]
+
+def generate_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
@@ -0,0 +1,226 @@
+# src/utils/metrics.py
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LABEL_NAMES = ("kind", "provider", "model")
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Histogram bucket upper bounds per metric (Prometheus le labels)
+HISTOGRAMS = {
+    "provider_call_seconds": ("Wall time of provider calls, including rate limit waits and retries", (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)),
+    "provider_queue_wait_seconds": ("Time provider calls waited for the rate limiter", (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)),
+    "provider_ttft_seconds": ("Time to first token of streamed LLM calls", (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)),
+    "provider_tokens_per_second": ("Output tokens per second of wall time of LLM calls", (5, 10, 20, 40, 60, 80, 100, 150, 200, 400)),
+}
+
+# Counters and the record field each one sums (None counts records)
+COUNTERS = {
+    "provider_calls_total": ("Provider calls by status (ok, error, cached)", None),
+    "provider_retries_total": ("Retried attempts of provider calls", "retries"),
+    "provider_input_tokens_total": ("Input tokens sent to providers", "input_tokens"),
+    "provider_output_tokens_total": ("Output tokens received from providers", "output_tokens"),
+    "provider_input_bytes_total": ("Bytes of prompts and texts sent to providers", "input_bytes"),
+    "provider_output_bytes_total": ("Bytes of response text received from providers", "output_bytes"),
+}
+
+# Function to build the record of one provider call (LLM completion or embedding batch)
+def make_call_record(kind: str, provider: str, model: str, status: str, wall_seconds: float, queue_wait_seconds: float = 0.0, retries: int = 0, input_tokens: Optional[int] = None, output_tokens: Optional[int] = None, input_bytes: int = 0, output_bytes: int = 0, **extra: Any) -> Dict[str, Any]:
+    record = {
+        "timestamp": time.time(),
+        "kind": kind,
+        "provider": provider,
+        "model": model,
+        "status": status,
+        "wall_seconds": wall_seconds,
+        "queue_wait_seconds": queue_wait_seconds,
+        "retries": retries,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "tokens_per_second": output_tokens / wall_seconds if output_tokens and wall_seconds > 0 else None,
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes
+    }
+    record.update(extra)
+    return record
+
+# Function to compute a quantile of sorted values with linear interpolation
+def quantile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    position = q * (len(sorted_values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+# Function to escape a Prometheus label value
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+# Function to format Prometheus labels
+def format_labels(labels: Tuple[Tuple[str, Any], ...]) -> str:
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels) + "}"
+
+# Function to format a sample value the way Prometheus expects
+def format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Histogram:
+    def __init__(self, buckets: Iterable[float], max_samples: int = 10000):
+        """
+        Cumulative bucket counts for Prometheus export, plus the most recent
+        max_samples observations for exact quantiles.
+
+        Args:
+            buckets (Iterable[float]): Bucket upper bounds, ascending.
+            max_samples (int): Observations kept for quantiles.
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+        for i, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[i] += 1
+
+    def quantiles(self, qs: Iterable[float] = QUANTILES) -> Dict[str, Optional[float]]:
+        sorted_samples = sorted(self.samples)
+        return {f"p{round(q * 100)}": quantile(sorted_samples, q) for q in qs}
+
+class MetricsRegistry:
+    def __init__(self, jsonl_path: Optional[str] = None, max_samples: int = 10000):
+        """
+        In-process metrics of provider calls: counters and histograms per kind,
+        provider and model. Every record is also appended to jsonl_path when set.
+
+        Args:
+            jsonl_path (Optional[str]): JSONL file receiving one line per call.
+            max_samples (int): Observations kept per histogram for quantiles.
+        """
+        self.jsonl_path = jsonl_path
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        if jsonl_path and os.path.dirname(jsonl_path):
+            os.makedirs(os.path.dirname(jsonl_path), exist_ok=True)
+
+    def record(self, record: Dict[str, Any]):
+        """
+        Adds a call record (see make_call_record) to the metrics and the JSONL sink.
+        """
+        with self.lock:
+            self.update(record)
+            if self.jsonl_path:
+                try:
+                    with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record) + "\n")
+                except OSError as e:
+                    logging.warning(f"Could not write metrics record to {self.jsonl_path}: {e}")
+
+    def update(self, record: Dict[str, Any]):
+        labels = tuple((name, record[name]) for name in LABEL_NAMES)
+        for name, (_, field) in COUNTERS.items():
+            counter_labels = labels + (("status", record["status"]),) if field is None else labels
+            value = 1 if field is None else record.get(field) or 0
+            self.counters[(name, counter_labels)] = self.counters.get((name, counter_labels), 0) + value
+
+        # Cached answers and failures are counted but do not skew the latency histograms
+        if record["status"] != "ok":
+            return
+        observations = {
+            "provider_call_seconds": record.get("wall_seconds"),
+            "provider_queue_wait_seconds": record.get("queue_wait_seconds"),
+            "provider_ttft_seconds": record.get("ttft_seconds"),
+            "provider_tokens_per_second": record.get("tokens_per_second") if record["kind"] == "llm" else None
+        }
+        for name, value in observations.items():
+            if value is None:
+                continue
+            if (name, labels) not in self.histograms:
+                self.histograms[(name, labels)] = Histogram(HISTOGRAMS[name][1], self.max_samples)
+            self.histograms[(name, labels)].observe(value)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Returns one row per kind, provider and model with call counts and the p50, p95
+        and p99 of call time, queue wait, time to first token and tokens per second.
+        """
+        with self.lock:
+            rows = {}
+            for (name, labels), value in self.counters.items():
+                if name != "provider_calls_total":
+                    continue
+                row = rows.setdefault(labels[:len(LABEL_NAMES)], {"calls": 0, "ok": 0, "error": 0, "cached": 0})
+                row["calls"] += value
+                row[dict(labels)["status"]] = row.get(dict(labels)["status"], 0) + value
+            for (name, labels), histogram in self.histograms.items():
+                row = rows.setdefault(labels, {})
+                metric = name[len("provider_"):]
+                for key, value in histogram.quantiles().items():
+                    row[f"{metric}_{key}"] = value
+            return [dict(labels, **row) for labels, row in sorted(rows.items())]
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in COUNTERS.items():
+                samples = sorted((labels, value) for (counter_name, labels), value in self.counters.items() if counter_name == name)
+                if not samples:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+            for name, (help_text, _) in HISTOGRAMS.items():
+                samples = sorted((labels, histogram) for (histogram_name, labels), histogram in self.histograms.items() if histogram_name == name)
+                if not samples:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in samples:
+                    for upper_bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        lines.append(f"{name}_bucket{format_labels(labels + (('le', format_value(upper_bound)),))} {count}")
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+# Function to get the process-wide metrics registry, or None when metrics are disabled
+def get_metrics(metrics_config: dict) -> Optional[MetricsRegistry]:
+    if not metrics_config or not metrics_config.get('enabled', False):
+        return None
+    path = metrics_config.get('path', 'data/metrics/calls.jsonl')
+    with _registries_lock:
+        if path not in _registries:
+            _registries[path] = MetricsRegistry(path, metrics_config.get('max_samples', 10000))
+        return _registries[path]
+
+# Function to rebuild a metrics registry from the call records of JSONL files
+def load_metrics(paths: Iterable[str], since: Optional[float] = None) -> MetricsRegistry:
+    metrics = MetricsRegistry()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if since is None or record["timestamp"] >= since:
+                    metrics.update(record)
+    return metrics
@@ -0,0 +1,59 @@
+# src/utils/pipeline_utils.py
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Iterable, Iterator, Tuple
+
+# Function to map fn over argument tuples on an executor, yielding results in input order
+# while keeping at most max_pending tasks submitted at any time
+def ordered_map(executor: Executor, fn: Callable[..., Any], args_iterable: Iterable[Tuple], max_pending: int) -> Iterator[Any]:
+    pending = deque()
+    for args in args_iterable:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+_END_OF_STREAM = object()
+
+# Function to run an iterator in a background thread, handing items over through a bounded queue
+# so the producer stays at most max_size items ahead of the consumer
+def prefetch(iterable: Iterable[Any], max_size: int) -> Iterator[Any]:
+    items = queue.Queue(maxsize=max_size)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_END_OF_STREAM, None))
+        except BaseException as e:
+            put((_END_OF_STREAM, e))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _END_OF_STREAM:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # Unblock the producer if the consumer stopped early
+        stop.set()
+        producer.join()
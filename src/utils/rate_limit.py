@@ -0,0 +1,169 @@
+# src/utils/rate_limit.py
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# Function to estimate the number of tokens in a text (roughly 4 characters per token)
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        """
+        Token bucket refilled continuously at per_minute tokens per minute, holding at
+        most one minute worth of tokens. Callers reserve tokens up front and wait for
+        the returned delay, so concurrent callers are spaced out instead of racing.
+
+        Args:
+            per_minute (float): Tokens added per minute (also the bucket capacity).
+        """
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes amount tokens from the bucket, going into debt if needed, and returns
+        the number of seconds to wait before the reserved tokens are available.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+class RateLimiter:
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Limits the requests and tokens sent per minute to one provider model. Either
+        limit can be left unset.
+
+        Args:
+            name (str): Name used in log messages, usually provider/model.
+            requests_per_minute (Optional[float]): Maximum requests per minute.
+            tokens_per_minute (Optional[float]): Maximum estimated tokens per minute.
+        """
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, tokens: int = 0) -> float:
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        if delay > 0:
+            logging.debug(f"Rate limit for {self.name}: waiting {delay:.2f}s")
+        return delay
+
+    def wait(self, tokens: int = 0) -> float:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, tokens: int = 0) -> float:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+# Function to get the rate limiter shared by every instance of a provider model, or None when unlimited
+def get_rate_limiter(name: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None) -> Optional[RateLimiter]:
+    if not requests_per_minute and not tokens_per_minute:
+        return None
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name, requests_per_minute, tokens_per_minute)
+        return _limiters[name]
+
+# Function to get the HTTP status code carried by an OpenAI, Anthropic or Google API exception
+def get_status_code(error: Exception) -> Optional[int]:
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None and isinstance(getattr(error, 'code', None), int):
+        status_code = error.code
+    return status_code
+
+# Function to check whether a failed provider call is worth retrying
+def is_retryable_error(error: Exception) -> bool:
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    # Connection resets and timeouts carry no status code
+    return any(name in type(error).__name__ for name in ("Connection", "Timeout", "ServiceUnavailable", "DeadlineExceeded"))
+
+# Function to read the server-suggested retry delay from an API exception, if any
+def get_retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Retries provider calls that fail with rate limit (429), overload or transient
+        server errors, sleeping a jittered exponential backoff between attempts.
+
+        Args:
+            max_retries (int): Retries after the first attempt (0 disables retrying).
+            base_delay (float): Backoff ceiling of the first retry, in seconds.
+            max_delay (float): Maximum backoff ceiling, in seconds.
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        # Full jitter: a random delay up to the exponential ceiling, so retries do not synchronize
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def should_retry(self, attempt: int, error: Exception) -> bool:
+        return attempt < self.max_retries and is_retryable_error(error)
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.should_retry(attempt, e):
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                logging.warning(f"Retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries}) after error: {e}")
+                time.sleep(delay)
+
+    async def acall(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if not self.should_retry(attempt, e):
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                logging.warning(f"Retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries}) after error: {e}")
+                await asyncio.sleep(delay)
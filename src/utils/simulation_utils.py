@@ -0,0 +1,99 @@
+# src/utils/simulation_utils.py
+
+import math
+import random
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+class SimulatedProviderError(Exception):
+    """
+    Error injected by the local providers. Carries an HTTP status code so the retry
+    policy treats it like the matching provider error.
+    """
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Function to seed a random generator from the parts of a request, so the same request always gets the same output
+def seeded_random(*parts: Any) -> random.Random:
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+class LatencyModel:
+    def __init__(self, distribution: str = "lognormal", mean_seconds: float = 0.5, stddev_seconds: float = 0.0, min_seconds: float = 0.0, max_seconds: Optional[float] = None, seed: Optional[int] = None):
+        """
+        Draws simulated latencies from a distribution with the given mean and standard
+        deviation, clipped to [min_seconds, max_seconds].
+
+        Args:
+            distribution (str): "fixed", "uniform", "normal", "lognormal" or "exponential".
+            mean_seconds (float): Mean latency.
+            stddev_seconds (float): Standard deviation (ignored by "fixed" and "exponential").
+            min_seconds (float): Lower bound of the returned latencies.
+            max_seconds (Optional[float]): Upper bound of the returned latencies.
+            seed (Optional[int]): Seed of the random sequence, for repeatable runs.
+        """
+        if distribution not in ("fixed", "uniform", "normal", "lognormal", "exponential"):
+            raise ValueError(f"Unsupported latency distribution: {distribution}")
+        self.distribution = distribution
+        self.mean_seconds = mean_seconds
+        self.stddev_seconds = stddev_seconds
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, latency_config: Optional[Dict[str, Any]], seed: Optional[int] = None) -> "LatencyModel":
+        latency_config = latency_config or {}
+        return cls(
+            distribution=latency_config.get('distribution', 'fixed'),
+            mean_seconds=latency_config.get('mean_seconds', 0.0),
+            stddev_seconds=latency_config.get('stddev_seconds', 0.0),
+            min_seconds=latency_config.get('min_seconds', 0.0),
+            max_seconds=latency_config.get('max_seconds'),
+            seed=seed
+        )
+
+    def sample(self) -> float:
+        with self.lock:
+            if self.distribution == "fixed" or self.mean_seconds <= 0:
+                value = self.mean_seconds
+            elif self.distribution == "uniform":
+                half_width = self.stddev_seconds * math.sqrt(3)
+                value = self.random.uniform(self.mean_seconds - half_width, self.mean_seconds + half_width)
+            elif self.distribution == "normal":
+                value = self.random.gauss(self.mean_seconds, self.stddev_seconds)
+            elif self.distribution == "lognormal":
+                # Parameters of the underlying normal that give the requested mean and stddev
+                sigma = math.sqrt(math.log(1 + (self.stddev_seconds / self.mean_seconds) ** 2))
+                value = self.random.lognormvariate(math.log(self.mean_seconds) - sigma ** 2 / 2, sigma)
+            else:
+                value = self.random.expovariate(1 / self.mean_seconds)
+        value = max(self.min_seconds, value)
+        return min(value, self.max_seconds) if self.max_seconds is not None else value
+
+class FaultInjector:
+    def __init__(self, error_rate: float = 0.0, status_codes: Iterable[int] = (429, 503), seed: Optional[int] = None):
+        """
+        Fails a fraction of simulated calls with provider-like errors.
+
+        Args:
+            error_rate (float): Probability of failing a call, between 0 and 1.
+            status_codes (Iterable[int]): Status codes of the injected errors, picked at random.
+            seed (Optional[int]): Seed of the random sequence, for repeatable runs.
+        """
+        self.error_rate = error_rate
+        self.status_codes = list(status_codes)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def maybe_fail(self, name: str):
+        if self.error_rate <= 0:
+            return
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+            status_code = self.random.choice(self.status_codes)
+        if failed:
+            raise SimulatedProviderError(f"Injected error {status_code} from {name}", status_code)
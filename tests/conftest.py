@@ -0,0 +1,14 @@
+# tests/conftest.py
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules import each other as top-level packages (app, utils, benchmarks), as with PYTHONPATH=src
+SRC_DIR = os.path.join(REPO_DIR, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# Modules that load config.yaml at import time read the repository one, wherever pytest runs from
+os.environ.setdefault("CONFIG_PATH", os.path.join(REPO_DIR, "config.yaml"))
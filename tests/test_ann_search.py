@@ -0,0 +1,81 @@
+# tests/test_ann_search.py
+
+import numpy as np
+import pytest
+from app.embeddings.embedding_store import open_store_vectors
+from app.retrieval.ivf_index import IVFSearchEngine, build_ivf_index, load_ivf_index
+from app.retrieval.quantized_search import QuantizedSearchEngine, load_quantized_vectors, quantize_store
+from benchmarks.retrieval_benchmark import generate_synthetic_store, prepare_queries
+
+COUNT = 2000
+DIM = 32
+TOP_K = 10
+
+@pytest.fixture(scope="module")
+def synthetic_store(tmp_path_factory):
+    store_path = str(tmp_path_factory.mktemp("stores") / "synthetic.store")
+    generate_synthetic_store(store_path, COUNT, DIM, clusters=20, seed=7)
+    return store_path
+
+@pytest.fixture(scope="module")
+def queries(synthetic_store):
+    return prepare_queries(synthetic_store, 20, TOP_K)
+
+# Function to compute the mean recall@k of search results against the exact top k
+def mean_recall(indices, ground_truth) -> float:
+    return float(np.mean([len(set(row[:TOP_K]) & set(expected[:TOP_K])) / TOP_K for row, expected in zip(indices, ground_truth)]))
+
+def test_ivf_index_partitions_every_vector(synthetic_store):
+    build_ivf_index(synthetic_store, nlist=16)
+    index = load_ivf_index(synthetic_store)
+    assert len(index['centroids']) == 16
+    assert index['list_offsets'][-1] == COUNT
+    np.testing.assert_array_equal(np.sort(index['list_ids']), np.arange(COUNT))
+
+@pytest.mark.parametrize("nprobe", [16, 64])
+def test_ivf_is_exact_when_nprobe_covers_every_list(synthetic_store, queries, nprobe):
+    build_ivf_index(synthetic_store, nlist=16)
+    engine = IVFSearchEngine(synthetic_store, load_ivf_index(synthetic_store), nprobe=nprobe)
+    indices = [engine.search_ids(query, TOP_K)[0] for query in queries['queries']]
+    np.testing.assert_array_equal(np.array(indices), queries['ground_truth'][:, :TOP_K])
+    assert mean_recall(indices, queries['ground_truth']) == 1.0
+
+def test_ivf_recall_grows_with_nprobe(synthetic_store, queries):
+    build_ivf_index(synthetic_store, nlist=16)
+    index = load_ivf_index(synthetic_store)
+    recalls = []
+    for nprobe in (1, 4, 15):
+        engine = IVFSearchEngine(synthetic_store, index, nprobe=nprobe)
+        recalls.append(mean_recall([engine.search_ids(query, TOP_K)[0] for query in queries['queries']], queries['ground_truth']))
+    assert recalls == sorted(recalls)
+    assert recalls[-1] >= 0.9
+
+def test_ivf_search_batch_returns_the_row_ids(synthetic_store, queries):
+    build_ivf_index(synthetic_store, nlist=16)
+    engine = IVFSearchEngine(synthetic_store, load_ivf_index(synthetic_store), nprobe=16)
+    results = engine.search_batch(queries['queries'][:3].tolist(), TOP_K)
+    # chunk_number holds the row id in synthetic stores
+    for result, expected in zip(results, queries['ground_truth']):
+        assert result['chunk_number'].tolist() == expected[:TOP_K].tolist()
+        assert result['rank'].tolist() == list(range(1, TOP_K + 1))
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_search_reranks_with_full_precision(synthetic_store, queries, dtype):
+    quantize_store(synthetic_store, dtype)
+    vectors, scales = load_quantized_vectors(synthetic_store, dtype)
+    engine = QuantizedSearchEngine(synthetic_store, vectors, scales, rerank_factor=4)
+    indices, scores = engine.search_ids(queries['queries'], TOP_K)
+    assert mean_recall(indices, queries['ground_truth']) >= 0.95
+    # Returned scores are the float32 similarities of the returned rows, best first
+    full_precision = open_store_vectors(synthetic_store)
+    for query, row_indices, row_scores in zip(queries['queries'], indices, scores):
+        np.testing.assert_allclose(row_scores, np.asarray(full_precision[row_indices]) @ query, atol=1e-6)
+        assert np.all(np.diff(row_scores) <= 0)
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_search_is_exact_when_the_pool_covers_the_store(synthetic_store, queries, dtype):
+    quantize_store(synthetic_store, dtype)
+    vectors, scales = load_quantized_vectors(synthetic_store, dtype)
+    engine = QuantizedSearchEngine(synthetic_store, vectors, scales, rerank_factor=COUNT // TOP_K)
+    indices, _ = engine.search_ids(queries['queries'], TOP_K)
+    np.testing.assert_array_equal(np.array(indices), queries['ground_truth'][:, :TOP_K])
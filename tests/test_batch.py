@@ -0,0 +1,34 @@
+# tests/test_batch.py
+
+import time
+from app.llm.batch import LocalBatchBackend, read_batch_jsonl, run_llm_batch
+from app.llm.local_llm import LocalLLM
+from app.results_store import FileResultsStore
+
+# Function to build a local LLM answering after the given time to first token
+def local_llm(ttft_seconds=0.0):
+    return LocalLLM("You are an evaluator.", {"model": "local-llm", "ttft": {"mean_seconds": ttft_seconds}, "output_tokens": {"min": 5, "max": 20}})
+
+def test_local_batch_writes_every_response_without_waiting_the_poll_interval(tmp_path):
+    llm = local_llm(ttft_seconds=0.05)
+    requests = [{"custom_id": f"request-{i}", "llm": llm, "prompt": f"prompt {i}", "output_file": f"data/evaluations/run_{i}/llm_response.txt"} for i in range(6)]
+    store = FileResultsStore(str(tmp_path))
+    started_at = time.perf_counter()
+    results = run_llm_batch(requests, str(tmp_path / "batches"), lambda provider: LocalBatchBackend(max_workers=3), poll_interval=30, store=store)
+    # The local backend is collected as soon as it finishes, not after poll_interval
+    assert time.perf_counter() - started_at < 5
+    assert all(result['error'] is None for result in results.values())
+    for request in requests:
+        assert store.read_text(request['output_file']) == results[request['custom_id']]['response_text']
+    # The local provider is deterministic: the batch answers as a direct call would
+    assert results["request-0"]['response_text'] == local_llm().call_llm("prompt 0")['response_text']
+    batch_input = read_batch_jsonl(str(tmp_path / "batches" / "local_local-llm" / "batch_input.jsonl"))
+    assert [line['custom_id'] for line in batch_input] == [request['custom_id'] for request in requests]
+
+def test_failed_batch_requests_are_reported_and_not_written(tmp_path):
+    llm = LocalLLM("", {"model": "local-llm", "error_rate": 1.0, "error_status_codes": [400]})
+    requests = [{"custom_id": "request-0", "llm": llm, "prompt": "prompt", "output_file": "data/out.txt"}]
+    store = FileResultsStore(str(tmp_path))
+    results = run_llm_batch(requests, str(tmp_path / "batches"), lambda provider: LocalBatchBackend(), poll_interval=30, store=store)
+    assert results["request-0"]['error'] is not None
+    assert not store.exists("data/out.txt")
@@ -0,0 +1,75 @@
+# tests/test_cache_utils.py
+
+import sqlite3
+import pytest
+from utils import cache_utils
+from utils.cache_utils import DiskCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_utils.time, "time", clock)
+    return clock
+
+# Function to open a cache holding at most max_bytes
+def open_cache(path, max_bytes, ttl_seconds=None):
+    return DiskCache(str(path), max_size_mb=max_bytes / (1024 * 1024), ttl_seconds=ttl_seconds)
+
+# Function to sum the stored sizes directly, to check the running total against
+def stored_size(cache):
+    return cache.connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+def test_evicts_least_recently_used_entries_down_to_90_percent(tmp_path):
+    cache = open_cache(tmp_path / "cache.sqlite", 1000)
+    cache.set_many((f"key{i}", b"x" * 100) for i in range(10))
+    assert cache.total_size() == 1000
+    assert cache.get("key0") == b"x" * 100
+    cache.set("key10", b"x" * 100)
+    remaining = set(cache.get_many([f"key{i}" for i in range(11)]))
+    assert remaining == {"key0"} | {f"key{i}" for i in range(3, 11)}
+    assert cache.total_size() == stored_size(cache) == 900
+
+def test_running_total_follows_replacements(tmp_path):
+    cache = open_cache(tmp_path / "cache.sqlite", 10000)
+    cache.set("a", b"x" * 100)
+    cache.set("b", b"x" * 50)
+    cache.set("a", b"x" * 10)
+    assert cache.get("a") == b"x" * 10
+    assert cache.total_size() == stored_size(cache) == 60
+
+def test_expired_entries_are_missing_and_evicted(tmp_path, clock):
+    cache = open_cache(tmp_path / "cache.sqlite", 10000, ttl_seconds=100)
+    cache.set("old", b"x" * 10)
+    clock.now += 200
+    assert cache.get("old") is None
+    cache.set("new", b"x" * 20)
+    assert cache.total_size() == stored_size(cache) == 20
+
+def test_running_total_is_computed_for_existing_caches(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    # A cache written before the running total existed
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+    connection.executemany("INSERT INTO cache VALUES (?, ?, ?, ?, ?)", [(f"key{i}", b"x" * 30, 30, 1.0, 1.0) for i in range(4)])
+    connection.commit()
+    connection.close()
+    cache = open_cache(path, 10000)
+    assert cache.total_size() == 120
+    cache.set("key4", b"x" * 30)
+    assert cache.total_size() == stored_size(cache) == 150
+
+def test_values_survive_reopening(tmp_path):
+    cache = open_cache(tmp_path / "cache.sqlite", 10000)
+    cache.set_many([("a", b"1"), ("b", b"22")])
+    cache.connection.close()
+    reopened = open_cache(tmp_path / "cache.sqlite", 10000)
+    assert reopened.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"22"}
+    assert reopened.total_size() == 3
@@ -0,0 +1,72 @@
+# tests/test_chunking.py
+
+import pytest
+from app.chunking import RegexTokenizer, TokenChunker
+
+class ByteTokenizer:
+    """
+    One token per UTF-8 byte, the worst case of a byte-level BPE: any cut may land
+    inside a multibyte character. Decoding is strict, so a split character raises.
+    """
+    def encode(self, text):
+        return list(text.encode('utf-8'))
+
+    def decode(self, tokens):
+        return bytes(tokens).decode('utf-8')
+
+    def starts_character(self, token):
+        return token & 0xC0 != 0x80
+
+# Function to chunk the given page texts of one file
+def chunk_pages(chunker, texts):
+    return list(chunker.iter_chunks({"file_name": "doc.pdf", "page_num": page_num, "text": text} for page_num, text in enumerate(texts, start=1)))
+
+@pytest.mark.parametrize("chunk_size, overlap", [(10, 0), (10, 3), (7, 6), (25, 5), (200, 10)])
+def test_chunks_overlap_and_cover_the_page(chunk_size, overlap):
+    # Words of at most 4 characters are one regex token each
+    words = [str(i) for i in range(100)]
+    chunks = chunk_pages(TokenChunker(RegexTokenizer(), chunk_size, overlap), [" ".join(words)])
+    chunk_words = [chunk['chunk_text'].split() for chunk in chunks]
+    assert chunk_words[0][0] == words[0]
+    assert chunk_words[-1][-1] == words[-1]
+    for previous, current in zip(chunk_words, chunk_words[1:]):
+        assert len(previous) == chunk_size
+        # Each chunk starts overlap words before the previous one ended
+        assert previous[len(previous) - overlap:] == current[:overlap]
+        assert int(current[0]) == int(previous[-1]) + 1 - overlap
+    assert all(len(words) <= chunk_size for words in chunk_words)
+    assert [chunk['chunk_number'] for chunk in chunks] == list(range(1, len(chunks) + 1))
+
+def test_chunks_end_at_page_breaks():
+    chunks = chunk_pages(TokenChunker(RegexTokenizer(), 4, 1), ["a b c d e", "f g"])
+    assert [(chunk['page_num'], chunk['chunk_number'], chunk['chunk_text']) for chunk in chunks] == [
+        (1, 1, "a b c d"),
+        (1, 2, "d e"),
+        (2, 1, "f g")
+    ]
+
+def test_cross_page_chunks_are_attributed_to_their_first_page():
+    chunks = chunk_pages(TokenChunker(RegexTokenizer(), 4, 0, cross_page=True), ["a b c", "d e f g h"])
+    assert [(chunk['page_num'], chunk['chunk_text']) for chunk in chunks] == [
+        (1, "a b c\nd"),
+        (2, "e f g h")
+    ]
+
+def test_overlap_must_be_smaller_than_the_chunk_size():
+    with pytest.raises(ValueError):
+        TokenChunker(RegexTokenizer(), 4, 4)
+
+@pytest.mark.parametrize("chunk_size, overlap", [(5, 0), (7, 2), (9, 4), (16, 3)])
+def test_byte_chunks_do_not_split_multibyte_characters(chunk_size, overlap):
+    # No whitespace, so chunk texts are not changed by strip()
+    text = "açãoúníçõe€𝄞" * 12
+    chunks = chunk_pages(TokenChunker(ByteTokenizer(), chunk_size, overlap), [text])
+    assert all("�" not in chunk['chunk_text'] for chunk in chunks)
+    assert all(len(chunk['chunk_text'].encode('utf-8')) <= chunk_size for chunk in chunks)
+    # Consecutive chunks leave no gap: each starts at or before the end of the previous one
+    start, end = 0, 0
+    for chunk in chunks:
+        position = text.find(chunk['chunk_text'], start + 1 if end else 0)
+        assert 0 <= position <= end
+        start, end = position, position + len(chunk['chunk_text'])
+    assert end == len(text)
@@ -0,0 +1,23 @@
+# tests/test_cli_process_llm.py
+
+import pytest
+from cli import process_llm as process_llm_cli
+
+def run_cli(monkeypatch, argv):
+    calls = []
+    monkeypatch.setattr(process_llm_cli, "process_llm", lambda **kwargs: calls.append(kwargs))
+    process_llm_cli.main(process_llm_cli.parse_args().parse_args(argv))
+    return calls[0]
+
+def test_provider_and_model_are_passed_separately(monkeypatch):
+    kwargs = run_cli(monkeypatch, ["--query", "q", "--llm_provider", "openai", "--llm_model", "gpt-4o-mini-2024-07-18", "--no_cache", "--stream"])
+    assert kwargs["llm_provider"] == "openai" and kwargs["llm_model"] == "gpt-4o-mini-2024-07-18"
+    assert kwargs["use_cache"] is False and kwargs["stream"] is True
+
+def test_model_defaults_to_the_first_configured_one(monkeypatch):
+    kwargs = run_cli(monkeypatch, ["--query", "q", "--llm_provider", "local"])
+    assert kwargs["llm_provider"] == "local" and kwargs["llm_model"] == "local-llm"
+
+def test_unknown_model_is_rejected(monkeypatch):
+    with pytest.raises(SystemExit, match="local-llm"):
+        run_cli(monkeypatch, ["--query", "q", "--llm_provider", "local", "--llm_model", "gpt-4o-2024-05-13"])
@@ -0,0 +1,95 @@
+# tests/test_embedding_store.py
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from app.embeddings.embedding_store import OFFSETS_FILE, EmbeddingStoreWriter, convert_csv_to_store, is_embedding_store, load_embedding_store, open_store_vectors, read_store_manifest, read_store_metadata_rows
+
+# Function to build chunk records numbered from start
+def chunk_records(start: int, count: int, prefix: str = "chunk"):
+    return [{"file_name": "doc.pdf", "page_num": i // 4 + 1, "chunk_number": i, "chunk_text": f"{prefix} {i}, \"quoted\"\nção"} for i in range(start, start + count)]
+
+def test_store_round_trip_normalizes_vectors(tmp_path):
+    store_path = str(tmp_path / "doc_processed_local.store")
+    vectors = np.random.default_rng(0).standard_normal((6, 4)) * 5
+    with EmbeddingStoreWriter(store_path, "local") as writer:
+        writer.append(chunk_records(0, 4), vectors[:4])
+        writer.append(chunk_records(4, 2), vectors[4:])
+    assert is_embedding_store(store_path)
+    assert read_store_manifest(store_path) == {"format_version": 1, "model": "local", "dtype": "float32", "dim": 4, "count": 6, "normalized": True}
+    loaded, metadata = load_embedding_store(store_path)
+    np.testing.assert_allclose(loaded, vectors / np.linalg.norm(vectors, axis=1, keepdims=True), rtol=1e-6)
+    assert metadata.to_dict(orient='records') == chunk_records(0, 6)
+
+def test_writer_resumes_from_a_checkpoint(tmp_path):
+    store_path = str(tmp_path / "doc_processed_local.store")
+    rng = np.random.default_rng(1)
+    writer = EmbeddingStoreWriter(store_path, "local")
+    writer.append(chunk_records(0, 5), rng.standard_normal((5, 3)))
+    checkpoint = writer.checkpoint()
+    # Rows appended after the last checkpoint are lost with the interrupted run
+    writer.append(chunk_records(5, 3, prefix="lost"), rng.standard_normal((3, 3)))
+    writer.flush()
+    writer.vectors_file.close()
+    writer.metadata_file.close()
+    writer.offsets_file.close()
+
+    resumed_vectors = rng.standard_normal((3, 3))
+    with EmbeddingStoreWriter(store_path, "local", checkpoint) as resumed:
+        assert resumed.count == 5
+        resumed.append(chunk_records(5, 3, prefix="resumed"), resumed_vectors)
+    vectors, metadata = load_embedding_store(store_path)
+    assert read_store_manifest(store_path)['count'] == 8
+    assert metadata.to_dict(orient='records') == chunk_records(0, 5) + chunk_records(5, 3, prefix="resumed")
+    np.testing.assert_allclose(vectors[5:], resumed_vectors / np.linalg.norm(resumed_vectors, axis=1, keepdims=True), rtol=1e-6)
+
+def test_writer_rejects_a_different_dimension(tmp_path):
+    with EmbeddingStoreWriter(str(tmp_path / "x.store"), "local") as writer:
+        writer.append(chunk_records(0, 1), [[1.0, 0.0]])
+        with pytest.raises(ValueError):
+            writer.append(chunk_records(1, 1), [[1.0, 0.0, 0.0]])
+
+def test_empty_store(tmp_path):
+    store_path = str(tmp_path / "empty.store")
+    with EmbeddingStoreWriter(store_path, "local"):
+        pass
+    vectors, metadata = load_embedding_store(store_path)
+    assert len(vectors) == 0 and len(metadata) == 0
+
+def test_convert_csv_skips_chunks_without_embeddings(tmp_path):
+    csv_path = str(tmp_path / "doc_processed_local.csv")
+    records = chunk_records(0, 5)
+    pd.DataFrame(records).assign(embedding=["[1.0, 0.0]", "[]", "[0.0, 2.0]", "", "[1.0, 1.0, 1.0]"]).to_csv(csv_path, index=False)
+    store_path = convert_csv_to_store(csv_path, chunk_rows=2)
+    assert store_path.endswith("doc_processed_local.store")
+    vectors, metadata = load_embedding_store(store_path)
+    assert read_store_manifest(store_path)['model'] == "local"
+    np.testing.assert_allclose(vectors, [[1.0, 0.0], [0.0, 1.0]])
+    assert metadata['chunk_number'].tolist() == [0, 2]
+
+def test_read_store_metadata_rows_seeks_to_the_requested_rows(tmp_path):
+    store_path = str(tmp_path / "doc.store")
+    with EmbeddingStoreWriter(store_path, "local") as writer:
+        writer.append(chunk_records(0, 30), np.ones((30, 2)))
+    indices = [29, 0, 17, 17, 3]
+    rows = read_store_metadata_rows(store_path, np.array(indices))
+    assert rows.to_dict(orient='records') == [chunk_records(i, 1)[0] for i in indices]
+    assert rows['page_num'].dtype == np.int64 and rows['chunk_number'].dtype == np.int64
+    assert len(read_store_metadata_rows(store_path, [])) == 0
+
+def test_stores_without_row_offsets_are_scanned(tmp_path):
+    store_path = str(tmp_path / "doc.store")
+    with EmbeddingStoreWriter(store_path, "local") as writer:
+        writer.append(chunk_records(0, 25), np.ones((25, 2)))
+    os.remove(os.path.join(store_path, OFFSETS_FILE))
+    rows = read_store_metadata_rows(store_path, [24, 2, 11], chunk_rows=4)
+    assert rows.to_dict(orient='records') == [chunk_records(i, 1)[0] for i in (24, 2, 11)]
+
+def test_open_store_vectors_is_memory_mapped(tmp_path):
+    store_path = str(tmp_path / "doc.store")
+    with EmbeddingStoreWriter(store_path, "local") as writer:
+        writer.append(chunk_records(0, 3), np.eye(3))
+    vectors = open_store_vectors(store_path)
+    assert isinstance(vectors, np.memmap) and vectors.shape == (3, 3)
+    np.testing.assert_array_equal(vectors, np.eye(3, dtype=np.float32))
@@ -0,0 +1,93 @@
+# tests/test_embeddings.py
+
+import time
+import threading
+import pytest
+from typing import List
+from app.embeddings.embedding_cache import EmbeddingCache
+from app.embeddings.embeddings import EmbeddingGenerator, split_into_batches
+
+class RecordingGenerator(EmbeddingGenerator):
+    """
+    Embeds each text as [len(text), index of its request], recording every request
+    and the most requests in flight at once.
+    """
+    provider = "test"
+    cache_model = "test/recording"
+
+    def __init__(self, max_batch_size: int = 3, max_batch_tokens: int = 1000, max_in_flight: int = 1, delay: float = 0.0):
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_in_flight = max_in_flight
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def generate(self, text: str) -> List[float]:
+        return self.generate_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        with self.lock:
+            self.requests.append(list(texts))
+            request = len(self.requests)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return [[float(len(text)), float(request)] for text in texts]
+
+def test_split_into_batches_respects_size_and_token_limits():
+    texts = ["a" * 40] * 5 + ["b" * 400] + ["c" * 4] * 3
+    batches = split_into_batches(texts, max_batch_size=3, max_batch_tokens=100)
+    assert [len(batch) for batch in batches] == [3, 2, 1, 3]
+    assert [text for batch in batches for text in batch] == texts
+
+def test_split_into_batches_keeps_oversized_texts_alone():
+    assert split_into_batches(["x" * 1000, "y"], max_batch_size=10, max_batch_tokens=10) == [["x" * 1000], ["y"]]
+    assert split_into_batches([], 10, 10) == []
+
+def test_generate_batch_returns_one_embedding_per_text_in_order():
+    generator = RecordingGenerator(max_batch_size=3)
+    texts = [f"text {'x' * i}" for i in range(10)]
+    embeddings = generator.generate_batch(texts)
+    assert [embedding[0] for embedding in embeddings] == [float(len(text)) for text in texts]
+    assert [len(request) for request in generator.requests] == [3, 3, 3, 1]
+
+@pytest.mark.parametrize("max_in_flight", [1, 2, 4])
+def test_concurrent_batches_stay_within_the_in_flight_limit_and_in_order(max_in_flight):
+    generator = RecordingGenerator(max_batch_size=2, max_in_flight=max_in_flight, delay=0.02)
+    texts = [f"text {'x' * i}" for i in range(16)]
+    embeddings = generator.generate_batch(texts)
+    assert [embedding[0] for embedding in embeddings] == [float(len(text)) for text in texts]
+    assert len(generator.requests) == 8
+    assert generator.peak_in_flight <= max_in_flight
+    if max_in_flight > 1:
+        assert generator.peak_in_flight > 1
+
+def test_generate_batch_only_requests_cache_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    generator = RecordingGenerator(max_batch_size=10)
+    generator.cache = cache
+    first = generator.generate_batch(["alpha", "beta", "alpha"])
+    # Duplicate texts are requested once
+    assert generator.requests == [["alpha", "beta"]]
+    assert first[0] == first[2]
+
+    second = generator.generate_batch(["beta", "gamma", "alpha  ", "delta"])
+    # Cached texts (whitespace-normalized) are not sent again; misses are, in order
+    assert generator.requests[1:] == [["gamma", "delta"]]
+    assert second[0] == first[1] and second[2] == first[0]
+    assert [embedding[0] for embedding in second] == [4.0, 5.0, 5.0, 5.0]
+
+    assert generator.generate_batch(["gamma", "delta"]) == [second[1], second[3]]
+    assert len(generator.requests) == 2
+
+def test_cache_entries_are_keyed_by_model_and_version(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    cache.set_many("local/a", "v1", ["text", "failed"], [[1.0, 2.0], []])
+    assert cache.get_many("local/a", "v1", ["text", " text\n", "failed"]) == [[1.0, 2.0], [1.0, 2.0], None]
+    assert cache.get_many("local/a", "v2", ["text"]) == [None]
+    assert cache.get_many("local/b", "v1", ["text"]) == [None]
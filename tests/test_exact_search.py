@@ -0,0 +1,107 @@
+# tests/test_exact_search.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from app.embeddings.embedding_store import EmbeddingStoreWriter
+from app.embeddings.local_embeddings import LocalEmbeddingGenerator
+from app.retrieval.exact_search import ExactSearchEngine, MemoryMappedSearchEngine, block_top_k, block_top_k_batch, normalize_rows, top_k_indices, top_k_indices_rows
+
+# Function to get the brute force top_k of a score vector (full sort)
+def brute_force_top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    return np.argsort(-scores, kind='stable')[:top_k]
+
+# Function to build chunk metadata whose chunk_number is the row id
+def chunk_metadata(count: int) -> pd.DataFrame:
+    return pd.DataFrame({"file_name": "doc.pdf", "page_num": 1, "chunk_number": range(count), "chunk_text": [f"chunk {i}" for i in range(count)]})
+
+@pytest.mark.parametrize("top_k", [1, 5, 100, 500])
+def test_top_k_indices_matches_full_sort(top_k):
+    scores = np.random.default_rng(0).standard_normal(100).astype(np.float32)
+    np.testing.assert_array_equal(top_k_indices(scores, top_k), brute_force_top_k(scores, top_k))
+
+def test_top_k_indices_empty():
+    assert len(top_k_indices(np.empty(0, dtype=np.float32), 5)) == 0
+    assert len(top_k_indices(np.ones(3, dtype=np.float32), 0)) == 0
+
+def test_top_k_indices_rows_matches_full_sort():
+    scores = np.random.default_rng(1).standard_normal((7, 50)).astype(np.float32)
+    indices = top_k_indices_rows(scores, 10)
+    for row, row_indices in zip(scores, indices):
+        np.testing.assert_array_equal(row_indices, brute_force_top_k(row, 10))
+
+def test_exact_search_ranks_by_cosine_similarity():
+    rng = np.random.default_rng(2)
+    # Unnormalized vectors: the engine ranks by cosine similarity, not dot product
+    embeddings = rng.standard_normal((60, 16)) * rng.uniform(0.1, 10, size=(60, 1))
+    query = rng.standard_normal(16)
+    result = ExactSearchEngine(embeddings, chunk_metadata(60)).search(query.tolist(), 5)
+    expected = brute_force_top_k(normalize_rows(embeddings) @ normalize_rows(query.reshape(1, -1))[0], 5)
+    assert result['chunk_number'].tolist() == expected.tolist()
+    assert result['rank'].tolist() == [1, 2, 3, 4, 5]
+    assert result['similarity'].is_monotonic_decreasing
+
+def test_exact_search_batch_matches_single_queries():
+    rng = np.random.default_rng(3)
+    engine = ExactSearchEngine(rng.standard_normal((40, 8)), chunk_metadata(40))
+    queries = rng.standard_normal((5, 8)).tolist()
+    for batch_result, query in zip(engine.search_batch(queries, 4, query_block_size=2), queries):
+        pd.testing.assert_frame_equal(batch_result, engine.search(query, 4), atol=1e-6)
+
+def test_exact_search_rejects_mismatched_metadata():
+    with pytest.raises(ValueError):
+        ExactSearchEngine(np.ones((3, 4)), chunk_metadata(2))
+
+@pytest.mark.parametrize("block_size", [1, 7, 64, 1000])
+@pytest.mark.parametrize("top_k", [1, 10, 300])
+def test_block_top_k_matches_brute_force(block_size, top_k):
+    rng = np.random.default_rng(4)
+    vectors = normalize_rows(rng.standard_normal((200, 16)))
+    query = normalize_rows(rng.standard_normal((1, 16)))[0]
+    indices, scores = block_top_k(vectors, query, top_k, block_size)
+    expected = brute_force_top_k(vectors @ query, top_k)
+    np.testing.assert_array_equal(indices, expected)
+    np.testing.assert_allclose(scores, (vectors @ query)[expected], atol=1e-6)
+
+def test_block_top_k_normalizes_unnormalized_vectors():
+    rng = np.random.default_rng(5)
+    vectors = rng.standard_normal((100, 8)).astype(np.float32) * rng.uniform(0.1, 10, size=(100, 1)).astype(np.float32)
+    query = normalize_rows(rng.standard_normal((1, 8)))[0]
+    indices, _ = block_top_k(vectors, query, 10, 16, normalized=False)
+    np.testing.assert_array_equal(indices, brute_force_top_k(normalize_rows(vectors) @ query, 10))
+
+@pytest.mark.parametrize("block_size", [3, 50, 1000])
+def test_block_top_k_batch_matches_single_query_scan(block_size):
+    rng = np.random.default_rng(6)
+    vectors = normalize_rows(rng.standard_normal((150, 12)))
+    queries = normalize_rows(rng.standard_normal((5, 12)))
+    indices, scores = block_top_k_batch(vectors, queries, 8, block_size)
+    for query, row_indices, row_scores in zip(queries, indices, scores):
+        expected_indices, expected_scores = block_top_k(vectors, query, 8, block_size)
+        np.testing.assert_array_equal(row_indices, expected_indices)
+        np.testing.assert_allclose(row_scores, expected_scores, atol=1e-6)
+
+def test_memory_mapped_search_matches_in_memory_search(tmp_path):
+    rng = np.random.default_rng(7)
+    embeddings = rng.standard_normal((90, 12))
+    store_path = str(tmp_path / "doc.store")
+    with EmbeddingStoreWriter(store_path, "local") as writer:
+        writer.append(chunk_metadata(90).to_dict(orient='records'), embeddings)
+    exact = ExactSearchEngine(embeddings, chunk_metadata(90))
+    mapped = MemoryMappedSearchEngine(store_path, block_size=16)
+    queries = rng.standard_normal((4, 12)).tolist()
+    for mapped_result, exact_result in zip(mapped.search_batch(queries, 6, query_block_size=3), exact.search_batch(queries, 6)):
+        pd.testing.assert_frame_equal(mapped_result, exact_result, atol=1e-5)
+
+def test_local_embeddings_store_finds_each_chunk(tmp_path):
+    texts = [f"chunk about topic {i}" for i in range(50)]
+    generator = LocalEmbeddingGenerator(dimensions=64)
+    store_path = str(tmp_path / "local.store")
+    with EmbeddingStoreWriter(store_path, generator.model) as writer:
+        writer.append([{"file_name": "doc.pdf", "page_num": 1, "chunk_number": i, "chunk_text": text} for i, text in enumerate(texts)], generator.generate_batch(texts))
+    # The local provider is deterministic: the same text embeds to the same vector
+    results = MemoryMappedSearchEngine(store_path, block_size=16).search_batch(generator.generate_batch(texts[:5]), 3)
+    for i, result in enumerate(results):
+        assert result['chunk_number'].iloc[0] == i
+        assert result['chunk_text'].iloc[0] == texts[i]
+        assert result['similarity'].iloc[0] == pytest.approx(1.0, abs=1e-5)
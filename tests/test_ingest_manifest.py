@@ -0,0 +1,90 @@
+# tests/test_ingest_manifest.py
+
+import copy
+import numpy as np
+import pytest
+from app import process_docs
+from app.embeddings.embedding_store import load_embedding_store
+from app.embeddings.local_embeddings import LocalEmbeddingGenerator
+from app.ingest_manifest import IngestManifest
+from benchmarks.pipeline_benchmark import generate_pdfs
+
+SETTINGS = {"embedding_model": "local", "chunk_size": 20}
+
+class FailingEmbeddingGenerator(LocalEmbeddingGenerator):
+    """
+    Local embeddings that fail on the fail_on-th window, standing in for an ingestion
+    interrupted midway. Every embedded text is recorded.
+    """
+    def __init__(self, fail_on: int = None):
+        super().__init__(dimensions=16)
+        self.fail_on = fail_on
+        self.windows = []
+
+    def generate_batch(self, texts):
+        self.windows.append(list(texts))
+        if len(self.windows) == self.fail_on:
+            raise RuntimeError("ingestion interrupted")
+        return super().generate_batch(texts)
+
+@pytest.fixture
+def ingest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = copy.deepcopy(process_docs.config)
+    config['embeddings'].update({"default": "local", "output_format": "store", "chunking": {"strategy": "words"}})
+    config['embeddings']['models']['local']['chunk_size'] = 20
+    config['ingest'] = {"manifest": True, "extraction_workers": 1, "pages_per_task": 2, "queue_size": 2, "embedding_window": 4}
+    config['retrieval'] = {}
+    monkeypatch.setattr(process_docs, "config", config)
+    pdf_path = generate_pdfs(str(tmp_path / "pdfs"), 1, pages_per_pdf=6, words_per_page=60)[0]
+
+    def run(output_dir, generator):
+        monkeypatch.setattr(process_docs, "get_embedding_generator", lambda model: generator)
+        process_docs.process_docs(output_dir, pdf_file=pdf_path)
+        return str(tmp_path / output_dir / "benchmark_000_processed_local.store")
+
+    return pdf_path, run
+
+def test_resumable_entry_requires_unchanged_content_settings_and_output(tmp_path):
+    output_path = tmp_path / "doc_processed_local.store"
+    output_path.mkdir()
+    manifest = IngestManifest(str(tmp_path))
+    manifest.start("doc.pdf", "hash-1", SETTINGS, str(output_path))
+    manifest.commit("doc.pdf", {"last_page": 2, "last_chunk": 3})
+
+    # The manifest is persisted after every step
+    reloaded = IngestManifest(str(tmp_path))
+    entry = reloaded.get_resumable("doc.pdf", "hash-1", SETTINGS)
+    assert entry['status'] == "in_progress" and entry['checkpoint'] == {"last_page": 2, "last_chunk": 3}
+    assert reloaded.get_resumable("doc.pdf", "hash-2", SETTINGS) is None
+    assert reloaded.get_resumable("doc.pdf", "hash-1", dict(SETTINGS, chunk_size=40)) is None
+    reloaded.complete("doc.pdf")
+    assert IngestManifest(str(tmp_path)).get("doc.pdf")['status'] == "complete"
+    output_path.rmdir()
+    assert IngestManifest(str(tmp_path)).get_resumable("doc.pdf", "hash-1", SETTINGS) is None
+
+def test_interrupted_ingestion_resumes_after_the_last_committed_chunk(ingest):
+    pdf_path, run = ingest
+    reference_vectors, reference_metadata = load_embedding_store(run("reference", FailingEmbeddingGenerator()))
+
+    interrupted = FailingEmbeddingGenerator(fail_on=3)
+    with pytest.raises(RuntimeError):
+        run("processed", interrupted)
+    checkpoint = IngestManifest("processed").get(pdf_path)['checkpoint']
+    assert (checkpoint['last_page'], checkpoint['last_chunk']) == (3, 2)
+
+    resumed = FailingEmbeddingGenerator()
+    vectors, metadata = load_embedding_store(run("processed", resumed))
+    # Only the chunks after the checkpoint are embedded again, and the store matches an uninterrupted run
+    committed = [text for window in interrupted.windows[:2] for text in window]
+    assert [text for window in resumed.windows for text in window] == reference_metadata['chunk_text'].tolist()[len(committed):]
+    np.testing.assert_array_equal(vectors, reference_vectors)
+    assert metadata.to_dict(orient='records') == reference_metadata.to_dict(orient='records')
+    assert IngestManifest("processed").get(pdf_path)['status'] == "complete"
+
+def test_unchanged_pdfs_are_skipped(ingest):
+    pdf_path, run = ingest
+    run("processed", FailingEmbeddingGenerator())
+    skipped = FailingEmbeddingGenerator()
+    run("processed", skipped)
+    assert skipped.windows == []
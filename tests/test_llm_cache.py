@@ -0,0 +1,49 @@
+# tests/test_llm_cache.py
+
+import json
+import pytest
+from app.llm.llm_cache import LLMCache
+from app.llm.local_llm import LocalLLM
+from utils.metrics import MetricsRegistry
+
+REQUEST = ("openai", "gpt-4o", "You are helpful.", "What is RAG?", {"temperature": 0.7, "max_tokens": 1000})
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "llm.sqlite"))
+
+@pytest.mark.parametrize("position, value", [
+    (0, "anthropic"),
+    (1, "gpt-4o-mini"),
+    (2, "You are terse."),
+    (3, "What is RAG? "),
+    (4, {"temperature": 0.0, "max_tokens": 1000})
+])
+def test_key_changes_with_every_request_field(cache, position, value):
+    changed = list(REQUEST)
+    changed[position] = value
+    assert cache.make_key(*changed) != cache.make_key(*REQUEST)
+
+def test_key_ignores_parameter_order_and_a_missing_system_message(cache):
+    provider, model, system_message, prompt, params = REQUEST
+    assert cache.make_key(provider, model, system_message, prompt, dict(reversed(list(params.items())))) == cache.make_key(*REQUEST)
+    assert cache.make_key(provider, model, None, prompt, params) == cache.make_key(provider, model, "", prompt, params)
+
+def test_stored_response_comes_back_marked_as_cached(cache):
+    cache.set(*REQUEST, {"prompt": REQUEST[3], "response_text": "Retrieval.", "system_message": REQUEST[2], "costs": {"total_cost": 0.1}, "response": object(), "latency": {"ttft_seconds": 0.2}})
+    llm_response = cache.get(*REQUEST)
+    assert llm_response["response_text"] == "Retrieval." and llm_response["costs"] == {"total_cost": 0.1}
+    assert llm_response["cached"] is True and llm_response["response"] is None
+    assert "latency" not in llm_response
+    assert cache.get("openai", "gpt-4o", "You are helpful.", "Another prompt", REQUEST[4]) is None
+
+def test_repeated_call_is_served_from_the_cache(cache, tmp_path):
+    metrics_path = tmp_path / "calls.jsonl"
+    llm = LocalLLM("You are helpful.", {"model": "local-echo", "output_tokens": {"min": 5, "max": 10}}, cache=cache, metrics=MetricsRegistry(str(metrics_path)))
+    first = llm.call_llm("What is RAG?")
+    second = llm.call_llm("What is RAG?")
+    assert first["cached"] is False and second["cached"] is True
+    assert second["response_text"] == first["response_text"]
+    records = [json.loads(line) for line in metrics_path.read_text().splitlines()]
+    assert [record["status"] for record in records] == ["ok", "cached"]
+    assert records[1]["ttft_seconds"] is None
@@ -0,0 +1,43 @@
+# tests/test_pipeline_benchmark.py
+
+import yaml
+from app.results_store import FileResultsStore
+from benchmarks.pipeline_benchmark import compare_stage_reports, count_run_dirs, summarize_stages, write_benchmark_experiments
+from experiments.run_experiments import generate_combinations, get_run_dir
+
+# Function to build one measured pipeline stage
+def stage(name, wall_seconds, returncode=0):
+    return {"stage": name, "returncode": returncode, "wall_seconds": wall_seconds, "cpu_seconds": wall_seconds / 2, "user_cpu_seconds": wall_seconds / 3, "system_cpu_seconds": wall_seconds / 6, "peak_rss_mb": 100.0, "files_written": 10, "bytes_written": 1000}
+
+def test_summarize_stages_takes_the_median_of_successful_runs():
+    runs = [
+        {"stages": [stage("process-docs", 1.0), stage("run-experiments", 5.0)]},
+        {"stages": [stage("process-docs", 3.0), stage("run-experiments", 100.0, returncode=1)]},
+        {"stages": [stage("process-docs", 2.0)]}
+    ]
+    summary = {row['stage']: row for row in summarize_stages(runs)}
+    assert summary['process-docs']['runs'] == 3 and summary['process-docs']['wall_seconds'] == 2.0
+    assert summary['run-experiments']['runs'] == 1 and summary['run-experiments']['wall_seconds'] == 5.0
+
+def test_compare_stage_reports_flags_slower_stages():
+    baseline = {"stages": summarize_stages([{"stages": [stage("process-docs", 10.0), stage("run-evaluators", 4.0)]}])}
+    report = {"stages": summarize_stages([{"stages": [stage("process-docs", 10.5), stage("run-evaluators", 6.0), stage("run-experiments", 3.0)]}])}
+    regressions = compare_stage_reports(report, baseline)
+    assert [(regression['stage'], regression['measure']) for regression in regressions] == [("run-evaluators", "wall_seconds"), ("run-evaluators", "cpu_seconds")]
+
+def test_every_query_model_and_pdf_store_gets_its_own_run_dir(tmp_path):
+    pdf_paths = [f"data/pdfs/benchmark_{i:03d}.pdf" for i in range(3)]
+    experiments_path = write_benchmark_experiments(str(tmp_path / "experiments.yaml"), pdf_paths, ["local-llm", "local-llm-2"], 2, 4)
+    with open(experiments_path, 'r', encoding='utf-8') as f:
+        experiments = yaml.safe_load(f)['experiments']
+    run_dirs = {get_run_dir(experiment_id, params) for experiment_id, experiment in experiments.items() for params in generate_combinations(experiment['params_variations'])}
+    assert len(run_dirs) == 2 * 2 * 3
+
+def test_count_run_dirs_counts_the_runs_of_every_experiment(tmp_path):
+    store = FileResultsStore(str(tmp_path))
+    store.write_text("data/experiments/experiment_1/query.txt", "q")
+    store.write_text("data/experiments/experiment_1/experiment_1_local_local-llm_aaaa/params.yaml", "")
+    store.write_text("data/experiments/experiment_1/experiment_1_local_local-llm_bbbb/params.yaml", "")
+    store.write_text("data/experiments/experiment_2/experiment_2_local_local-llm_aaaa/params.yaml", "")
+    assert count_run_dirs(str(tmp_path), "files") == 3
+    assert count_run_dirs(str(tmp_path / "empty"), "files") == 0
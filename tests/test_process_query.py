@@ -0,0 +1,26 @@
+# tests/test_process_query.py
+
+import pandas as pd
+from app.process_query import load_embeddings_csv
+
+def test_load_embeddings_csv_skips_empty_and_ragged_rows(tmp_path, caplog):
+    csv_path = tmp_path / "doc_processed_local.csv"
+    pd.DataFrame({
+        "file_name": "doc.pdf",
+        "page_num": [1, 1, 2, 2, 3],
+        "chunk_number": [1, 2, 1, 2, 1],
+        "chunk_text": ["a", "b", "c", "d", "e"],
+        # A failed embedding is written as [], a missing one as an empty cell
+        "embedding": ["[0.1, 0.2, 0.3]", "[]", "[1.0, 0.0, 0.0]", "[1.0, 2.0]", None]
+    }).to_csv(csv_path, index=False)
+    embeddings, metadata = load_embeddings_csv(str(csv_path))
+    assert embeddings.shape == (2, 3)
+    assert metadata['chunk_text'].tolist() == ["a", "c"]
+    assert "embedding" not in metadata.columns
+    assert "Skipping 3 of 5 chunks" in caplog.text
+
+def test_load_embeddings_csv_without_any_embedding(tmp_path):
+    csv_path = tmp_path / "doc_processed_local.csv"
+    pd.DataFrame({"file_name": ["doc.pdf"], "page_num": [1], "chunk_number": [1], "chunk_text": ["a"], "embedding": ["[]"]}).to_csv(csv_path, index=False)
+    embeddings, metadata = load_embeddings_csv(str(csv_path))
+    assert embeddings.shape[0] == 0 and len(metadata) == 0
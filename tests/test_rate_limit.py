@@ -0,0 +1,118 @@
+# tests/test_rate_limit.py
+
+import asyncio
+import pytest
+from types import SimpleNamespace
+from utils import rate_limit
+from utils.rate_limit import RateLimiter, RetryPolicy, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class ProviderError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={'retry-after': retry_after} if retry_after else {})
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limit.time, "sleep", sleeps.append)
+    return sleeps
+
+def test_token_bucket_spaces_out_reservations(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+    # Each further token is one second (60 per minute) behind the previous one
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.now += 2
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+def test_token_bucket_refills_up_to_its_capacity(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    clock.now += 1000
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+def test_token_bucket_caps_requests_larger_than_its_capacity(clock):
+    bucket = TokenBucket(60)
+    # A single request above the capacity is let through instead of waiting forever
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(30) == pytest.approx(30.0)
+
+def test_rate_limiter_waits_for_the_slowest_limit(clock, sleeps):
+    limiter = RateLimiter("test/model", requests_per_minute=600, tokens_per_minute=60)
+    assert limiter.wait(60) == 0.0
+    assert limiter.wait(6) == pytest.approx(6.0)
+    assert sleeps == [pytest.approx(6.0)]
+
+def test_retry_policy_retries_transient_errors(sleeps):
+    outcomes = [ProviderError(429), ProviderError(503), "ok"]
+
+    def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert RetryPolicy(max_retries=3, base_delay=1.0).call(call) == "ok"
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1.0 and 0 <= sleeps[1] <= 2.0
+
+def test_retry_policy_does_not_retry_client_errors(sleeps):
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ProviderError(400)
+
+    with pytest.raises(ProviderError):
+        RetryPolicy(max_retries=3).call(call)
+    assert len(calls) == 1 and sleeps == []
+
+def test_retry_policy_gives_up_after_max_retries(sleeps):
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ProviderError(429)
+
+    with pytest.raises(ProviderError):
+        RetryPolicy(max_retries=2).call(call)
+    assert len(calls) == 3 and len(sleeps) == 2
+
+def test_retry_policy_backoff_honors_retry_after():
+    policy = RetryPolicy(base_delay=0.1, max_delay=10.0)
+    assert policy.backoff(0, ProviderError(429, retry_after="5")) >= 5.0
+    assert policy.backoff(0, ProviderError(429, retry_after="500")) == 10.0
+    assert all(policy.backoff(attempt, ProviderError(429)) <= min(10.0, 0.1 * 2 ** attempt) for attempt in range(10))
+
+def test_retry_policy_retries_async_calls(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+    outcomes = [ProviderError(529), "ok"]
+
+    async def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert asyncio.run(RetryPolicy(max_retries=1).acall(call)) == "ok"
+    assert len(delays) == 1
@@ -0,0 +1,68 @@
+# tests/test_results_store.py
+
+import pytest
+from app.results_store import FileResultsStore, SQLiteResultsStore, copy_results
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteResultsStore(str(tmp_path / "results.sqlite"))
+    yield store
+    store.connection.close()
+
+def test_transaction_commits_every_write(store, tmp_path):
+    with store.transaction():
+        store.write_text("data/experiments/a/response.txt", "first")
+        store.write_text("data/experiments/b/response.txt", "second")
+    # Another connection sees the committed writes
+    other = SQLiteResultsStore(store.path)
+    assert other.read_text("data/experiments/a/response.txt") == "first"
+    assert other.read_text("data/experiments/b/response.txt") == "second"
+    other.connection.close()
+
+def test_failed_transaction_writes_nothing(store):
+    store.write_text("data/kept.txt", "kept")
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.write_text("data/kept.txt", "overwritten")
+            store.write_text("data/new/file.txt", "new")
+            raise RuntimeError("stage failed")
+    assert store.read_text("data/kept.txt") == "kept"
+    assert not store.exists("data/new/file.txt")
+    assert not store.exists("data/new")
+
+def test_nested_transactions_join_the_outermost(store):
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            with store.transaction():
+                store.write_text("data/inner.txt", "inner")
+            assert store.read_text("data/inner.txt") == "inner"
+            raise RuntimeError("outer failed")
+    assert not store.exists("data/inner.txt")
+    # The store is usable again after the rollback
+    store.write_text("data/after.txt", "after")
+    assert store.read_text("data/after.txt") == "after"
+
+def test_directories_are_implicit(store):
+    store.write_text("./data/experiments/run/query.txt", "q")
+    store.write_text("data/experiments/run/params.json", "{}")
+    store.write_text("data/experiments/run_2/query.txt", "q2")
+    assert store.isdir("data/experiments") and store.isdir("data/experiments/run/")
+    assert not store.isdir("data/experiments/run/query.txt")
+    assert store.listdir("data/experiments") == ["run", "run_2"]
+    assert list(store.iter_files("data/experiments/run")) == ["data/experiments/run/params.json", "data/experiments/run/query.txt"]
+    with pytest.raises(FileNotFoundError):
+        store.read_text("data/experiments/missing.txt")
+    with pytest.raises(IsADirectoryError):
+        store.write_text("data/experiments/run", "not a file")
+
+def test_copy_results_round_trips_through_the_file_tree(store, tmp_path):
+    store.write_text("data/experiments/run/query.txt", "consulta ção")
+    store.write_text("data/evaluations/run/prompt.txt", "prompt")
+    files = FileResultsStore(str(tmp_path / "export"))
+    assert copy_results(store, files, ["data/experiments", "data/missing"]) == 1
+    assert files.read_text("data/experiments/run/query.txt") == "consulta ção"
+    assert not files.exists("data/evaluations")
+    restored = SQLiteResultsStore(str(tmp_path / "restored.sqlite"))
+    assert copy_results(files, restored, ["data"]) == 1
+    assert restored.read_text("data/experiments/run/query.txt") == "consulta ção"
+    restored.connection.close()
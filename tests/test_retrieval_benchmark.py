@@ -0,0 +1,43 @@
+# tests/test_retrieval_benchmark.py
+
+import numpy as np
+from app.embeddings.embedding_store import load_embedding_store
+from benchmarks.retrieval_benchmark import compare_reports, generate_synthetic_store, prepare_queries
+
+# Function to build one retrieval benchmark result
+def retrieval_result(engine, p95_ms, recall, nprobe=None):
+    return {"size": 1000, "dim": 32, "engine": engine, "nprobe": nprobe, "top_k": 10, "latency": {"p95_ms": p95_ms}, "recall": recall}
+
+def test_compare_reports_flags_latency_and_recall_regressions():
+    baseline = {"results": [retrieval_result("exact", 10.0, 1.0), retrieval_result("ivf", 2.0, 0.95, nprobe=8), retrieval_result("int8", 3.0, 0.99)]}
+    report = {"results": [
+        retrieval_result("exact", 10.5, 1.0),         # 5% slower: within the tolerance
+        retrieval_result("ivf", 2.0, 0.90, nprobe=8),  # recall dropped
+        retrieval_result("int8", 4.0, 0.99),           # 33% slower
+        retrieval_result("mmap", 50.0, 1.0)            # not in the baseline
+    ]}
+    regressions = compare_reports(report, baseline)
+    assert [(regression['engine'], regression['nprobe']) for regression in regressions] == [("ivf", 8), ("int8", None)]
+    assert regressions[1]['baseline_p95_ms'] == 3.0
+
+def test_compare_reports_matches_cases_by_nprobe():
+    baseline = {"results": [retrieval_result("ivf", 2.0, 0.95, nprobe=8)]}
+    report = {"results": [retrieval_result("ivf", 9.0, 0.5, nprobe=32)]}
+    assert compare_reports(report, baseline) == []
+    assert compare_reports(report, {}) == []
+
+def test_synthetic_store_is_reproducible(tmp_path):
+    whole = generate_synthetic_store(str(tmp_path / "whole.store"), 500, 16, clusters=10, seed=3)
+    again = generate_synthetic_store(str(tmp_path / "again.store"), 500, 16, clusters=10, seed=3)
+    vectors, metadata = load_embedding_store(whole)
+    np.testing.assert_array_equal(vectors, load_embedding_store(again)[0])
+    assert metadata['chunk_number'].tolist() == list(range(500))
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+
+def test_prepared_ground_truth_is_the_exact_top_k(tmp_path):
+    store_path = generate_synthetic_store(str(tmp_path / "synthetic.store"), 300, 16, clusters=5, seed=1)
+    queries = prepare_queries(store_path, 5, 10)
+    vectors, _ = load_embedding_store(store_path)
+    for query, expected in zip(queries['queries'], queries['ground_truth']):
+        scores = vectors @ query
+        np.testing.assert_allclose(np.sort(scores)[::-1][:10], scores[expected[:10]], atol=1e-6)
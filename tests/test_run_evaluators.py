@@ -0,0 +1,32 @@
+# tests/test_run_evaluators.py
+
+import asyncio
+from app.llm.run_evaluators import call_llms_concurrently
+
+class FakeLLM:
+    def __init__(self, fail_on=(), delay=0.01):
+        self.fail_on = set(fail_on)
+        self.delay = delay
+
+    async def acall_llm(self, prompt):
+        await asyncio.sleep(self.delay)
+        if prompt in self.fail_on:
+            raise RuntimeError(f"provider error for {prompt}")
+        return {"response_text": f"answer to {prompt}"}
+
+def test_responses_are_returned_in_call_order():
+    llm = FakeLLM()
+    saved = {}
+    responses = call_llms_concurrently([(llm, f"p{i}") for i in range(6)], 3, lambda index, response: saved.update({index: response}))
+    assert [response["response_text"] for response in responses] == [f"answer to p{i}" for i in range(6)]
+    assert sorted(saved) == list(range(6))
+
+def test_a_failed_call_does_not_cancel_the_others():
+    slow = FakeLLM(delay=0.05)
+    failing = FakeLLM(fail_on={"p1"})
+    saved = {}
+    responses = call_llms_concurrently([(slow, "p0"), (failing, "p1"), (slow, "p2")], 3, lambda index, response: saved.update({index: response}))
+    assert isinstance(responses[1], RuntimeError)
+    assert responses[0]["response_text"] == "answer to p0" and responses[2]["response_text"] == "answer to p2"
+    # Only the successful responses are written
+    assert sorted(saved) == [0, 2]
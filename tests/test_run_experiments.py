@@ -0,0 +1,48 @@
+# tests/test_run_experiments.py
+
+import os
+import yaml
+from experiments import run_experiments
+from experiments.run_experiments import generate_combinations, get_run_dir, run_experiments_concurrently
+
+PARAMS_VARIATIONS = {
+    "embeddings": [
+        {"model": "local", "csv": "data/processed/a_processed_local.store"},
+        {"model": "local", "csv": "data/processed/b_processed_local.store"}
+    ],
+    "llm_model": [
+        {"provider": "local", "model": "local-echo"},
+        {"provider": "local", "model": "local-echo-2"}
+    ]
+}
+
+def test_run_dirs_are_unique_per_parameter_combination():
+    combinations = list(generate_combinations(PARAMS_VARIATIONS))
+    run_dirs = [get_run_dir("experiment_1", params) for params in combinations]
+    assert len(set(run_dirs)) == len(combinations)
+    # The name is stable and keeps the prefix the evaluation steps look for
+    assert run_dirs == [get_run_dir("experiment_1", params) for params in combinations]
+    assert all(os.path.basename(run_dir).startswith("experiment_1_local_local-echo") for run_dir in run_dirs)
+
+def test_concurrent_runs_write_to_their_own_directories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    written = []
+
+    def fake_process_llm(output_dir, embeddings_csv, **kwargs):
+        written.append(output_dir)
+        with open(os.path.join(output_dir, "llm_response.txt"), 'w') as f:
+            f.write(embeddings_csv)
+
+    monkeypatch.setattr(run_experiments, "process_llm", fake_process_llm)
+    runs = [
+        {"query": "q", "system_message": "s", "top_k": 3, "params": params, "experiment_id": "experiment_1"}
+        for params in generate_combinations(PARAMS_VARIATIONS)
+    ]
+    assert run_experiments_concurrently(runs, max_workers=4, provider_limits={}) == [True] * len(runs)
+    assert len(set(written)) == len(runs)
+    for run in runs:
+        run_dir = get_run_dir("experiment_1", run['params'])
+        with open(os.path.join(run_dir, "params.yaml")) as f:
+            assert yaml.safe_load(f) == run['params']
+        with open(os.path.join(run_dir, "llm_response.txt")) as f:
+            assert f.read() == run['params']['embeddings']['csv']
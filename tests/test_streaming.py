@@ -0,0 +1,56 @@
+# tests/test_streaming.py
+
+import pytest
+from types import SimpleNamespace
+from app.llm.llm_base import EmptyStreamError, StreamInterruptedError
+from app.llm.openai_llm import OpenAILLM
+from app.llm.vertex_llm import VertexLLM
+
+OPENAI_CONFIG = {"model": "gpt-4o", "api_key": "test", "prices": {"input_token": 0.001, "output_token": 0.002}}
+
+# Function to build an OpenAI stream chunk
+def openai_chunk(content=None, finish_reason=None, usage=None):
+    choices = [] if usage is not None else [SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+class FakeOpenAIClient:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        assert request["stream"] is True
+        return iter(self.chunks)
+
+def stream_openai(chunks):
+    llm = OpenAILLM("You are helpful.", OPENAI_CONFIG, client=FakeOpenAIClient(chunks))
+    tokens = []
+    return llm.call_llm("What is RAG?", on_token=tokens.append), tokens
+
+def test_openai_stream_costs_come_from_the_usage_chunk():
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=4, total_tokens=14)
+    llm_response, tokens = stream_openai([openai_chunk("Retrieval "), openai_chunk("augmented.", "stop"), openai_chunk(usage=usage)])
+    assert tokens == ["Retrieval ", "augmented."]
+    assert llm_response["response_text"] == "Retrieval augmented."
+    assert llm_response["costs"]["total_tokens"] == 14
+    assert llm_response["costs"]["total_cost"] == pytest.approx(10 * 0.001 + 4 * 0.002)
+
+def test_openai_stream_without_usage_estimates_the_costs():
+    llm_response, _ = stream_openai([openai_chunk("Retrieval "), openai_chunk("augmented.", "stop")])
+    costs = llm_response["costs"]
+    assert costs["input_tokens"] > 0 and costs["output_tokens"] > 0
+    assert costs["total_tokens"] == costs["input_tokens"] + costs["output_tokens"]
+
+def test_openai_stream_cut_before_the_end_is_interrupted():
+    with pytest.raises(StreamInterruptedError):
+        stream_openai([openai_chunk("Retrieval ")])
+
+def test_openai_empty_stream_raises_empty_stream_error():
+    with pytest.raises(EmptyStreamError):
+        stream_openai([])
+
+def test_vertex_empty_stream_raises_empty_stream_error():
+    client = SimpleNamespace(generate_content=lambda **request: iter([]), _system_instruction=["You are helpful."])
+    llm = VertexLLM("You are helpful.", {"model": "gemini-1.5-pro-001", "prices": {}}, client=client)
+    with pytest.raises(EmptyStreamError):
+        llm.call_llm("What is RAG?", on_token=lambda token: None)